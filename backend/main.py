@@ -24,6 +24,7 @@ from loguru import logger
 # 本地模块
 from src.api.v2.router import api_v2_router
 from src.mcp.enhanced_client import EnhancedMCPClient
+from src.mcp.config_manager import close_mcp_config_manager
 from src.config.manager import config_manager
 from src.llm.processor import EnhancedLLMProcessor
 from src.dingtalk.bot import DingTalkBot
@@ -204,6 +205,9 @@ async def cleanup_services():
     if mcp_client:
         await mcp_client.disconnect()
     
+    # 关闭MCP配置管理器连接测试共用的HTTP会话
+    await close_mcp_config_manager()
+    
     # 重置全局变量
     mcp_client = None
     llm_processor = None
@@ -261,8 +261,8 @@ async def enable_mcp_tool(
         if not tool:
             raise HTTPException(status_code=404, detail=f"工具 {tool_name} 不存在")
         
-        tool.enabled = True
-        config_manager.save_config()
+        if not config_manager.set_tool_enabled(tool_name, True):
+            raise HTTPException(status_code=500, detail="启用工具失败")
         
         return {"message": f"工具 {tool_name} 已启用"}
     except HTTPException:
@@ -282,8 +282,8 @@ async def disable_mcp_tool(
         if not tool:
             raise HTTPException(status_code=404, detail=f"工具 {tool_name} 不存在")
         
-        tool.enabled = False
-        config_manager.save_config()
+        if not config_manager.set_tool_enabled(tool_name, False):
+            raise HTTPException(status_code=500, detail="禁用工具失败")
         
         return {"message": f"工具 {tool_name} 已禁用"}
     except HTTPException:
@@ -303,8 +303,8 @@ async def enable_mcp_server(
         if not server:
             raise HTTPException(status_code=404, detail=f"服务器 {server_name} 不存在")
         
-        server.enabled = True
-        config_manager.save_config()
+        if not config_manager.set_server_enabled(server_name, True):
+            raise HTTPException(status_code=500, detail="启用服务器失败")
         
         return {"message": f"服务器 {server_name} 已启用"}
     except HTTPException:
@@ -324,8 +324,8 @@ async def disable_mcp_server(
         if not server:
             raise HTTPException(status_code=404, detail=f"服务器 {server_name} 不存在")
         
-        server.enabled = False
-        config_manager.save_config()
+        if not config_manager.set_server_enabled(server_name, False):
+            raise HTTPException(status_code=500, detail="禁用服务器失败")
         
         return {"message": f"服务器 {server_name} 已禁用"}
     except HTTPException:
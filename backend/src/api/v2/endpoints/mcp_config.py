@@ -8,6 +8,7 @@ from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
 from fastapi.responses import FileResponse
 from pydantic import BaseModel, Field
 from loguru import logger
+import asyncio
 import tempfile
 import os
 import json
@@ -16,6 +17,7 @@ from src.mcp.config_manager import (
     MCPConfigManager, 
     MCPConfigTemplate, 
     MCPConfigValidationResult,
+    flush_pending_config_save,
     get_mcp_config_manager
 )
 from src.mcp.config import MCPServerConfig, MCPToolConfig, MCPConfiguration
@@ -98,6 +100,9 @@ def get_config_manager() -> MCPConfigManager:
 async def get_config_file(path: str = "config/mcp_config.json"):
     """获取配置文件内容"""
     try:
+        # 配置管理器的修改延迟写盘，读取文件前先写入尚未保存的修改
+        await asyncio.to_thread(flush_pending_config_save)
+        
         if not os.path.exists(path):
             raise HTTPException(status_code=404, detail=f"配置文件不存在: {path}")
         
@@ -300,13 +305,16 @@ async def list_tools(
         config = config_manager.get_config()
         tools = []
         
+        # 工具名称 -> 启用该工具的第一个服务器，一次遍历建好索引，避免按工具逐个扫描所有服务器
+        server_by_tool = {}
+        for server in config.servers:
+            if server.enabled_tools:
+                for tool_name in server.enabled_tools:
+                    server_by_tool.setdefault(tool_name, server.name)
+        
         for tool in config.tools:
             # 查找对应的服务器
-            server_name = None
-            for server in config.servers:
-                if server.enabled_tools and tool.name in server.enabled_tools:
-                    server_name = server.name
-                    break
+            server_name = server_by_tool.get(tool.name)
             
             tools.append(ToolResponse(
                 name=tool.name,
@@ -519,8 +527,7 @@ async def test_server_connection(
 ):
     """测试服务器连接"""
     try:
-        config = config_manager.get_config()
-        server = next((s for s in config.servers if s.name == server_name), None)
+        server = config_manager.get_server_by_name(server_name)
         
         if not server:
             raise HTTPException(status_code=404, detail="服务器不存在")
@@ -7,11 +7,14 @@ from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from loguru import logger
+import asyncio
 import json
 import os
 import traceback
 from pathlib import Path
 
+from src.mcp.config_manager import flush_pending_config_save
+
 router = APIRouter(prefix="/mcp/config", tags=["MCP配置"])
 
 # 响应模型
@@ -31,6 +34,9 @@ class MCPConfigResponse(BaseModel):
 async def get_current_mcp_config():
     """获取当前MCP配置"""
     try:
+        # 配置管理器的修改延迟写盘，读取文件前先写入尚未保存的修改
+        await asyncio.to_thread(flush_pending_config_save)
+        
         # 确定配置文件路径
         config_paths = [
             "config/mcp_config.json",
@@ -44,7 +50,8 @@ async def get_current_mcp_config():
         for path in config_paths:
             if os.path.exists(path):
                 try:
-                    with open(path, 'r', encoding='utf-8') as f:
+                    # 按字节整体读取后直接交给 json.loads，省去文本层的分块解码
+                    with open(path, 'rb') as f:
                         content = f.read().strip()
                         if content:  # 确保文件不是空的
                             config_data = json.loads(content)
@@ -113,10 +120,12 @@ async def get_current_mcp_config():
 async def get_mcp_config_file(path: str):
     """从指定路径获取MCP配置文件"""
     try:
+        await asyncio.to_thread(flush_pending_config_save)
+        
         if not os.path.exists(path):
             raise HTTPException(status_code=404, detail=f"配置文件不存在: {path}")
         
-        with open(path, 'r', encoding='utf-8') as f:
+        with open(path, 'rb') as f:
             content = f.read().strip()
             if not content:
                 raise HTTPException(status_code=400, detail=f"配置文件为空: {path}")
@@ -7,12 +7,16 @@ from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from pydantic import BaseModel, Field
 from loguru import logger
-import json
 import os
 import traceback
 import asyncio
 from pathlib import Path
 
+from src.mcp.config_manager import (
+    MCPConfigManager, atomic_write_bytes, flush_pending_config_save, link_or_copy, prune_backups
+)
+from src.utils.json_utils import dumps as json_dumps
+
 router = APIRouter(prefix="/mcp/config", tags=["MCP配置"])
 
 # 请求模型
@@ -110,6 +114,9 @@ async def update_mcp_config(request: MCPConfigUpdateRequest, background_tasks: B
     backup_path = None
     
     try:
+        # 先写入配置管理器尚未保存的修改，备份到的是最新内容，之后的重载也会以本次写入为准
+        await asyncio.to_thread(flush_pending_config_save)
+        
         # 确定配置文件路径
         config_paths = [
             "config/mcp_config.json",
@@ -121,7 +128,8 @@ async def update_mcp_config(request: MCPConfigUpdateRequest, background_tasks: B
         for path in config_paths:
             if os.path.exists(path):
                 try:
-                    with open(path, 'r', encoding='utf-8') as f:
+                    # 只判断是否有内容，按字节整体读取，无需逐块解码
+                    with open(path, 'rb') as f:
                         content = f.read().strip()
                         if content:  # 确保文件不是空的
                             primary_config_path = path
@@ -150,9 +158,14 @@ async def update_mcp_config(request: MCPConfigUpdateRequest, background_tasks: B
         
         # 如果原配置文件存在，创建备份
         if os.path.exists(primary_config_path):
-            import shutil
-            shutil.copy2(primary_config_path, backup_path)
+            # 配置文件随后会被整体替换，备份直接硬链接原文件，无需复制数据
+            link_or_copy(primary_config_path, backup_path)
             logger.info(f"💾 创建配置备份: {backup_path}")
+            # 与配置管理器保持相同的备份保留数量，避免备份目录无限增长
+            try:
+                prune_backups(backup_dir, MCPConfigManager.MAX_BACKUPS)
+            except OSError as e:
+                logger.warning(f"清理旧备份失败: {e}")
         
         # 验证配置数据
         if not isinstance(request.config_data, dict):
@@ -164,6 +177,9 @@ async def update_mcp_config(request: MCPConfigUpdateRequest, background_tasks: B
         if "tools" not in request.config_data:
             warnings.append("配置中缺少tools字段")
         
+        # 只序列化一次，主配置文件和同步位置写入相同内容
+        config_bytes = json_dumps(request.config_data, indent=True).encode('utf-8')
+        
         # 写入新配置
         try:
             # 确保目录存在
@@ -179,9 +195,8 @@ async def update_mcp_config(request: MCPConfigUpdateRequest, background_tasks: B
                     except Exception as perm_error:
                         logger.warning(f"无法修改文件权限: {perm_error}")
             
-            # 写入配置
-            with open(primary_config_path, 'w', encoding='utf-8') as f:
-                json.dump(request.config_data, f, indent=2, ensure_ascii=False)
+            # 写入配置（临时文件 + os.replace 原子替换）
+            atomic_write_bytes(primary_config_path, config_bytes)
             logger.info(f"✅ 主配置文件已更新: {primary_config_path}")
         except Exception as e:
             logger.error(f"❌ 写入主配置文件失败: {e}")
@@ -205,8 +220,7 @@ async def update_mcp_config(request: MCPConfigUpdateRequest, background_tasks: B
                                 logger.warning(f"无法修改文件权限: {perm_error}")
                     
                     # 复制配置
-                    with open(path, 'w', encoding='utf-8') as f:
-                        json.dump(request.config_data, f, indent=2, ensure_ascii=False)
+                    atomic_write_bytes(path, config_bytes)
                     logger.info(f"✅ 同步配置到: {path}")
                 except Exception as e:
                     warnings.append(f"同步配置到 {path} 失败: {str(e)}")
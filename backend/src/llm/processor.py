@@ -6,7 +6,7 @@
 import json
 import asyncio
 import time
-from typing import Dict, Any, List, Optional, AsyncGenerator, Union
+from typing import Dict, Any, List, Optional, AsyncGenerator, Tuple, Union
 from datetime import datetime
 from loguru import logger
 import openai
@@ -18,9 +18,10 @@ from tenacity import retry, stop_after_attempt, wait_exponential
 
 from ..mcp.types import (
     ChatMessage, ProcessResult, FunctionCall, FunctionCallResult,
-    MCPException
+    MCPException, Usage
 )
 from ..mcp.enhanced_client import EnhancedMCPClient
+from ..utils.json_utils import dumps as json_dumps
 from .security.masker import DataMasker
 from .security.config import MaskingConfig
 
@@ -37,6 +38,9 @@ class EnhancedLLMProcessor:
     MAX_CONTEXT_TOKENS = 100000  # 最大上下文token数（估算）
     MAX_HISTORY_MESSAGES = 20  # 最大历史消息数
     
+    # Schema清理缓存配置
+    MAX_SCHEMA_CACHE_SIZE = 512  # 最大缓存schema数
+    
     def __init__(self, config_dict: Dict[str, Any], mcp_client=None):
         """
         初始化LLM处理器
@@ -47,6 +51,14 @@ class EnhancedLLMProcessor:
         self.mcp_client = mcp_client
         self.client = None  # 单个LLM客户端
         
+        # Schema清理缓存: id(schema) -> (原始schema, 清理后schema)，随MCP工具列表版本失效
+        self._schema_cache: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        self._schema_cache_version: Optional[int] = None
+        
+        # OpenAI格式工具列表缓存，仅在MCP工具列表版本变化时重建
+        self._openai_tools_cache: Optional[List[Dict[str, Any]]] = None
+        self._openai_tools_cache_version: Optional[int] = None
+        
         # 初始化脱敏器
         self.data_masker = DataMasker(MaskingConfig())
         
@@ -457,8 +469,21 @@ class EnhancedLLMProcessor:
         if len(messages) <= 2:  # 至少保留系统消息和用户消息
             return messages
         
-        # 计算总token数
-        total_tokens = sum(self._estimate_tokens(str(msg.get('content', ''))) for msg in messages)
+        # 快速路径：消息数未超限且字符总数不超过上限对应的字符数时，估算值必然不超限
+        if len(messages) <= self.MAX_HISTORY_MESSAGES:
+            char_budget = self.MAX_CONTEXT_TOKENS * 4
+            total_chars = 0
+            for msg in messages:
+                content = msg.get('content', '')
+                total_chars += len(content) if isinstance(content, str) else len(str(content))
+                if total_chars > char_budget:
+                    break
+            else:
+                return messages
+        
+        # 计算总token数（每条消息只估算一次）
+        message_tokens = [self._estimate_tokens(str(msg.get('content', ''))) for msg in messages]
+        total_tokens = sum(message_tokens)
         
         if total_tokens <= self.MAX_CONTEXT_TOKENS and len(messages) <= self.MAX_HISTORY_MESSAGES:
             return messages
@@ -479,13 +504,13 @@ class EnhancedLLMProcessor:
         
         # 2. 保留最近的对话（用户-助手-工具的完整循环）
         recent_conversations = []
-        current_tokens = sum(self._estimate_tokens(str(msg.get('content', ''))) for msg in system_messages)
+        current_tokens = sum(tokens for msg, tokens in zip(messages, message_tokens) if msg.get('role') == 'system')
         
         # 从最后开始，保留完整的对话循环
         i = len(messages) - 1
         while i >= 0 and len(recent_conversations) < self.MAX_HISTORY_MESSAGES // 2:
             msg = messages[i]
-            msg_tokens = self._estimate_tokens(str(msg.get('content', '')))
+            msg_tokens = message_tokens[i]
             
             if current_tokens + msg_tokens > self.MAX_CONTEXT_TOKENS:
                 break
@@ -549,7 +574,7 @@ class EnhancedLLMProcessor:
                     session_id = f'demo_session_{int(time.time())}'
                     
                     # 🔒 执行脱敏演示
-                    masked_tool_results = self.data_masker.mask_tool_results(tool_results, session_id)
+                    masked_tool_results = await self.data_masker.mask_tool_results(tool_results, session_id)
                     
                     # 📝 在日志中记录脱敏效果
                     import json
@@ -558,7 +583,7 @@ class EnhancedLLMProcessor:
                     logger.warning(f"   脱敏后结果: {json.dumps(masked_tool_results, ensure_ascii=False)[:200]}...")
                     
                     # 生成包含脱敏信息的模拟响应
-                    mock_response = f"⚠️ LLM服务未配置，这是演示响应。\n\n工具已执行并完成脱敏处理：\n- 会话ID: {session_id}\n- 脱敏映射数: {len(self.data_masker.session_manager.sessions.get(session_id, {}).get('original_to_masked', {}))}\n\n请检查日志查看详细的脱敏效果。"
+                    mock_response = f"⚠️ LLM服务未配置，这是演示响应。\n\n工具已执行并完成脱敏处理：\n- 会话ID: {session_id}\n- 脱敏映射数: {self.data_masker.get_session_stats(session_id).get('mapping_count', 0)}\n\n请检查日志查看详细的脱敏效果。"
                 else:
                     mock_response = "抱歉，LLM服务未正确配置。请检查API密钥设置或网络代理配置。"
                 
@@ -587,7 +612,7 @@ class EnhancedLLMProcessor:
                     if available_tools:
                         logger.info(f"✅ 使用所有可用工具: {len(available_tools)} 个")
                         limited_tools = available_tools
-                        tools = self._convert_tools_to_openai(limited_tools)
+                        tools = self._get_openai_tools(limited_tools)
                         tool_names = [tool['function']['name'] for tool in tools]
                         logger.info(f"转换为OpenAI格式的工具: {tool_names}")
                     else:
@@ -957,7 +982,7 @@ Kubernetes 节点信息:
             
             # 构建优化的提示词
             system_prompt = self._get_tool_response_system_prompt()
-            user_prompt = self._get_tool_response_user_prompt(original_message, tool_calls, tool_results)
+            user_prompt = await self._get_tool_response_user_prompt(original_message, tool_calls, tool_results)
             
             logger.debug(f"系统提示词长度: {len(system_prompt)}")
             logger.debug(f"用户提示词长度: {len(user_prompt)}")
@@ -1126,7 +1151,7 @@ Kubernetes 节点信息:
 
 如果工具执行失败或返回错误，请如实说明情况并提供可能的解决建议。"""
 
-    def _get_tool_response_user_prompt(
+    async def _get_tool_response_user_prompt(
         self, 
         original_question: str, 
         tool_calls: List[Dict[str, Any]], 
@@ -1142,7 +1167,7 @@ Kubernetes 节点信息:
         
         logger.error(f"🆔 会话ID生成: {session_id}")
         
-        masked_tool_results = self.data_masker.mask_tool_results(tool_results, session_id)
+        masked_tool_results = await self.data_masker.mask_tool_results(tool_results, session_id)
         
         # 📝 在日志中记录详细的脱敏效果
         import json
@@ -1352,7 +1377,7 @@ Kubernetes 节点信息:
             
             available_tools = await self.mcp_client.list_tools()
             if available_tools:
-                return self._convert_tools_to_openai(available_tools)
+                return self._get_openai_tools(available_tools)
             return None
             
         except Exception as e:
@@ -1482,12 +1507,9 @@ Kubernetes 节点信息:
         if not content:
             content = "抱歉，我没能生成有效的响应，请重试。"
         
-        # 规范化usage信息
-        usage_dict = self._simplify_usage(getattr(response, 'usage', None))
-        
-        return ProcessResult(
+        return self._build_result(
             content=content,
-            usage=usage_dict
+            usage_obj=getattr(response, 'usage', None)
         )
     
     async def _chat_with_tools(self, messages: List[ChatMessage]) -> ProcessResult:
@@ -1510,7 +1532,7 @@ Kubernetes 节点信息:
             return await self._chat_without_tools(messages)
         
         # 转换工具为 OpenAI 格式
-        openai_tools = self._convert_tools_to_openai(tools)
+        openai_tools = self._get_openai_tools(tools)
         openai_messages = self._convert_messages_to_openai(messages)
         
         # 调用 LLM
@@ -1544,12 +1566,9 @@ Kubernetes 节点信息:
             # 确保内容不为空
             content = message.content or "抱歉，我没能生成有效的响应，请重试。"
             
-            # 规范化usage信息
-            usage_dict = self._simplify_usage(getattr(response, 'usage', None))
-            
-            return ProcessResult(
+            return self._build_result(
                 content=content,
-                usage=usage_dict
+                usage_obj=getattr(response, 'usage', None)
             )
         
         # 执行工具调用
@@ -1646,25 +1665,19 @@ Kubernetes 节点信息:
                 function_results
             )
             
-            # 规范化usage信息
-            usage_dict = self._simplify_usage(getattr(final_response, 'usage', None))
-            
-            return ProcessResult(
+            return self._build_result(
                 content=final_content,
                 function_calls=function_results,
-                usage=usage_dict
+                usage_obj=getattr(final_response, 'usage', None)
             )
         
         # 最终回退处理
         content = message.content or "工具调用完成"
         
-        # 规范化usage信息
-        usage_dict = self._simplify_usage(getattr(response, 'usage', None))
-        
-        return ProcessResult(
+        return self._build_result(
             content=content,
             function_calls=function_results,
-            usage=usage_dict
+            usage_obj=getattr(response, 'usage', None)
         )
     
     def _convert_messages_to_openai(self, messages: List[ChatMessage]) -> List[Dict[str, Any]]:
@@ -1689,6 +1702,22 @@ Kubernetes 节点信息:
         
         return result
     
+    def _rebuild_openai_tools_cache(self, tools) -> List[Dict[str, Any]]:
+        """根据当前MCP工具列表重建OpenAI格式工具缓存"""
+        self._openai_tools_cache = self._convert_tools_to_openai(tools)
+        self._openai_tools_cache_version = getattr(self.mcp_client, 'tools_version', None)
+        return self._openai_tools_cache
+    
+    def _get_openai_tools(self, tools) -> List[Dict[str, Any]]:
+        """获取OpenAI格式工具列表，工具列表未变化时直接返回缓存（调用方不得修改返回值）"""
+        tools_version = getattr(self.mcp_client, 'tools_version', None)
+        if tools_version is None:
+            # MCP客户端不提供版本号，无法判断工具列表是否变化
+            return self._convert_tools_to_openai(tools)
+        if self._openai_tools_cache is not None and self._openai_tools_cache_version == tools_version:
+            return self._openai_tools_cache
+        return self._rebuild_openai_tools_cache(tools)
+    
     def _convert_tools_to_openai(self, tools) -> List[Dict[str, Any]]:
         """转换 MCP 工具为 OpenAI 工具格式"""
         result = []
@@ -1717,64 +1746,89 @@ Kubernetes 节点信息:
                 
         return result
     
+    def _sync_schema_cache(self):
+        """MCP工具列表变化时清空schema清理缓存"""
+        tools_version = getattr(self.mcp_client, 'tools_version', None)
+        if tools_version != self._schema_cache_version or len(self._schema_cache) > self.MAX_SCHEMA_CACHE_SIZE:
+            self._schema_cache.clear()
+            self._schema_cache_version = tools_version
+    
     def _clean_schema_for_compatibility(self, schema: Dict[str, Any]) -> Dict[str, Any]:
-        """清理JSON schema以确保API兼容性"""
+        """清理JSON schema以确保API兼容性（按schema对象身份缓存结果）"""
         if not isinstance(schema, dict):
             return schema
         
+        self._sync_schema_cache()
+        cached = self._schema_cache.get(id(schema))
+        # 缓存中持有原始schema引用，身份比较可避免id复用导致的误命中
+        if cached is not None and cached[0] is schema:
+            return cached[1]
+        
+        cleaned = self._clean_schema_uncached(schema)
+        self._schema_cache[id(schema)] = (schema, cleaned)
+        return cleaned
+    
+    def _clean_schema_uncached(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        """清理JSON schema（不经过缓存）"""
         try:
-            cleaned = {}
-            for key, value in schema.items():
-                if key == "properties" and isinstance(value, dict):
-                    # 清理properties中的类型定义
-                    logger.debug(f"🔧 清理schema properties，包含 {len(value)} 个属性")
-                    cleaned[key] = {}
-                    for prop_name, prop_def in value.items():
-                        logger.debug(f"🔧 清理属性: {prop_name}")
-                        cleaned[key][prop_name] = self._clean_property_definition(prop_def, 0)
-                else:
-                    cleaned[key] = value
-            
-            return cleaned
+            properties = schema.get("properties")
+            if not isinstance(properties, dict):
+                return schema
+            
+            # 清理properties中的类型定义
+            logger.debug(f"🔧 清理schema properties，包含 {len(properties)} 个属性")
+            cleaned_properties = {}
+            for prop_name, prop_def in properties.items():
+                logger.debug(f"🔧 清理属性: {prop_name}")
+                _, cleaned_properties[prop_name] = self._clean_property_definition(prop_def, 0)
+            
+            return {**schema, "properties": cleaned_properties}
         except Exception as e:
             logger.error(f"❌ Schema清理失败: {e}")
             # 返回原始schema作为fallback
             return schema
     
-    def _clean_property_definition(self, prop_def: Dict[str, Any], _depth: int = 0) -> Dict[str, Any]:
-        """清理单个属性定义"""
+    def _clean_property_definition(self, prop_def: Dict[str, Any], _depth: int = 0) -> Tuple[bool, Dict[str, Any]]:
+        """
+        清理单个属性定义（写时复制）
+        
+        :return: (是否有修改, 清理后的定义)；未修改时直接返回原对象，调用方可复用引用
+        """
         if not isinstance(prop_def, dict):
-            return prop_def
+            return False, prop_def
         
         # 防止递归过深导致栈溢出
         if _depth > 10:
             logger.warning(f"🔧 Schema递归深度超过10层，停止处理")
-            return prop_def
+            return False, prop_def
         
-        cleaned = prop_def.copy()
+        overrides: Dict[str, Any] = {}
         
-        # 处理类型定义
-        if "type" in cleaned:
-            type_value = cleaned["type"]
-            if isinstance(type_value, list):
+        for key, value in prop_def.items():
+            if key == "type" and isinstance(value, list):
                 # 将数组类型转换为单一类型（选择第一个，通常是主要类型）
-                if type_value:
-                    old_type = type_value
-                    cleaned["type"] = type_value[0]
-                    logger.debug(f"🔧 转换数组类型 {old_type} 为 {type_value[0]}")
+                if value:
+                    overrides["type"] = value[0]
+                    logger.debug(f"🔧 转换数组类型 {value} 为 {value[0]}")
                 else:
-                    cleaned["type"] = "string"  # 默认为string
-        
-        # 递归处理嵌套的schema
-        for key, value in cleaned.items():
-            if key == "items" and isinstance(value, dict):
-                cleaned[key] = self._clean_property_definition(value, _depth + 1)
+                    overrides["type"] = "string"  # 默认为string
+            elif key == "items" and isinstance(value, dict):
+                # 递归处理嵌套的schema
+                changed, cleaned_items = self._clean_property_definition(value, _depth + 1)
+                if changed:
+                    overrides["items"] = cleaned_items
             elif key == "properties" and isinstance(value, dict):
-                cleaned[key] = {}
+                sub_overrides = {}
                 for sub_key, sub_value in value.items():
-                    cleaned[key][sub_key] = self._clean_property_definition(sub_value, _depth + 1)
-        
-        return cleaned
+                    changed, cleaned_sub = self._clean_property_definition(sub_value, _depth + 1)
+                    if changed:
+                        sub_overrides[sub_key] = cleaned_sub
+                if sub_overrides:
+                    overrides["properties"] = {**value, **sub_overrides}
+        
+        if not overrides:
+            return False, prop_def
+        return True, {**prop_def, **overrides}
     
     def _format_response_with_tools(
         self,
@@ -1801,7 +1855,7 @@ Kubernetes 节点信息:
                             items = result.result["items"]
                             formatted_content += f"📊 返回 {len(items)} 项结果\n"
                         else:
-                            result_str = json.dumps(result.result, ensure_ascii=False, indent=2)[:200]
+                            result_str = json_dumps(result.result, indent=True)[:200]
                             formatted_content += f"📋 结果: {result_str}...\n"
                     else:
                         formatted_content += f"📋 结果: {str(result.result)[:200]}...\n"
@@ -1842,47 +1896,33 @@ Kubernetes 节点信息:
                     if not items:
                         return "📭 未找到任何资源"
                     
-                    formatted = f"📦 找到 {len(items)} 个资源:\n\n"
+                    lines = [f"📦 找到 {len(items)} 个资源:\n\n"]
                     for item in items[:10]:  # 限制显示数量
                         # 安全地处理可能为None的item
-                        if item is not None and isinstance(item, dict):
-                            metadata = item.get("metadata", {})
-                            status = item.get("status", {})
-                            
-                            # 安全地获取名称
-                            name = "Unknown"
-                            if isinstance(metadata, dict):
-                                name = metadata.get("name", "Unknown")
-                            elif "name" in item:
-                                name = item.get("name", "Unknown")
-                            
-                            # 安全地获取命名空间
-                            namespace = "default"
-                            if isinstance(metadata, dict):
-                                namespace = metadata.get("namespace", "default")
-                            elif "namespace" in item:
-                                namespace = item.get("namespace", "default")
-                            
-                            # 安全地获取状态
-                            phase = "Unknown"
-                            if isinstance(status, dict):
-                                phase = status.get("phase", "Unknown")
-                            elif "phase" in item:
-                                phase = item.get("phase", "Unknown")
-                            elif "status" in item:
-                                phase = item.get("status", "Unknown")
-                            
-                            formatted += f"• **{name}**\n"
-                            formatted += f"  命名空间: {namespace}\n"
-                            formatted += f"  状态: {phase}\n\n"
+                        if not isinstance(item, dict):
+                            lines.append(f"• **无效资源项**\n  数据: {str(item)[:50]}...\n\n")
+                            continue
+                        
+                        get = item.get
+                        metadata = get("metadata")
+                        if not isinstance(metadata, dict):
+                            metadata = {}
+                        status = get("status")
+                        if isinstance(status, dict):
+                            phase = status.get("phase") or get("phase") or "Unknown"
                         else:
-                            formatted += f"• **无效资源项**\n"
-                            formatted += f"  数据: {str(item)[:50]}...\n\n"
+                            # 部分工具直接以字符串形式返回status
+                            phase = get("phase") or status or "Unknown"
+                        
+                        name = metadata.get("name") or get("name") or "Unknown"
+                        namespace = metadata.get("namespace") or get("namespace") or "default"
+                        
+                        lines.append(f"• **{name}**\n  命名空间: {namespace}\n  状态: {phase}\n\n")
                     
                     if len(items) > 10:
-                        formatted += f"... 还有 {len(items) - 10} 个资源\n"
+                        lines.append(f"... 还有 {len(items) - 10} 个资源\n")
                     
-                    return formatted
+                    return "".join(lines)
                 
                 elif "pod_name" in result and "content" in result:
                     # 日志格式
@@ -1899,7 +1939,7 @@ Kubernetes 节点信息:
                 else:
                     # 通用字典格式
                     try:
-                        return f"📄 结果:\n```json\n{json.dumps(result, ensure_ascii=False, indent=2)}\n```"
+                        return f"📄 结果:\n```json\n{json_dumps(result, indent=True, default=None)}\n```"
                     except Exception as json_error:
                         return f"📄 结果:\n{str(result)}"
             
@@ -1913,29 +1953,32 @@ Kubernetes 节点信息:
             logger.error(f"格式化工具结果时出错: {e}")
             return f"📄 工具执行完成，结果类型: {type(result).__name__}"
 
-    def _simplify_usage(self, usage_obj: Any) -> Optional[Dict[str, int]]:
+    def _build_result(self, content: str, function_calls: Optional[List[FunctionCallResult]] = None,
+                      usage_obj: Any = None) -> ProcessResult:
+        """
+        构建带usage的处理结果
+        
+        content 和 function_calls 由处理器自身生成，usage 经 _simplify_usage 规范化为整数字段，
+        均为可信数据，因此用 model_construct 跳过校验；其他位置构造 ProcessResult 仍正常校验
+        """
+        return ProcessResult.model_construct(
+            content=content,
+            function_calls=function_calls,
+            usage=self._simplify_usage(usage_obj)
+        )
+    
+    def _simplify_usage(self, usage_obj: Any) -> Optional[Usage]:
         """将OpenAI/兼容提供商的usage结构简化为仅包含整数字段，避免Pydantic校验失败。"""
         try:
             if not usage_obj:
                 return None
-            # 先尝试model_dump
-            data = None
-            try:
-                data = usage_obj.model_dump()
-            except Exception:
-                # 回退到属性读取
-                data = {
-                    "prompt_tokens": getattr(usage_obj, 'prompt_tokens', None),
-                    "completion_tokens": getattr(usage_obj, 'completion_tokens', None),
-                    "total_tokens": getattr(usage_obj, 'total_tokens', None),
-                }
+            # 代理网关多直接返回dict，SDK对象则按属性读取，无需model_dump整个对象
+            is_dict = isinstance(usage_obj, dict)
             # 仅保留三类常用整数字段
-            simplified: Dict[str, int] = {}
+            simplified: Usage = {}
             for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
-                val = data.get(key) if isinstance(data, dict) else None
-                if isinstance(val, (int,)):
-                    simplified[key] = val
-                elif isinstance(val, float):
+                val = usage_obj.get(key) if is_dict else getattr(usage_obj, key, None)
+                if isinstance(val, (int, float)):
                     simplified[key] = int(val)
                 elif isinstance(val, dict):
                     # 有些提供商会把 details 放在对象里，这里尽量取常用字段
@@ -1944,4 +1987,4 @@ Kubernetes 节点信息:
                         simplified[key] = int(inner)
             return simplified or None
         except Exception:
-            return None
\ No newline at end of file
+            return None
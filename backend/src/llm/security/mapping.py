@@ -1,121 +1,208 @@
 """
 脱敏映射存储管理
 """
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import heapq
+import itertools
+import os
+import sys
 import threading
 import time
+import re
 from collections import defaultdict
 
+# 脱敏值格式识别
+_MASKED_IP_RE = re.compile(r'^\d+\.\d+\.[a-zA-Z0-9]+\.\d+$')
+_PLAIN_IP_RE = re.compile(r'^\d+\.\d+\.\d+\.\d+$')
+_MASKED_HOST_RE = re.compile(r'^host-\w+-+\d+$')
+
+
+class MappingEntry(NamedTuple):
+    """单条脱敏映射"""
+    original: str
+    masked: str
+    rule_name: str
+
+
 class MaskingMappingStore:
     """脱敏映射存储器 - 会话级别"""
     
+    # 按脱敏值前缀分桶的前缀长度，文本中不含该前缀的整桶映射可直接跳过
+    HEAD_SIZE = 2
+    
     def __init__(self, session_id: str = None):
         self.session_id = session_id or f"session_{int(time.time())}"
-        self.original_to_masked: Dict[str, str] = {}
-        self.masked_to_original: Dict[str, str] = {}
-        self.rule_mapping: Dict[str, str] = {}  # masked -> rule_name
-        self.lock = threading.RLock()
+        # 加密标识派生用的会话盐，避免相同的值在不同会话中得到相同的标识
+        self.token_salt = os.urandom(16)
+        # 以脱敏值为键的单一映射表，另维护 原始值 -> 脱敏值 的反向索引
+        self._entries: Dict[str, MappingEntry] = {}
+        self._masked_by_original: Dict[str, str] = {}
+        self._masked_by_head: Dict[str, List[str]] = defaultdict(list)
+        self.lock = threading.RLock()  # 仅保护写操作和快照重建
+        # 只读快照: (original_to_masked, masked_to_original, 前缀 -> 按长度降序的脱敏值)
+        # 写入时置为None，读取时按需重建；快照本身不可变，读操作无需加锁
+        self._snapshot: Optional[Tuple[Dict[str, str], Dict[str, str], Dict[str, Tuple[str, ...]]]] = None
         self.created_at = time.time()
         self.last_used = time.time()
     
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    @property
+    def mapping_count(self) -> int:
+        """当前映射数量"""
+        return len(self._entries)
+    
+    @property
+    def original_to_masked(self) -> Dict[str, str]:
+        """原始值 -> 脱敏值（只读视图，向后兼容）"""
+        return self._get_snapshot()[0]
+    
+    @property
+    def masked_to_original(self) -> Dict[str, str]:
+        """脱敏值 -> 原始值（只读视图，向后兼容）"""
+        return self._get_snapshot()[1]
+    
+    @property
+    def rule_mapping(self) -> Dict[str, str]:
+        """脱敏值 -> 规则名称（向后兼容）"""
+        return {masked: entry.rule_name for masked, entry in self._entries.items()}
+    
+    def _get_snapshot(self) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, Tuple[str, ...]]]:
+        """获取当前映射的只读快照，映射变化后首次读取时重建"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self.lock:
+                snapshot = self._snapshot
+                if snapshot is None:
+                    masked_to_original = {masked: entry.original for masked, entry in self._entries.items()}
+                    snapshot = (
+                        dict(self._masked_by_original),
+                        masked_to_original,
+                        {
+                            head: tuple(sorted(bucket, key=len, reverse=True))
+                            for head, bucket in self._masked_by_head.items()
+                        }
+                    )
+                    self._snapshot = snapshot
+        return snapshot
+    
     def add_mapping(self, original: str, masked: str, rule_name: str):
         """添加映射关系"""
+        # 脱敏值多为短token（如 10.0.cac9.79），驻留后字典查找可走身份比较
+        masked = sys.intern(masked)
         with self.lock:
-            self.original_to_masked[original] = masked
-            self.masked_to_original[masked] = original
-            self.rule_mapping[masked] = rule_name
+            if masked not in self._entries:
+                self._masked_by_head[masked[:self.HEAD_SIZE]].append(masked)
+            self._entries[masked] = MappingEntry(original, masked, rule_name)
+            self._masked_by_original[original] = masked
+            self._snapshot = None
             self.last_used = time.time()
     
+    # 单键查询直接读取实时字典（dict的单次读取在GIL下是原子的），
+    # 避免与add_mapping交替调用时反复重建快照
+    
     def get_original(self, masked: str) -> Optional[str]:
         """获取原始值"""
-        with self.lock:
-            self.last_used = time.time()
-            return self.masked_to_original.get(masked)
+        self.last_used = time.time()
+        entry = self._entries.get(masked)
+        return entry.original if entry is not None else None
     
     def get_masked(self, original: str) -> Optional[str]:
         """获取脱敏值"""
-        with self.lock:
-            self.last_used = time.time()
-            return self.original_to_masked.get(original)
+        self.last_used = time.time()
+        return self._masked_by_original.get(original)
     
     def is_masked(self, value: str) -> bool:
-        """检查是否为脱敏值"""
-        with self.lock:
-            return value in self.masked_to_original
+        """检查是否为脱敏值 - O(1) 哈希查找"""
+        return value in self._entries
     
     def restore_text(self, text: str) -> str:
         """恢复文本中的脱敏信息 - 改进版，支持更准确的恢复"""
-        with self.lock:
-            self.last_used = time.time()
-            restored_text = text
-            
-            # 按照脱敏值长度降序排列，避免部分匹配问题
-            sorted_masked = sorted(self.masked_to_original.keys(), 
-                                 key=len, reverse=True)
-            
-            # 记录恢复操作
-            restore_count = 0
-            
-            from loguru import logger
-            logger.info(f"🔓 开始恢复脱敏信息，可用映射: {len(sorted_masked)} 个")
-            logger.info(f"📝 当前待恢复文本片段: '{text[:200]}...'")
-            for i, masked_value in enumerate(sorted_masked):
-                logger.info(f"  映射#{i+1}: '{masked_value}' → '{self.masked_to_original[masked_value]}'")
+        # 基于快照读取，不持有锁，多个流式响应可并发恢复
+        _, masked_to_original, masked_by_head = self._get_snapshot()
+        self.last_used = time.time()
+        restored_text = text
+        
+        from loguru import logger
+        
+        # 只保留前缀出现在文本中的分桶，流式片段通常一个都不包含，可直接返回
+        candidate_buckets = [bucket for head, bucket in masked_by_head.items() if head in text]
+        if not candidate_buckets:
+            logger.debug("💭 无脱敏内容需要恢复")
+            return restored_text
+        
+        # 按照脱敏值长度降序排列，避免部分匹配问题
+        if len(candidate_buckets) == 1:
+            sorted_masked = candidate_buckets[0]
+        else:
+            sorted_masked = sorted(
+                (masked for bucket in candidate_buckets for masked in bucket),
+                key=len, reverse=True
+            )
+        
+        # 记录恢复操作
+        restore_count = 0
+        
+        logger.info(f"🔓 开始恢复脱敏信息，可用映射: {len(masked_to_original)} 个，候选: {len(sorted_masked)} 个")
+        logger.info(f"📝 当前待恢复文本片段: '{text[:200]}...'")
+        for i, masked_value in enumerate(sorted_masked):
+            logger.info(f"  映射#{i+1}: '{masked_value}' → '{masked_to_original[masked_value]}'")
+        
+        for masked_value in sorted_masked:
+            original_value = masked_to_original[masked_value]
             
-            for masked_value in sorted_masked:
-                original_value = self.masked_to_original[masked_value]
+            # 检查是否存在该脱敏值
+            if masked_value in restored_text:
+                logger.info(f"🔍 在文本中找到脱敏值: '{masked_value}'")
                 
-                # 检查是否存在该脱敏值
-                if masked_value in restored_text:
-                    logger.info(f"🔍 在文本中找到脱敏值: '{masked_value}'")
-                    
-                    # 使用更精确的替换策略
-                    import re
-                    escaped_masked = re.escape(masked_value)
-                    
-                    # 根据脱敏值的格式选择合适的匹配模式
-                    if re.match(r'^\d+\.\d+\.[a-zA-Z0-9]+\.\d+$', masked_value):
-                        # 脱敏IP地址格式（如：10.0.cac9.79, 10.0.c9aa.80）
-                        pattern = escaped_masked
-                        logger.debug(f"🌐 使用脱敏IP地址模式恢复: {pattern}")
-                    elif re.match(r'^\d+\.\d+\.\d+\.\d+$', masked_value):
-                        # 标准IP地址格式（如：192.168.1.100）
-                        pattern = escaped_masked
-                        logger.debug(f"🌐 使用标准IP地址模式恢复: {pattern}")
-                    elif re.match(r'^host-\w+-+\d+$', masked_value):
-                        # 主机名格式（如：host-abc123--001）
-                        pattern = r'\b' + escaped_masked + r'\b'
-                        logger.debug(f"🖥️ 使用主机名模式恢复: {pattern}")
-                    else:
-                        # 通用格式，使用直接替换
-                        pattern = escaped_masked
-                        logger.debug(f"🔧 使用通用模式恢复: {pattern}")
-                    
-                    new_text = re.sub(pattern, original_value, restored_text)
-                    if new_text != restored_text:
-                        restore_count += 1
-                        restored_text = new_text
-                        logger.info(f"✅ 恢复成功: '{masked_value}' → '{original_value}'")
-                    else:
-                        logger.warning(f"⚠️ 恢复失败，未找到匹配项: '{masked_value}' (使用模式: {pattern})")
+                # 使用更精确的替换策略
+                escaped_masked = re.escape(masked_value)
+                
+                # 根据脱敏值的格式选择合适的匹配模式
+                if _MASKED_IP_RE.match(masked_value):
+                    # 脱敏IP地址格式（如：10.0.cac9.79, 10.0.c9aa.80）
+                    pattern = escaped_masked
+                    logger.debug(f"🌐 使用脱敏IP地址模式恢复: {pattern}")
+                elif _PLAIN_IP_RE.match(masked_value):
+                    # 标准IP地址格式（如：192.168.1.100）
+                    pattern = escaped_masked
+                    logger.debug(f"🌐 使用标准IP地址模式恢复: {pattern}")
+                elif _MASKED_HOST_RE.match(masked_value):
+                    # 主机名格式（如：host-abc123--001）
+                    pattern = r'\b' + escaped_masked + r'\b'
+                    logger.debug(f"🖥️ 使用主机名模式恢复: {pattern}")
                 else:
-                    logger.debug(f"⏭️ 文本中未找到脱敏值: '{masked_value}'")
-            
-            if restore_count > 0:
-                logger.info(f"🔓 成功恢复 {restore_count} 个脱敏值")
+                    # 通用格式，使用直接替换
+                    pattern = escaped_masked
+                    logger.debug(f"🔧 使用通用模式恢复: {pattern}")
+                
+                new_text = re.sub(pattern, original_value, restored_text)
+                if new_text != restored_text:
+                    restore_count += 1
+                    restored_text = new_text
+                    logger.info(f"✅ 恢复成功: '{masked_value}' → '{original_value}'")
+                else:
+                    logger.warning(f"⚠️ 恢复失败，未找到匹配项: '{masked_value}' (使用模式: {pattern})")
             else:
-                logger.debug("💭 无脱敏内容需要恢复")
-            
-            return restored_text
+                logger.debug(f"⏭️ 文本中未找到脱敏值: '{masked_value}'")
+        
+        if restore_count > 0:
+            logger.info(f"🔓 成功恢复 {restore_count} 个脱敏值")
+        else:
+            logger.debug("💭 无脱敏内容需要恢复")
+        
+        return restored_text
     
     def cleanup_expired(self, max_age_seconds: int = 3600):
         """清理过期的映射"""
         with self.lock:
             current_time = time.time()
             if current_time - self.last_used > max_age_seconds:
-                self.original_to_masked.clear()
-                self.masked_to_original.clear()
-                self.rule_mapping.clear()
+                self._entries.clear()
+                self._masked_by_original.clear()
+                self._masked_by_head.clear()
+                self._snapshot = None
                 return True
         return False
 
@@ -125,12 +212,21 @@ class SessionMappingManager:
     def __init__(self):
         self.sessions: Dict[str, MaskingMappingStore] = {}
         self.lock = threading.RLock()
+        # 过期检查最小堆: (last_used, session_id, 会话代数)，条目可能过时，清理时再以会话实际last_used为准
+        self._expiry_heap: List[Tuple[float, str, int]] = []
+        # session_id -> 当前会话的代数；会话被删除后以同一ID重建时代数变化，旧会话的堆条目据此丢弃
+        self._session_generations: Dict[str, int] = {}
+        self._generation_counter = itertools.count()
     
     def get_session_store(self, session_id: str) -> MaskingMappingStore:
         """获取或创建会话存储"""
         with self.lock:
             if session_id not in self.sessions:
-                self.sessions[session_id] = MaskingMappingStore(session_id)
+                store = MaskingMappingStore(session_id)
+                self.sessions[session_id] = store
+                generation = next(self._generation_counter)
+                self._session_generations[session_id] = generation
+                heapq.heappush(self._expiry_heap, (store.last_used, session_id, generation))
             return self.sessions[session_id]
     
     def get_session(self, session_id: str) -> MaskingMappingStore:
@@ -138,12 +234,23 @@ class SessionMappingManager:
         return self.get_session_store(session_id)
     
     def cleanup_expired_sessions(self, max_age_seconds: int = 3600):
-        """清理过期会话"""
+        """清理过期会话 - 只检查堆顶最久未使用的会话，复杂度 O(k log N)"""
         with self.lock:
-            expired_sessions = []
-            for session_id, store in self.sessions.items():
+            threshold = time.time() - max_age_seconds
+            heap = self._expiry_heap
+            while heap and heap[0][0] < threshold:
+                _, session_id, generation = heapq.heappop(heap)
+                if self._session_generations.get(session_id) != generation:
+                    # 条目属于已被删除并重建的旧会话，丢弃
+                    continue
+                store = self.sessions.get(session_id)
+                if store is None:
+                    # 会话已被其他途径删除，丢弃过时条目
+                    del self._session_generations[session_id]
+                    continue
                 if store.cleanup_expired(max_age_seconds):
-                    expired_sessions.append(session_id)
-            
-            for session_id in expired_sessions:
-                del self.sessions[session_id] 
\ No newline at end of file
+                    del self.sessions[session_id]
+                    del self._session_generations[session_id]
+                else:
+                    # 会话在入堆后被使用过，按最新的last_used重新入堆
+                    heapq.heappush(heap, (store.last_used, session_id, generation))
@@ -2,13 +2,20 @@
 核心脱敏引擎
 """
 from typing import Any, List, Dict
-import json
+import asyncio
 import time
 from loguru import logger
+from ...utils.json_utils import dumps as json_dumps
 from .rules import SensitiveDataRules
 from .mapping import SessionMappingManager, MaskingMappingStore
 from .config import MaskingConfig
 
+
+def _preview(text: str, limit: int = 500) -> str:
+    """截取日志预览，超长时追加省略号"""
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
 class DataMasker:
     """数据脱敏器"""
     
@@ -20,40 +27,43 @@ class DataMasker:
         
         logger.info(f"🔒 数据脱敏器初始化完成，状态: {'启用' if self.enabled else '禁用'}")
     
-    def mask_tool_results(self, tool_results: List[Any], session_id: str) -> List[Any]:
-        """脱敏工具结果 - 在第二阶段LLM调用前执行"""
+    async def mask_tool_results(self, tool_results: List[Any], session_id: str) -> List[Any]:
+        """脱敏工具结果 - 在第二阶段LLM调用前执行，多个结果在线程池中并行脱敏"""
         if not self.enabled:
             logger.debug("脱敏功能已禁用，跳过脱敏处理")
             return tool_results
         
         try:
             session_store = self.session_manager.get_session_store(session_id)
-            masked_results = []
             
             logger.info(f"🔒 开始脱敏工具结果，会话ID: {session_id}")
             
-            for i, result in enumerate(tool_results):
-                if result is not None:
-                    # 记录原始数据
-                    original_json = json.dumps(result, ensure_ascii=False, default=str)
-                    logger.info(f"📋 原始工具结果 #{i+1} (长度: {len(original_json)}):")
-                    logger.info(f"   {original_json[:500]}{'...' if len(original_json) > 500 else ''}")
-                    
-                    # 执行脱敏
-                    masked_result = self.rules.apply_rules(result, session_store)
-                    masked_json = json.dumps(masked_result, ensure_ascii=False, default=str)
-                    
-                    # 记录脱敏后数据
-                    logger.warning(f"🔒 脱敏后工具结果 #{i+1} (长度: {len(masked_json)}):")
-                    logger.warning(f"   {masked_json[:500]}{'...' if len(masked_json) > 500 else ''}")
-                    
-                    masked_results.append(masked_result)
-                    
-                    # 统计脱敏信息
-                    mapping_count = len(session_store.original_to_masked)
-                    logger.info(f"   已建立 {mapping_count} 个脱敏映射")
-                else:
-                    masked_results.append(result)
+            # 规则匹配和AES加密均为CPU密集操作，放到线程池中执行避免阻塞事件循环；
+            # 映射写入由 MaskingMappingStore 的锁保证线程安全
+            pending = [
+                (i, asyncio.to_thread(self.rules.apply_rules, result, session_store))
+                for i, result in enumerate(tool_results)
+                if result is not None
+            ]
+            masked_values = await asyncio.gather(*(task for _, task in pending))
+            
+            masked_results = list(tool_results)
+            for (i, _), masked_result in zip(pending, masked_values):
+                # 记录原始数据
+                original_json = json_dumps(tool_results[i])
+                logger.info(f"📋 原始工具结果 #{i+1} (长度: {len(original_json)}):")
+                logger.info(f"   {_preview(original_json)}")
+                
+                masked_json = json_dumps(masked_result)
+                
+                # 记录脱敏后数据
+                logger.warning(f"🔒 脱敏后工具结果 #{i+1} (长度: {len(masked_json)}):")
+                logger.warning(f"   {_preview(masked_json)}")
+                
+                masked_results[i] = masked_result
+            
+            # 统计脱敏信息
+            logger.info(f"   已建立 {session_store.mapping_count} 个脱敏映射")
             
             logger.success(f"✅ 工具结果脱敏完成，处理了 {len(tool_results)} 个结果")
             return masked_results
@@ -71,7 +81,7 @@ class DataMasker:
             session_store = self.session_manager.get_session_store(session_id)
             
             # 只有当有映射关系时才进行恢复
-            if not session_store.masked_to_original:
+            if not session_store.mapping_count:
                 return response_text
             
             # 记录恢复前的响应
@@ -82,7 +92,7 @@ class DataMasker:
             
             # 检查是否有恢复操作
             if restored_text != response_text:
-                mapping_count = len(session_store.masked_to_original)
+                mapping_count = session_store.mapping_count
                 logger.info(f"🔓 响应已恢复，当前有 {mapping_count} 个脱敏映射可用")
                 
                 if self.config.debug_logging:
@@ -102,7 +112,7 @@ class DataMasker:
             
             session_store = self.session_manager.sessions[session_id]
             return {
-                "mapping_count": len(session_store.original_to_masked),
+                "mapping_count": session_store.mapping_count,
                 "session_exists": True,
                 "created_at": session_store.created_at,
                 "last_used": session_store.last_used
@@ -115,7 +125,7 @@ class DataMasker:
         """清理会话数据"""
         try:
             if session_id in self.session_manager.sessions:
-                mapping_count = len(self.session_manager.sessions[session_id].original_to_masked)
+                mapping_count = self.session_manager.sessions[session_id].mapping_count
                 del self.session_manager.sessions[session_id]
                 logger.info(f"🧹 会话 {session_id} 的脱敏数据已清理，清理了 {mapping_count} 个映射")
         except Exception as e:
@@ -127,7 +137,7 @@ class DataMasker:
             session_store = self.session_manager.get_session_store(session_id)
             return {
                 "session_id": session_id,
-                "mapping_count": len(session_store.original_to_masked),
+                "mapping_count": session_store.mapping_count,
                 "created_at": session_store.created_at,
                 "last_used": session_store.last_used,
                 "age_seconds": time.time() - session_store.created_at
@@ -4,20 +4,81 @@
 import re
 import hashlib
 import base64
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, NamedTuple, Optional, Tuple, Any
 from Crypto.Cipher import AES
 from Crypto.Random import get_random_bytes
 import uuid
+from loguru import logger
 from .surname_dict import SurnameDict
 
+# 姓氏词典不含可变状态，所有规则集共享同一实例
+_SHARED_SURNAME_DICT = SurnameDict()
+
+# 主机名末尾的数字编号
+_SUFFIX_RE = re.compile(r'-(\d+)$')
+
+# 所有规则都至少需要数字、@ 或中文字符之一，不含这些字符的字符串可直接跳过
+# 数字使用与各规则相同的 \d（含全角等Unicode数字），避免预筛选漏掉规则能匹配的文本
+_MAYBE_SENSITIVE_RE = re.compile(r'[\d@\u4e00-\u9fff]')
+
+# 姓名掩码表：下标为被替换的字符数；识别出的姓名最长4个字符，整体替换时最多4个x
+_X_MASKS = ("", "x", "xx", "xxx", "xxxx")
+
+# 加密标识使用的密文字节数：6字节经base64编码恰好为8个字符，无填充
+_ENCRYPTED_ID_BYTES = 6
+
+# 映射后的网段前缀
+_MAPPED_NETWORK_PREFIX = "10.0."
+
+
+def _last_octet(ip: str) -> str:
+    """取IPv4地址最后一段（保持原始写法，如前导零）"""
+    return ip.rpartition('.')[2]
+
+
+class MaskingRule(NamedTuple):
+    """预解析的脱敏规则，匹配循环中按属性读取参数，默认值与各策略原有默认值一致"""
+    name: str
+    strategy: str
+    pattern: Optional[str] = None
+    template: str = "host-{hash}-{suffix}"
+    preserve_last_octet: bool = False
+    use_unique_mapping: bool = False
+    mask_pattern: str = "***"
+    preserve_prefix: int = 3
+    preserve_suffix: int = 4
+    replacement_template: str = "Encrypted_{id}"
+    mask_local_part: bool = False
+    preserve_first: bool = True
+    use_surname_dict: bool = False
+    
+    @classmethod
+    def from_config(cls, name: str, config: Dict[str, Any]) -> 'MaskingRule':
+        """由规则配置字典构建，未知的配置项忽略"""
+        return cls(name=name, **{k: v for k, v in config.items() if k in cls._fields and k != "name"})
+
+
+# 可选依赖：google-re2 线性时间多模式匹配，用于一次扫描判断哪些规则可能命中
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    re2 = None
+    RE2_AVAILABLE = False
+
 class SensitiveDataRules:
     """敏感数据脱敏规则集"""
     
+    # 不保留任何地址信息时的固定映射值
+    MAPPED_NETWORK_ANONYMOUS = "10.0.x.x"
+    
     def __init__(self, encryption_key: bytes = None):
         self.encryption_key = encryption_key or get_random_bytes(32)
+        # 长生命周期的AES上下文，避免每次加密重新初始化密钥扩展
+        self._prf_cipher = AES.new(self.encryption_key, AES.MODE_ECB)
         
         # 初始化姓氏词典
-        self.surname_dict = SurnameDict()
+        self.surname_dict = _SHARED_SURNAME_DICT
         
         # 定义各种敏感信息的匹配规则
         self.rules = {
@@ -50,184 +111,255 @@ class SensitiveDataRules:
                 "mask_local_part": True
             }
         }
+        
+        # 规则名 -> 预解析的规则记录
+        self._rule_records: Dict[str, MaskingRule] = {
+            name: MaskingRule.from_config(name, config) for name, config in self.rules.items()
+        }
+        
+        # 脱敏策略分发表
+        self._strategy_handlers = {
+            "format_preserve_hash": self._format_preserve_hash,
+            "network_mapping": self._network_mapping,
+            "partial_mask_encrypt": self._partial_mask_encrypt,
+            "full_encrypt": self._full_encrypt,
+            "domain_preserve": self._domain_preserve,
+            "name_mask": self._name_mask,
+        }
+        
+        # 基于正则的规则及其RE2预筛选集合
+        self._regex_rule_names = [
+            name for name, rule in self._rule_records.items()
+            if name != "chinese_name" and rule.pattern
+        ]
+        self._rule_prefilter = self._build_rule_prefilter()
+        # 规则名 -> (预编译正则, 规则记录, 策略函数)，在初始化时一次解析，匹配循环中只做一次字典查找
+        self._regex_rule_dispatch = {
+            name: (
+                re.compile(self._rule_records[name].pattern),
+                self._rule_records[name],
+                self._strategy_handlers.get(self._rule_records[name].strategy)
+            )
+            for name in self._regex_rule_names
+        }
+    
+    def _build_rule_prefilter(self):
+        """将所有正则规则编译为一个RE2集合，一次线性扫描即可得知命中的规则"""
+        if not RE2_AVAILABLE:
+            return None
+        try:
+            rule_set = re2.Set.SearchSet()
+            for name in self._regex_rule_names:
+                rule_set.Add(self._rule_records[name].pattern)
+            rule_set.Compile()
+            return rule_set
+        except Exception:
+            return None
     
-    def apply_rules(self, data: Any, mapping_store: 'MaskingMappingStore') -> Any:
+    def _rules_to_apply(self, text: str) -> List[str]:
+        """返回可能命中的正则规则名（保持规则定义顺序）"""
+        # RE2的 \b、\d、\w 仅支持ASCII语义，与Python的Unicode语义不同，
+        # 因此只对纯ASCII文本做预筛选，其余文本按原逻辑逐条规则处理
+        if self._rule_prefilter is None or not text.isascii():
+            return self._regex_rule_names
+        matched = self._rule_prefilter.Match(text)
+        if not matched:
+            return []
+        return [self._regex_rule_names[i] for i in sorted(matched)]
+    
+    def apply_rules(self, data: Any, mapping_store: 'MaskingMappingStore',
+                    _cache: Dict[Tuple[str, str], str] = None) -> Any:
         """对数据应用所有脱敏规则"""
+        if _cache is None:
+            # 单次调用内的脱敏结果缓存: (规则名, 原始值) -> 脱敏值，重复出现的值只计算一次
+            _cache = {}
         if isinstance(data, dict):
-            return {k: self.apply_rules(v, mapping_store) for k, v in data.items()}
+            return {k: self.apply_rules(v, mapping_store, _cache) for k, v in data.items()}
         elif isinstance(data, list):
-            return [self.apply_rules(item, mapping_store) for item in data]
+            return [self.apply_rules(item, mapping_store, _cache) for item in data]
         elif isinstance(data, str):
-            return self._mask_string(data, mapping_store)
+            # 快速跳过：最短的敏感值（两字姓名）也有2个字符
+            if len(data) < 2 or not _MAYBE_SENSITIVE_RE.search(data):
+                return data
+            return self._mask_string(data, mapping_store, _cache)
         else:
             return data
     
-    def _mask_string(self, text: str, mapping_store: 'MaskingMappingStore') -> str:
+    def _mask_string(self, text: str, mapping_store: 'MaskingMappingStore',
+                     cache: Dict[Tuple[str, str], str] = None) -> str:
         """对字符串应用脱敏规则"""
-        from loguru import logger
-        
-        logger.error(f"🔍 开始脱敏字符串: '{text[:200]}...'")
         masked_text = text
         total_replacements = 0
+        if cache is None:
+            cache = {}
+        is_masked = mapping_store.is_masked
+        # 加密标识按会话加盐派生，同一值在不同会话中得到不同标识
+        token_salt = mapping_store.token_salt
         
         # 先处理基于词典的姓名脱敏
-        chinese_name_rule = self.rules.get("chinese_name")
-        if chinese_name_rule and chinese_name_rule["strategy"] == "name_mask_dict":
+        chinese_name_rule = self._rule_records.get("chinese_name")
+        if chinese_name_rule and chinese_name_rule.strategy == "name_mask_dict":
             names_found = self.surname_dict.find_names_in_text(masked_text)
-            logger.error(f"📋 词典匹配找到 {len(names_found)} 个姓名:")
             
-            # 从后向前替换，避免位置偏移
-            for name, start, end in reversed(names_found):
-                logger.error(f"   匹配项: '{name}' (位置: {start}-{end})")
-                
+            # 按位置顺序拼接片段，整段文本只复制一次
+            parts = []
+            cursor = 0
+            for name, start, end in names_found:
                 # 检查是否已经脱敏过
-                if mapping_store.is_masked(name):
-                    logger.error(f"⏭️ 跳过已脱敏项: '{name}'")
+                if is_masked(name):
+                    logger.debug("⏭️ 跳过已脱敏项: '{}'", name)
                     continue
                 
-                # 进行姓名脱敏
-                masked = self._name_mask(name, chinese_name_rule)
+                # 进行姓名脱敏（同一姓名只计算并存储一次映射）
+                cache_key = ("chinese_name", name)
+                masked = cache.get(cache_key)
+                if masked is None:
+                    masked = self._name_mask(name, chinese_name_rule)
+                    cache[cache_key] = masked
+                    # 存储映射关系
+                    mapping_store.add_mapping(name, masked, "chinese_name")
+                    logger.debug("✅ 脱敏完成: '{}' → '{}' (规则: chinese_name)", name, masked)
                 
                 # 替换文本
-                masked_text = masked_text[:start] + masked + masked_text[end:]
-                
-                # 存储映射关系
-                mapping_store.add_mapping(name, masked, "chinese_name")
+                parts.append(masked_text[cursor:start])
+                parts.append(masked)
+                cursor = end
                 total_replacements += 1
-                logger.error(f"✅ 脱敏完成: '{name}' → '{masked}' (规则: chinese_name)")
-        
-        # 处理其他基于正则表达式的规则
-        for rule_name, rule_config in self.rules.items():
-            if rule_name == "chinese_name":
-                continue  # 已经处理过了
-                
-            pattern = rule_config.get("pattern")
-            if not pattern:
-                continue
-                
-            strategy = rule_config["strategy"]
-            
-            # 先检查是否有匹配
-            matches = list(re.finditer(pattern, masked_text))
-            logger.error(f"📋 规则 '{rule_name}' 匹配了 {len(matches)} 项:")
-            for match in matches:
-                logger.error(f"   匹配项: '{match.group(0)}' (位置: {match.start()}-{match.end()})")
             
-            def replace_match(match):
-                nonlocal total_replacements
-                original = match.group(0)
+            if parts:
+                parts.append(masked_text[cursor:])
+                masked_text = "".join(parts)
+        
+        # 处理其他基于正则表达式的规则（chinese_name 已经处理过了）
+        # 规则按定义顺序逐条应用，后面的规则会扫描前面规则的替换结果：
+        # 主机名脱敏保留的数字后缀中若含有手机号、IP等，仍会被后续规则脱敏，因此不能合并为一次交替扫描
+        # 每条规则用 finditer 遍历匹配并按位置拼接片段，不再为每次调用创建 re.sub 回调闭包
+        for rule_name in self._rules_to_apply(masked_text):
+            compiled, rule, handler = self._regex_rule_dispatch[rule_name]
+            parts = []
+            cursor = 0
+            for match in compiled.finditer(masked_text):
+                original = match.group()
                 
                 # 检查是否已经脱敏过
-                if mapping_store.is_masked(original):
-                    logger.error(f"⏭️ 跳过已脱敏项: '{original}'")
-                    return original
+                if is_masked(original):
+                    logger.debug("⏭️ 跳过已脱敏项: '{}'", original)
+                    continue
                 
-                # 根据策略进行脱敏
-                if strategy == "format_preserve_hash":
-                    masked = self._format_preserve_hash(original, rule_config)
-                elif strategy == "network_mapping":
-                    masked = self._network_mapping(original, rule_config)
-                elif strategy == "partial_mask_encrypt":
-                    masked = self._partial_mask_encrypt(original, rule_config)
-                elif strategy == "full_encrypt":
-                    masked = self._full_encrypt(original, rule_config)
-                elif strategy == "domain_preserve":
-                    masked = self._domain_preserve(original, rule_config)
-                elif strategy == "name_mask":
-                    masked = self._name_mask(original, rule_config)
-                else:
-                    masked = f"***{rule_name}***"
+                # 同一值已在本次调用中脱敏过，直接复用，避免重复哈希/加密
+                cache_key = (rule_name, original)
+                masked = cache.get(cache_key)
+                if masked is None:
+                    # 根据策略进行脱敏
+                    if handler is not None:
+                        masked = handler(original, rule, token_salt)
+                    else:
+                        masked = f"***{rule_name}***"
+                    cache[cache_key] = masked
+                    
+                    # 存储映射关系
+                    mapping_store.add_mapping(original, masked, rule_name)
+                    logger.debug("✅ 脱敏完成: '{}' → '{}' (规则: {})", original, masked, rule_name)
                 
-                # 存储映射关系
-                mapping_store.add_mapping(original, masked, rule_name)
+                start, end = match.span()
+                parts.append(masked_text[cursor:start])
+                parts.append(masked)
+                cursor = end
                 total_replacements += 1
-                logger.error(f"✅ 脱敏完成: '{original}' → '{masked}' (规则: {rule_name})")
-                return masked
             
-            masked_text = re.sub(pattern, replace_match, masked_text)
+            if parts:
+                parts.append(masked_text[cursor:])
+                masked_text = "".join(parts)
         
-        logger.error(f"📊 脱敏完成: 总共替换了 {total_replacements} 项")
-        logger.error(f"🔒 最终脱敏结果: '{masked_text[:200]}...'")
+        if total_replacements:
+            logger.opt(lazy=True).debug(
+                "📊 脱敏完成: 总共替换了 {} 项，结果: '{}...'",
+                lambda: total_replacements, lambda: masked_text[:200]
+            )
         return masked_text
     
-    def _format_preserve_hash(self, value: str, config: Dict) -> str:
+    def _format_preserve_hash(self, value: str, rule: MaskingRule, salt: bytes = b"") -> str:
         """格式保持的哈希脱敏"""
-        hash_obj = hashlib.md5(value.encode()).hexdigest()[:8]
+        hash_obj = hashlib.blake2b(value.encode(), digest_size=4).hexdigest()
         
         # 提取后缀（如数字编号）
-        suffix_match = re.search(r'-(\d+)$', value)
+        suffix_match = _SUFFIX_RE.search(value)
         suffix = f"-{suffix_match.group(1)}" if suffix_match else ""
         
-        template = config.get("template", "host-{hash}-{suffix}")
-        return template.format(hash=hash_obj, suffix=suffix)
+        return rule.template.format(hash=hash_obj, suffix=suffix)
     
-    def _network_mapping(self, ip: str, config: Dict) -> str:
+    def _network_mapping(self, ip: str, rule: MaskingRule, salt: bytes = b"") -> str:
         """网络地址映射 - 改进版，使用唯一映射避免恢复冲突"""
-        parts = ip.split('.')
-        
-        if config.get("use_unique_mapping", False):
+        if rule.use_unique_mapping:
             # 生成基于原IP的唯一标识符
-            hash_obj = hashlib.md5(ip.encode()).hexdigest()[:4]
+            hash_obj = hashlib.blake2b(ip.encode(), digest_size=2).hexdigest()
             
-            if config.get("preserve_last_octet"):
+            if rule.preserve_last_octet:
                 # 格式: 10.0.{hash}.{last_octet}
-                return f"10.0.{hash_obj}.{parts[-1]}"
+                return _MAPPED_NETWORK_PREFIX + hash_obj + "." + _last_octet(ip)
             else:
                 # 格式: 10.0.{hash}.x
-                return f"10.0.{hash_obj}.x"
+                return _MAPPED_NETWORK_PREFIX + hash_obj + ".x"
         else:
             # 原有的简单映射方式
-            if config.get("preserve_last_octet"):
-                return f"10.0.x.{parts[-1]}"
+            if rule.preserve_last_octet:
+                return "10.0.x." + _last_octet(ip)
             else:
-                return "10.0.x.x"
+                return self.MAPPED_NETWORK_ANONYMOUS
     
-    def _partial_mask_encrypt(self, value: str, config: Dict) -> str:
+    def _partial_mask_encrypt(self, value: str, rule: MaskingRule, salt: bytes = b"") -> str:
         """部分掩码加密"""
-        prefix_len = config.get("preserve_prefix", 3)
-        suffix_len = config.get("preserve_suffix", 4)
-        mask_pattern = config.get("mask_pattern", "***")
+        prefix_len = rule.preserve_prefix
+        suffix_len = rule.preserve_suffix
+        mask_pattern = rule.mask_pattern
         
         if len(value) <= prefix_len + suffix_len:
             # 值太短，完全加密
-            encrypted = self._encrypt_value(value)
-            return f"{mask_pattern}_enc_{encrypted[:8]}"
+            encrypted = self._encrypt_value(value, salt)
+            return f"{mask_pattern}_enc_{encrypted}"
         
         prefix = value[:prefix_len]
         suffix = value[-suffix_len:]
-        encrypted = self._encrypt_value(value)
+        encrypted = self._encrypt_value(value, salt)
         
-        return f"{prefix}{mask_pattern}{suffix}_enc_{encrypted[:8]}"
+        return f"{prefix}{mask_pattern}{suffix}_enc_{encrypted}"
     
-    def _full_encrypt(self, value: str, config: Dict) -> str:
+    def _full_encrypt(self, value: str, rule: MaskingRule, salt: bytes = b"") -> str:
         """完全加密"""
-        encrypted = self._encrypt_value(value)
-        template = config.get("replacement_template", "Encrypted_{id}")
-        return template.format(id=encrypted[:8])
+        encrypted = self._encrypt_value(value, salt)
+        return rule.replacement_template.format(id=encrypted)
     
-    def _domain_preserve(self, email: str, config: Dict) -> str:
+    def _domain_preserve(self, email: str, rule: MaskingRule, salt: bytes = b"") -> str:
         """域名保持的邮箱脱敏"""
         local, domain = email.split('@', 1)
-        if config.get("mask_local_part"):
+        if rule.mask_local_part:
             masked_local = local[:2] + "***" + local[-2:] if len(local) > 4 else "***"
             return f"{masked_local}@{domain}"
         return email
     
-    def _name_mask(self, name: str, config: Dict) -> str:
+    def _name_mask(self, name: str, rule: MaskingRule, salt: bytes = b"") -> str:
         """中文姓名脱敏 - 保留姓氏，名字用xx替代"""
-        if len(name) <= 1:
+        name_len = len(name)
+        if name_len <= 1:
             return "x"
         
-        if config.get("preserve_first", True):
+        if rule.preserve_first:
             # 保留第一个字（姓氏），其余用x替代
-            return name[0] + "x" * (len(name) - 1)
+            mask_len = name_len - 1
+            return name[0] + (_X_MASKS[mask_len] if mask_len < len(_X_MASKS) else "x" * mask_len)
         else:
             # 全部用x替代
-            return "x" * len(name)
+            return _X_MASKS[name_len] if name_len < len(_X_MASKS) else "x" * name_len
     
-    def _encrypt_value(self, value: str) -> str:
-        """AES加密值"""
-        cipher = AES.new(self.encryption_key, AES.MODE_EAX)
-        nonce = cipher.nonce
-        ciphertext, tag = cipher.encrypt_and_digest(value.encode())
-        return base64.b64encode(nonce + tag + ciphertext).decode() 
\ No newline at end of file
+    def _encrypt_value(self, value: str, salt: bytes = b"") -> str:
+        """
+        基于AES的带密钥伪随机标识
+        
+        结果只作为8个字符的不透明标识，无需解密，因此对加盐后值的SHA-256摘要做一次
+        AES分组加密即可；同一盐（映射存储）下相同输入得到相同标识，不同会话的盐不同，
+        标识无法跨会话关联，不同密钥下不可预测。
+        只编码标识所需的密文前缀，不再编码整个分组后截取
+        """
+        block = hashlib.sha256(salt + value.encode()).digest()[:16]
+        encrypted = self._prf_cipher.encrypt(block)
+        return base64.b64encode(encrypted[:_ENCRYPTED_ID_BYTES]).decode("ascii")
\ No newline at end of file
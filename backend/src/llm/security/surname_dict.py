@@ -4,90 +4,122 @@
 """
 
 import re
-from typing import List, Tuple
+from typing import Dict, List, Tuple
+
+# 连续中文字符片段
+_CJK_RUN_RE = re.compile(r'[\u4e00-\u9fff]+')
+# 全部由中文字符组成
+_CHINESE_ONLY_RE = re.compile(r'^[\u4e00-\u9fff]+$')
+# 字典树中标记姓氏结尾的键
+_TRIE_END = ""
+
+
+# 常见的中文姓氏列表（百家姓前100个）
+SURNAMES = frozenset({
+    # 单字姓氏
+    '王', '李', '张', '刘', '陈', '杨', '赵', '黄', '周', '吴',
+    '徐', '孙', '胡', '朱', '高', '林', '何', '郭', '马', '罗',
+    '梁', '宋', '郑', '谢', '韩', '唐', '冯', '于', '董', '萧',
+    '程', '曹', '袁', '邓', '许', '傅', '沈', '曾', '彭', '吕',
+    '苏', '卢', '蒋', '蔡', '贾', '丁', '魏', '薛', '叶', '阎',
+    '余', '潘', '杜', '戴', '夏', '钟', '汪', '田', '任', '姜',
+    '范', '方', '石', '姚', '谭', '廖', '邹', '熊', '金', '陆',
+    '郝', '孔', '白', '崔', '康', '毛', '邱', '秦', '江', '史',
+    '顾', '侯', '邵', '孟', '龙', '万', '段', '漕', '钱', '汤',
+    '尹', '黎', '易', '常', '武', '乔', '贺', '赖', '龚', '文',
+    
+    # 复姓
+    '欧阳', '太史', '端木', '上官', '司马', '东方', '独孤', '南宫', '万俟', '闻人',
+    '夏侯', '诸葛', '尉迟', '公羊', '赫连', '澹台', '皇甫', '宗政', '濮阳', '公冶',
+    '太叔', '申屠', '公孙', '慕容', '仲孙', '钟离', '长孙', '宇文', '司徒', '鲜于'
+})
+
+# 按长度排序，优先匹配长姓氏（复姓）
+SORTED_SURNAMES = tuple(sorted(SURNAMES, key=len, reverse=True))
+
+
+def _build_surname_trie() -> Dict[str, dict]:
+    """按字符构建姓氏字典树，非姓氏开头的片段一次字典查找即可排除"""
+    trie: Dict[str, dict] = {}
+    for surname in SURNAMES:
+        node = trie
+        for char in surname:
+            node = node.setdefault(char, {})
+        node[_TRIE_END] = True
+    return trie
+
+
+# 姓氏字典树只在模块导入时构建一次，所有实例共享
+_SURNAME_TRIE = _build_surname_trie()
 
 
 class SurnameDict:
     """中文姓氏词典，用于识别文本中的中文姓名"""
     
     def __init__(self):
-        # 常见的中文姓氏列表（百家姓前100个）
-        self.surnames = {
-            # 单字姓氏
-            '王', '李', '张', '刘', '陈', '杨', '赵', '黄', '周', '吴',
-            '徐', '孙', '胡', '朱', '高', '林', '何', '郭', '马', '罗',
-            '梁', '宋', '郑', '谢', '韩', '唐', '冯', '于', '董', '萧',
-            '程', '曹', '袁', '邓', '许', '傅', '沈', '曾', '彭', '吕',
-            '苏', '卢', '蒋', '蔡', '贾', '丁', '魏', '薛', '叶', '阎',
-            '余', '潘', '杜', '戴', '夏', '钟', '汪', '田', '任', '姜',
-            '范', '方', '石', '姚', '谭', '廖', '邹', '熊', '金', '陆',
-            '郝', '孔', '白', '崔', '康', '毛', '邱', '秦', '江', '史',
-            '顾', '侯', '邵', '孟', '龙', '万', '段', '漕', '钱', '汤',
-            '尹', '黎', '易', '常', '武', '乔', '贺', '赖', '龚', '文',
-            
-            # 复姓
-            '欧阳', '太史', '端木', '上官', '司马', '东方', '独孤', '南宫', '万俟', '闻人',
-            '夏侯', '诸葛', '尉迟', '公羊', '赫连', '澹台', '皇甫', '宗政', '濮阳', '公冶',
-            '太叔', '申屠', '公孙', '慕容', '仲孙', '钟离', '长孙', '宇文', '司徒', '鲜于'
-        }
-        
-        # 按长度排序，优先匹配长姓氏（复姓）
-        self.sorted_surnames = sorted(self.surnames, key=len, reverse=True)
+        # 姓氏数据在模块级别只构建一次，实例仅保存引用，构造开销可忽略
+        self.surnames = SURNAMES
+        self.sorted_surnames = SORTED_SURNAMES
+        self._surname_trie = _SURNAME_TRIE
+    
+    def _surname_prefix_lengths(self, text: str) -> List[int]:
+        """返回text开头所有可能姓氏的长度（升序）"""
+        lengths = []
+        node = self._surname_trie
+        for i, char in enumerate(text):
+            node = node.get(char)
+            if node is None:
+                break
+            if _TRIE_END in node:
+                lengths.append(i + 1)
+        return lengths
     
     def find_names_in_text(self, text: str) -> List[Tuple[str, int, int]]:
         """
         在文本中查找可能的中文姓名
         返回: [(姓名, 开始位置, 结束位置), ...]
         """
+        # 纯ASCII文本不可能包含中文姓名；str.isascii 只检查字符串的内部标记，为O(1)
+        if text.isascii():
+            return []
+        
         names_found = []
         
-        # 使用正则表达式匹配可能的姓名模式
-        # 姓氏 + 1-3个中文字符
-        for surname in self.sorted_surnames:
-            # 构建匹配模式：姓氏后跟1-3个中文字符，且不在其他中文字符中间
-            pattern = f'(?<![\\u4e00-\\u9fff]){re.escape(surname)}[\\u4e00-\\u9fff]{{1,3}}(?![\\u4e00-\\u9fff])'
+        # 姓名必须是前后都不紧邻中文字符的完整中文片段：姓氏 + 1-3个中文字符。
+        # 因此只需一次扫描出所有连续中文片段，再用字典树判断开头是否为姓氏，
+        # 无需对每个姓氏分别扫描全文
+        for match in _CJK_RUN_RE.finditer(text):
+            run = match.group(0)
+            # 验证是否是合理的姓名（长度2-4字符）
+            if not 2 <= len(run) <= 4:
+                continue
             
-            for match in re.finditer(pattern, text):
-                name = match.group(0)
-                start = match.start()
-                end = match.end()
-                
-                # 验证是否是合理的姓名（长度2-4字符）
-                if 2 <= len(name) <= 4:
-                    # 检查是否与已找到的姓名重叠
-                    overlapping = any(
-                        start < existing_end and end > existing_start 
-                        for _, existing_start, existing_end in names_found
-                    )
-                    
-                    if not overlapping:
-                        names_found.append((name, start, end))
+            # 优先匹配长姓氏（复姓）
+            for surname_len in reversed(self._surname_prefix_lengths(run)):
+                if 1 <= len(run) - surname_len <= 3:
+                    names_found.append((run, match.start(), match.end()))
+                    break
         
-        # 按位置排序
-        names_found.sort(key=lambda x: x[1])
+        # finditer 按位置顺序返回，结果已排序
         return names_found
     
     def is_chinese_name(self, text: str) -> bool:
         """判断给定文本是否可能是中文姓名"""
-        if not text or len(text) < 2 or len(text) > 4:
+        if not text or len(text) < 2 or len(text) > 4 or text.isascii():
             return False
             
         # 检查是否全部是中文字符
-        if not re.match(r'^[\u4e00-\u9fff]+$', text):
+        if not _CHINESE_ONLY_RE.match(text):
             return False
             
-        # 检查第一个字符是否是已知姓氏
-        for surname in self.sorted_surnames:
-            if text.startswith(surname):
-                return True
-                
-        return False
+        # 检查是否以已知姓氏开头
+        return bool(self._surname_prefix_lengths(text))
     
     def get_surname(self, name: str) -> str:
         """从姓名中提取姓氏"""
-        for surname in self.sorted_surnames:
-            if name.startswith(surname):
-                return surname
+        lengths = self._surname_prefix_lengths(name)
+        if lengths:
+            return name[:lengths[-1]]
         
         # 如果没有匹配到已知姓氏，返回第一个字符
         return name[0] if name else ""
\ No newline at end of file
@@ -1,22 +1,32 @@
 """
 MCP 包初始化
-- 确保子模块可通过属性访问（兼容 unittest.mock.patch('mcp.config_manager....')）
+- 子模块在首次属性访问时才导入（PEP 562），只用到某一个子模块时无需加载其余依赖
+- 子模块仍可通过属性访问（兼容 unittest.mock.patch('mcp.config_manager....')）
 """
 
 from importlib import import_module as _import_module
 
-# 暴露子模块为属性，便于测试中的patch路径解析
-config_manager = _import_module('.config_manager', __name__)
-config = _import_module('.config', __name__)
-enhanced_client = _import_module('.enhanced_client', __name__)
-types = _import_module('.types', __name__)
+# 按需导入的子模块
+_LAZY_SUBMODULES = {'config_manager', 'config', 'enhanced_client', 'types'}
 
-# 常用类便捷导出（非必须）
-try:
-    from .config_manager import MCPConfigManager  # noqa: F401
-    from .config import MCPConfiguration  # noqa: F401
-except Exception:
-    # 避免在导入阶段由于依赖问题导致失败
-    pass
+# 常用类便捷导出（非必须）：名称 -> 所在子模块
+_LAZY_EXPORTS = {
+    'MCPConfigManager': 'config_manager',
+    'MCPConfiguration': 'config',
+}
 
 
+def __getattr__(name):
+    if name in _LAZY_SUBMODULES:
+        value = _import_module(f'.{name}', __name__)
+    elif name in _LAZY_EXPORTS:
+        value = getattr(_import_module(f'.{_LAZY_EXPORTS[name]}', __name__), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # 缓存到模块命名空间，后续访问不再经过 __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | _LAZY_SUBMODULES | set(_LAZY_EXPORTS))
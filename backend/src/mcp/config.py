@@ -5,23 +5,26 @@ MCP配置管理模块
 
 import json
 import os
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Union, Literal
 from pathlib import Path
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field
 from loguru import logger
 
 from .types import MCPClientConfig, MCPTool
 
+# 支持的服务器类型，由 pydantic-core 在解析时直接校验
+MCPServerType = Literal['websocket', 'http', 'sse', 'stream_http', 'local', 'subprocess']
+
 
 class MCPServerConfig(BaseModel):
     """MCP服务器配置"""
     name: str = Field(..., description="服务器名称")
-    type: str = Field(..., description="服务器类型", pattern="^(websocket|http|sse|stream_http|local|subprocess)$")
+    type: MCPServerType = Field(..., description="服务器类型")
     enabled: bool = Field(True, description="是否启用")
     
     # WebSocket配置
     host: Optional[str] = Field(None, description="WebSocket主机")
-    port: Optional[int] = Field(None, description="WebSocket端口")
+    port: Optional[int] = Field(None, ge=1, le=65535, description="WebSocket端口")
     path: Optional[str] = Field(None, description="WebSocket路径")
     
     # HTTP配置
@@ -52,21 +55,6 @@ class MCPServerConfig(BaseModel):
     # 工具过滤
     enabled_tools: Optional[List[str]] = Field(None, description="启用的工具列表")
     disabled_tools: Optional[List[str]] = Field(None, description="禁用的工具列表")
-    
-    @field_validator('type')
-    @classmethod
-    def validate_type(cls, v):
-        valid_types = ['websocket', 'http', 'sse', 'stream_http', 'local', 'subprocess']
-        if v not in valid_types:
-            raise ValueError(f"Invalid server type: {v}. Must be one of {valid_types}")
-        return v
-    
-    @field_validator('port')
-    @classmethod
-    def validate_port(cls, v):
-        if v is not None and (v < 1 or v > 65535):
-            raise ValueError("Port must be between 1 and 65535")
-        return v
 
 
 class MCPToolConfig(BaseModel):
@@ -6,16 +6,156 @@ MCP配置管理器
 
 import json
 import os
+import shutil
 import asyncio
-from typing import Dict, List, Optional, Any, Union
+import atexit
+import functools
+import heapq
+import operator
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple, Union
 from pathlib import Path
-from datetime import datetime
-from pydantic import BaseModel, Field, ValidationError
+import aiohttp
+import websockets
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 from loguru import logger
 
 from .config import MCPConfiguration, MCPServerConfig, MCPToolConfig
 from .types import MCPConnectionStatus, MCPException
 
+# 可选依赖：orjson（C实现的JSON解析/序列化），未安装时回退到标准库json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# 可选依赖：pysimdjson（SIMD结构索引解析），用于批量加载模板文件时复用同一解析器
+try:
+    import simdjson
+    SIMDJSON_AVAILABLE = True
+except ImportError:
+    simdjson = None
+    SIMDJSON_AVAILABLE = False
+
+
+# 统一的MCP配置文件路径
+_EXPECTED_CONFIG_PATH = Path("config/mcp_config.json")
+
+# 可能存在旧配置文件的其他位置（按迁移优先级排序）
+_OTHER_CONFIG_PATHS = (
+    "backend/config/mcp_config.json",
+    "mcp_config.json",
+    "../config/mcp_config.json"
+)
+
+
+# 备份文件名内含时间戳，直接按名称字符串排序即为时间顺序
+_BACKUP_SORT_KEY = operator.attrgetter("name")
+
+
+@functools.lru_cache(maxsize=4096)
+def _isoformat_timestamp(timestamp: float) -> str:
+    """时间戳转本地时间ISO字符串；备份文件的时间戳基本不变，重复列出时直接命中缓存"""
+    # 只有列出备份时才需要 datetime（保留微秒部分），按需导入
+    from datetime import datetime
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+
+def _parse_json_bytes(data: bytes, parser: Optional[Any] = None) -> Any:
+    """
+    解析JSON字节串
+    
+    :param parser: 可复用的 simdjson.Parser，批量解析多个文件时避免重复分配内部缓冲区
+    """
+    if parser is not None:
+        # recursive=True 直接生成普通的 dict/list，解析器复用后不会使旧结果失效
+        return parser.parse(data, recursive=True)
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data.decode('utf-8'))
+
+
+def _read_config_file(path: Union[str, Path]) -> MCPConfiguration:
+    """读取并校验配置文件；JSON 解析与模型校验由 pydantic-core 一次完成，不生成中间 dict"""
+    return MCPConfiguration.model_validate_json(Path(path).read_bytes())
+
+
+def _read_file_bytes(path: Path) -> Union[bytes, OSError]:
+    """读取文件内容，读取失败时返回异常对象而不是抛出，便于批量读取时逐个处理"""
+    try:
+        return path.read_bytes()
+    except OSError as e:
+        return e
+
+
+def atomic_write_bytes(path: Union[str, Path], data: bytes):
+    """先写入同目录下的临时文件再用 os.replace 原子替换，写入中途进程退出也不会损坏原文件"""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            # 替换前落盘，避免系统崩溃后出现已替换但内容为空的文件
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+
+
+def link_or_copy(src: Union[str, Path], dst: Union[str, Path]):
+    """
+    以硬链接方式复制文件，不产生数据读写；跨文件系统、不支持硬链接或目标已存在时回退为复制
+    
+    只适用于源文件此后不会被原地修改（均通过 atomic_write_bytes 整体替换）的场景
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _file_signature(path: Union[str, Path]) -> Optional[Tuple[int, int, int]]:
+    """文件的 (修改时间ns, 大小, inode) 签名，用于判断文件自上次读写后是否被改动"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def _merge_named(items: List[Any], changes: Dict[str, Optional[Any]]) -> List[Any]:
+    """把按名称记录的修改合并进列表：同名项替换、标记为 None 的项删除、列表中没有的项追加到末尾"""
+    merged = []
+    for item in items:
+        if item.name in changes:
+            item = changes[item.name]
+            if item is None:
+                continue
+        merged.append(item)
+    existing = {item.name for item in merged}
+    merged.extend(item for name, item in changes.items() if item is not None and name not in existing)
+    return merged
+
+
+def _dump_json_bytes(obj: Any) -> bytes:
+    """序列化为2空格缩进、非ASCII字符原样输出的UTF-8 JSON"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        except (orjson.JSONEncodeError, TypeError):
+            # orjson 不支持的情况（如超过64位的整数）回退到标准库
+            pass
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
 
 class MCPConfigTemplate(BaseModel):
     """MCP配置模板"""
@@ -29,6 +169,224 @@ class MCPConfigTemplate(BaseModel):
     version: str = Field("1.0.0", description="版本")
 
 
+# 模板列表校验器：批量加载的模板一次交给 pydantic-core 校验
+_TEMPLATE_LIST_ADAPTER = TypeAdapter(List[MCPConfigTemplate])
+
+
+@functools.cache
+def _get_builtin_templates() -> Dict[str, MCPConfigTemplate]:
+    """获取内置模板；模板只读，结果在所有配置管理器实例间共享，只在首次调用时构建和校验"""
+    templates = {}
+    
+    # Kubernetes MCP模板 - WebSocket
+    templates["k8s-websocket"] = MCPConfigTemplate(
+        name="Kubernetes WebSocket",
+        description="通过WebSocket连接的Kubernetes MCP服务器",
+        category="kubernetes",
+        icon="⚙️",
+        config={
+            "type": "websocket",
+            "host": "localhost",
+            "port": 8766,
+            "path": "/",
+            "timeout": 30,
+            "enabled_tools": [
+                "k8s-get-pods",
+                "k8s-get-services",
+                "k8s-get-deployments",
+                "k8s-scale-deployment",
+                "k8s-get-logs"
+            ]
+        },
+        tags=["kubernetes", "websocket", "container"]
+    )
+    
+    # Kubernetes MCP模板 - HTTP
+    templates["k8s-http"] = MCPConfigTemplate(
+        name="Kubernetes HTTP",
+        description="通过HTTP REST API连接的Kubernetes MCP服务器",
+        category="kubernetes",
+        icon="🌐",
+        config={
+            "type": "http",
+            "base_url": "http://localhost:8766",
+            "timeout": 30,
+            "auth_type": "bearer",
+            "enabled_tools": [
+                "k8s-get-pods",
+                "k8s-get-services",
+                "k8s-get-deployments",
+                "k8s-scale-deployment",
+                "k8s-get-logs"
+            ]
+        },
+        tags=["kubernetes", "http", "rest", "container"]
+    )
+    
+    # Kubernetes MCP模板 - SSE
+    templates["k8s-sse"] = MCPConfigTemplate(
+        name="Kubernetes SSE",
+        description="通过Server-Sent Events连接的Kubernetes MCP服务器",
+        category="kubernetes",
+        icon="📡",
+        config={
+            "type": "sse",
+            "host": "localhost",
+            "port": 8766,
+            "path": "/events",
+            "timeout": 30,
+            "enabled_tools": [
+                "k8s-watch-pods",
+                "k8s-watch-services",
+                "k8s-watch-events",
+                "k8s-get-logs"
+            ]
+        },
+        tags=["kubernetes", "sse", "events", "streaming"]
+    )
+    
+    # SSH MCP模板 - WebSocket
+    templates["ssh-jumpserver"] = MCPConfigTemplate(
+        name="SSH JumpServer",
+        description="通过JumpServer进行SSH连接的MCP服务器",
+        category="ssh",
+        icon="🔗",
+        config={
+            "type": "websocket",
+            "host": "localhost",
+            "port": 8767,
+            "path": "/",
+            "timeout": 30,
+            "enabled_tools": [
+                "ssh-execute",
+                "ssh-asset-list",
+                "ssh-session-manager"
+            ]
+        },
+        tags=["ssh", "jumpserver", "remote"]
+    )
+    
+    # SSH MCP模板 - HTTP
+    templates["ssh-http"] = MCPConfigTemplate(
+        name="SSH HTTP",
+        description="通过HTTP API进行SSH连接的MCP服务器",
+        category="ssh",
+        icon="🌍",
+        config={
+            "type": "http",
+            "base_url": "http://localhost:8767",
+            "timeout": 30,
+            "auth_type": "bearer",
+            "enabled_tools": [
+                "ssh-execute",
+                "ssh-asset-list",
+                "ssh-session-manager"
+            ]
+        },
+        tags=["ssh", "http", "remote"]
+    )
+    
+    # Stream HTTP MCP模板
+    templates["stream-http"] = MCPConfigTemplate(
+        name="Stream HTTP",
+        description="通过Stream HTTP进行流式通信的MCP服务器",
+        category="streaming",
+        icon="🌊",
+        config={
+            "type": "stream_http",
+            "host": "localhost",
+            "port": 8768,
+            "path": "/stream",
+            "timeout": 60,
+            "enabled_tools": [
+                "stream-chat",
+                "stream-logs",
+                "stream-metrics"
+            ]
+        },
+        tags=["streaming", "http", "realtime"]
+    )
+    
+    # 子进程MCP模板
+    templates["subprocess"] = MCPConfigTemplate(
+        name="Subprocess MCP",
+        description="通过子进程启动的本地MCP服务器",
+        category="local",
+        icon="⚡",
+        config={
+            "type": "subprocess",
+            "command": "python",
+            "args": ["-m", "mcp_server"],
+            "cwd": "/path/to/mcp/server",
+            "timeout": 30,
+            "env": {
+                "PYTHONPATH": "/path/to/mcp/server"
+            }
+        },
+        tags=["subprocess", "local", "python"]
+    )
+    
+    # 文件系统MCP模板
+    templates["filesystem"] = MCPConfigTemplate(
+        name="File System",
+        description="本地文件系统操作MCP服务器",
+        category="filesystem",
+        icon="📁",
+        config={
+            "type": "local",
+            "enabled_tools": [
+                "fs-read-file",
+                "fs-write-file",
+                "fs-list-directory",
+                "fs-search-files"
+            ]
+        },
+        tags=["filesystem", "local", "files"]
+    )
+    
+    return templates
+
+
+def _scan_backup_entries(backup_dir: Union[str, Path]) -> List[os.DirEntry]:
+    """一次目录扫描列出所有备份文件（mcp_config_*.json）"""
+    with os.scandir(backup_dir) as it:
+        return [
+            entry for entry in it
+            if entry.name.startswith("mcp_config_") and entry.name.endswith(".json")
+        ]
+
+
+def prune_backups(backup_dir: Union[str, Path], keep: int) -> int:
+    """
+    删除多余的旧备份，只保留最近 keep 个，返回删除的数量
+    
+    备份文件名含时间戳，按名称只挑出最旧的待删除项，无需整体排序
+    """
+    backups = [(entry.name, entry.path) for entry in _scan_backup_entries(backup_dir)]
+    if len(backups) <= keep:
+        return 0
+    stale = heapq.nsmallest(len(backups) - keep, backups)
+    for _, old_backup in stale:
+        os.unlink(old_backup)
+    return len(stale)
+
+
+def _create_default_config() -> MCPConfiguration:
+    """创建默认配置"""
+    return MCPConfiguration(
+        name="钉钉K8s运维机器人MCP配置",
+        description="支持K8s和SSH操作的MCP服务器配置",
+        servers=[],
+        tools=[]
+    )
+
+
+@functools.cache
+def _default_config_bytes() -> bytes:
+    """默认配置序列化后的JSON字节，进程内只序列化一次"""
+    return _dump_json_bytes(_create_default_config().model_dump())
+
+
 class MCPConfigValidationResult(BaseModel):
     """配置验证结果"""
     valid: bool = Field(..., description="是否有效")
@@ -41,6 +399,11 @@ class MCPConfigValidationResult(BaseModel):
 class MCPConfigManager:
     """MCP配置管理器"""
     
+    # 配置修改后延迟写盘的时间（秒），防抖时间内的多次修改合并为一次保存
+    SAVE_DEBOUNCE_DELAY = 0.25
+    # 保留的最近备份数量
+    MAX_BACKUPS = 5
+    
     def __init__(self, config_file: Optional[str] = None):
         # 统一使用config/mcp_config.json作为默认配置文件路径
         self.config_file = config_file or "config/mcp_config.json"
@@ -53,6 +416,9 @@ class MCPConfigManager:
         self.templates_dir.mkdir(parents=True, exist_ok=True)
         self.backup_dir.mkdir(parents=True, exist_ok=True)
         
+        # 其他位置实际存在的旧配置文件，迁移和一致性检查共用一次检查结果
+        self._other_config_files: Optional[List[str]] = None
+        
         # 执行配置文件迁移（如果需要）
         self.migrate_config_if_needed()
         
@@ -61,14 +427,60 @@ class MCPConfigManager:
         
         self.current_config: Optional[MCPConfiguration] = None
         self.templates: Dict[str, MCPConfigTemplate] = {}
+        # 名称 -> 列表下标 索引，以及建立索引时对应的列表对象
+        self._server_index: Dict[str, int] = {}
+        self._server_index_source: Optional[List[MCPServerConfig]] = None
+        self._tool_index: Dict[str, int] = {}
+        self._tool_index_source: Optional[List[MCPToolConfig]] = None
+        # 启用服务器列表缓存，服务器列表被替换或经由管理器修改后失效
+        self._enabled_servers: List[MCPServerConfig] = []
+        self._enabled_servers_source: Optional[List[MCPServerConfig]] = None
+        # 工具名称 -> 所属服务器 解析结果缓存，工具/服务器列表被替换或经由管理器修改后失效
+        self._tool_server_cache: Dict[str, Optional[MCPServerConfig]] = {}
+        self._tool_server_cache_source: Optional[Tuple[List[MCPToolConfig], List[MCPServerConfig]]] = None
+        # 连接测试共用的HTTP会话（绑定创建它的事件循环）
+        self._http_session: Optional[aiohttp.ClientSession] = None
+        self._http_session_loop: Optional[asyncio.AbstractEventLoop] = None
+        # 配置修改版本号，每次经由管理器修改配置时递增（持有 _save_lock）
+        self._config_version = 0
+        # 配置序列化结果缓存: (序列化时的配置对象, 序列化前读取的版本号, JSON字节)，配置被修改或替换后失效
+        self._serialized_cache: Optional[Tuple[MCPConfiguration, int, bytes]] = None
+        # 当前内存配置对应的配置文件签名（由本实例加载或写入）
+        self._config_signature: Optional[Tuple[int, int, int]] = None
+        
+        # 正在进行的异步重载任务，以及重载进行期间收到新请求时排队的下一次重载（期间的请求共用）
+        self._reload_task: Optional[asyncio.Future] = None
+        self._reload_next: Optional[asyncio.Future] = None
+        
+        # 备份列表缓存: ((备份目录修改时间ns, 备份文件名), 备份列表)，目录内容变化后重建
+        self._backups_cache: Optional[Tuple[Tuple[int, Tuple[str, ...]], List[Dict[str, Any]]]] = None
+        
+        # 延迟保存状态
+        self._dirty = False
+        # 尚未写盘的按名称修改: 名称 -> 修改后的配置（None 表示已删除）；
+        # 配置文件在此期间被其他写入方改写时，据此把修改合并到文件内容上
+        self._pending_servers: Dict[str, Optional[MCPServerConfig]] = {}
+        self._pending_tools: Dict[str, Optional[MCPToolConfig]] = {}
+        # 尚未写盘的修改为整体替换（导入、恢复备份），写盘时以内存中的配置为准
+        self._replace_pending = False
+        # 最近一次保存失败的异常，保存成功后清除
+        self._last_save_error: Optional[Exception] = None
+        self._save_timer: Optional[threading.Timer] = None
+        self._save_lock = threading.Lock()
         
         # 加载配置和模板
         self._load_config()
         self._load_templates()
     
+    def _find_other_config_files(self) -> List[str]:
+        """返回其他位置存在的配置文件（按优先级排序），结果只检查一次"""
+        if self._other_config_files is None:
+            self._other_config_files = [p for p in _OTHER_CONFIG_PATHS if os.path.exists(p)]
+        return self._other_config_files
+    
     def _validate_config_path_consistency(self):
         """验证配置路径一致性"""
-        expected_path = Path("config/mcp_config.json")
+        expected_path = _EXPECTED_CONFIG_PATH
         current_path = Path(self.config_file)
         
         if current_path.resolve() != expected_path.resolve():
@@ -78,283 +490,135 @@ class MCPConfigManager:
             )
             
             # 检查是否存在其他位置的配置文件
-            other_paths = [
-                "backend/config/mcp_config.json",
-                "mcp_config.json",
-                "../config/mcp_config.json"
-            ]
-            
-            for other_path in other_paths:
-                if Path(other_path).exists():
-                    logger.warning(f"发现其他位置的配置文件: {other_path}")
-                    logger.info(f"建议使用统一路径: {expected_path}")
+            for other_path in self._find_other_config_files():
+                logger.warning(f"发现其他位置的配置文件: {other_path}")
+                logger.info(f"建议使用统一路径: {expected_path}")
         else:
             logger.debug(f"MCP配置路径一致性检查通过: {current_path}")
     
     def migrate_config_if_needed(self) -> bool:
         """如果需要，迁移配置文件到标准路径"""
-        expected_path = Path("config/mcp_config.json")
+        expected_path = _EXPECTED_CONFIG_PATH
         
         # 如果标准路径已存在，无需迁移
         if expected_path.exists():
             return False
             
-        # 查找可能的旧配置文件路径（按优先级排序）
-        old_paths = [
-            "backend/config/mcp_config.json",
-            "mcp_config.json",
-            "../config/mcp_config.json"
-        ]
-        
-        for old_path in old_paths:
+        # 查找存在的旧配置文件（按优先级排序）
+        for old_path in self._find_other_config_files():
             old_file = Path(old_path)
-            if old_file.exists():
-                try:
-                    # 确保目标目录存在
-                    expected_path.parent.mkdir(parents=True, exist_ok=True)
-                    
-                    # 复制配置文件
-                    import shutil
-                    shutil.copy2(old_file, expected_path)
-                    
-                    logger.info(f"✅ 已迁移MCP配置文件: {old_path} -> {expected_path}")
-                    
-                    # 创建迁移备份
-                    backup_dir = expected_path.parent / "backups"
-                    backup_dir.mkdir(parents=True, exist_ok=True)
-                    backup_filename = f"migrated_from_{old_path.replace('/', '_').replace('..', 'parent')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-                    backup_path = backup_dir / backup_filename
-                    shutil.copy2(old_file, backup_path)
-                    logger.info(f"✅ 已创建迁移备份: {backup_path}")
-                    
-                    # 可选：删除旧文件（出于安全考虑，先不删除，只是警告）
-                    logger.warning(f"⚠️ 请手动删除旧配置文件: {old_path}")
-                    
-                    return True
-                    
-                except Exception as e:
-                    logger.error(f"❌ 迁移配置文件失败: {old_path} -> {expected_path}, 错误: {e}")
-                    continue
-                    
+            try:
+                # 确保目标目录存在
+                expected_path.parent.mkdir(parents=True, exist_ok=True)
+                
+                # 复制配置文件
+                shutil.copy2(old_file, expected_path)
+                
+                logger.info(f"✅ 已迁移MCP配置文件: {old_path} -> {expected_path}")
+                
+                # 创建迁移备份
+                backup_dir = expected_path.parent / "backups"
+                backup_dir.mkdir(parents=True, exist_ok=True)
+                backup_filename = f"migrated_from_{old_path.replace('/', '_').replace('..', 'parent')}_{time.strftime('%Y%m%d_%H%M%S')}.json"
+                backup_path = backup_dir / backup_filename
+                shutil.copy2(old_file, backup_path)
+                logger.info(f"✅ 已创建迁移备份: {backup_path}")
+                
+                # 可选：删除旧文件（出于安全考虑，先不删除，只是警告）
+                logger.warning(f"⚠️ 请手动删除旧配置文件: {old_path}")
+                
+                return True
+                
+            except Exception as e:
+                logger.error(f"❌ 迁移配置文件失败: {old_path} -> {expected_path}, 错误: {e}")
+                continue
+                
         return False
     
     def _load_config(self):
         """加载配置文件"""
         try:
             if os.path.exists(self.config_file):
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
-                    self.current_config = MCPConfiguration(**config_data)
+                # 文件与内存中的配置来自同一次加载/写入时，无需重新解析和校验
+                signature = _file_signature(self.config_file)
+                if (self.current_config is not None and signature is not None
+                        and signature == self._config_signature):
+                    logger.debug(f"MCP配置文件未变化，跳过重新解析: {self.config_file}")
+                    return
+                self.current_config = _read_config_file(self.config_file)
+                self._config_signature = signature
                 logger.info(f"✅ MCP配置加载成功: {self.config_file}")
             else:
-                # 创建默认配置
-                self.current_config = self._create_default_config()
+                # 创建默认配置，直接写入预先序列化好的默认配置字节
+                self.current_config = _create_default_config()
+                self._serialized_cache = (self.current_config, self._config_version, _default_config_bytes())
                 self._save_config()
                 logger.info("✅ 创建默认MCP配置")
         except Exception as e:
             logger.error(f"❌ MCP配置加载失败: {e}")
-            self.current_config = self._create_default_config()
+            self.current_config = _create_default_config()
     
     def _load_templates(self):
         """加载配置模板"""
         try:
-            # 内置模板
-            self.templates.update(self._get_builtin_templates())
-            
-            # 从文件加载用户模板
-            for template_file in self.templates_dir.glob("*.json"):
-                try:
-                    with open(template_file, 'r', encoding='utf-8') as f:
-                        template_data = json.load(f)
-                        template = MCPConfigTemplate(**template_data)
-                        self.templates[template.name] = template
-                except Exception as e:
-                    logger.warning(f"加载模板失败 {template_file}: {e}")
-                    
+            self.templates = self._collect_templates()
             logger.info(f"✅ 加载 {len(self.templates)} 个MCP配置模板")
         except Exception as e:
             logger.error(f"❌ 模板加载失败: {e}")
     
-    def _create_default_config(self) -> MCPConfiguration:
-        """创建默认配置"""
-        return MCPConfiguration(
-            name="钉钉K8s运维机器人MCP配置",
-            description="支持K8s和SSH操作的MCP服务器配置",
-            servers=[],
-            tools=[]
-        )
+    async def reload_templates_async(self):
+        """异步重新加载配置模板，文件读取、解析和校验在工作线程中执行，不阻塞事件循环"""
+        try:
+            # 新模板集合构建完成后整体替换，加载期间读取到的始终是完整的旧模板
+            self.templates = await asyncio.to_thread(self._collect_templates)
+            logger.info(f"✅ 重新加载 {len(self.templates)} 个MCP配置模板")
+        except Exception as e:
+            logger.error(f"❌ 模板重新加载失败: {e}")
     
-    def _get_builtin_templates(self) -> Dict[str, MCPConfigTemplate]:
-        """获取内置模板"""
-        templates = {}
-        
-        # Kubernetes MCP模板 - WebSocket
-        templates["k8s-websocket"] = MCPConfigTemplate(
-            name="Kubernetes WebSocket",
-            description="通过WebSocket连接的Kubernetes MCP服务器",
-            category="kubernetes",
-            icon="⚙️",
-            config={
-                "type": "websocket",
-                "host": "localhost",
-                "port": 8766,
-                "path": "/",
-                "timeout": 30,
-                "enabled_tools": [
-                    "k8s-get-pods",
-                    "k8s-get-services",
-                    "k8s-get-deployments",
-                    "k8s-scale-deployment",
-                    "k8s-get-logs"
-                ]
-            },
-            tags=["kubernetes", "websocket", "container"]
-        )
-        
-        # Kubernetes MCP模板 - HTTP
-        templates["k8s-http"] = MCPConfigTemplate(
-            name="Kubernetes HTTP",
-            description="通过HTTP REST API连接的Kubernetes MCP服务器",
-            category="kubernetes",
-            icon="🌐",
-            config={
-                "type": "http",
-                "base_url": "http://localhost:8766",
-                "timeout": 30,
-                "auth_type": "bearer",
-                "enabled_tools": [
-                    "k8s-get-pods",
-                    "k8s-get-services",
-                    "k8s-get-deployments",
-                    "k8s-scale-deployment",
-                    "k8s-get-logs"
-                ]
-            },
-            tags=["kubernetes", "http", "rest", "container"]
-        )
-        
-        # Kubernetes MCP模板 - SSE
-        templates["k8s-sse"] = MCPConfigTemplate(
-            name="Kubernetes SSE",
-            description="通过Server-Sent Events连接的Kubernetes MCP服务器",
-            category="kubernetes",
-            icon="📡",
-            config={
-                "type": "sse",
-                "host": "localhost",
-                "port": 8766,
-                "path": "/events",
-                "timeout": 30,
-                "enabled_tools": [
-                    "k8s-watch-pods",
-                    "k8s-watch-services",
-                    "k8s-watch-events",
-                    "k8s-get-logs"
-                ]
-            },
-            tags=["kubernetes", "sse", "events", "streaming"]
-        )
-        
-        # SSH MCP模板 - WebSocket
-        templates["ssh-jumpserver"] = MCPConfigTemplate(
-            name="SSH JumpServer",
-            description="通过JumpServer进行SSH连接的MCP服务器",
-            category="ssh",
-            icon="🔗",
-            config={
-                "type": "websocket",
-                "host": "localhost",
-                "port": 8767,
-                "path": "/",
-                "timeout": 30,
-                "enabled_tools": [
-                    "ssh-execute",
-                    "ssh-asset-list",
-                    "ssh-session-manager"
-                ]
-            },
-            tags=["ssh", "jumpserver", "remote"]
-        )
+    def _collect_templates(self) -> Dict[str, MCPConfigTemplate]:
+        """收集内置模板和模板目录中的用户模板，同名时用户模板优先"""
+        # 内置模板
+        templates = dict(_get_builtin_templates())
         
-        # SSH MCP模板 - HTTP
-        templates["ssh-http"] = MCPConfigTemplate(
-            name="SSH HTTP",
-            description="通过HTTP API进行SSH连接的MCP服务器",
-            category="ssh",
-            icon="🌍",
-            config={
-                "type": "http",
-                "base_url": "http://localhost:8767",
-                "timeout": 30,
-                "auth_type": "bearer",
-                "enabled_tools": [
-                    "ssh-execute",
-                    "ssh-asset-list",
-                    "ssh-session-manager"
-                ]
-            },
-            tags=["ssh", "http", "remote"]
-        )
-        
-        # Stream HTTP MCP模板
-        templates["stream-http"] = MCPConfigTemplate(
-            name="Stream HTTP",
-            description="通过Stream HTTP进行流式通信的MCP服务器",
-            category="streaming",
-            icon="🌊",
-            config={
-                "type": "stream_http",
-                "host": "localhost",
-                "port": 8768,
-                "path": "/stream",
-                "timeout": 60,
-                "enabled_tools": [
-                    "stream-chat",
-                    "stream-logs",
-                    "stream-metrics"
-                ]
-            },
-            tags=["streaming", "http", "realtime"]
-        )
-        
-        # 子进程MCP模板
-        templates["subprocess"] = MCPConfigTemplate(
-            name="Subprocess MCP",
-            description="通过子进程启动的本地MCP服务器",
-            category="local",
-            icon="⚡",
-            config={
-                "type": "subprocess",
-                "command": "python",
-                "args": ["-m", "mcp_server"],
-                "cwd": "/path/to/mcp/server",
-                "timeout": 30,
-                "env": {
-                    "PYTHONPATH": "/path/to/mcp/server"
-                }
-            },
-            tags=["subprocess", "local", "python"]
-        )
+        # 从文件加载用户模板
+        template_files = list(self.templates_dir.glob("*.json"))
+        if template_files:
+            for template in self._load_template_files(template_files):
+                templates[template.name] = template
+        return templates
+    
+    def _load_template_files(self, template_files: List[Path]) -> List[MCPConfigTemplate]:
+        """
+        批量加载模板文件：多线程并行读取，共用一个解析器解析，再整体校验一次；
+        单个文件读取、解析或校验失败时只跳过该文件
+        """
+        if len(template_files) > 1:
+            with ThreadPoolExecutor(max_workers=min(8, len(template_files))) as executor:
+                contents = list(executor.map(_read_file_bytes, template_files))
+        else:
+            contents = [_read_file_bytes(template_files[0])]
         
-        # 文件系统MCP模板
-        templates["filesystem"] = MCPConfigTemplate(
-            name="File System",
-            description="本地文件系统操作MCP服务器",
-            category="filesystem",
-            icon="📁",
-            config={
-                "type": "local",
-                "enabled_tools": [
-                    "fs-read-file",
-                    "fs-write-file",
-                    "fs-list-directory",
-                    "fs-search-files"
-                ]
-            },
-            tags=["filesystem", "local", "files"]
-        )
+        parser = simdjson.Parser() if SIMDJSON_AVAILABLE else None
+        parsed = []
+        for template_file, content in zip(template_files, contents):
+            try:
+                if isinstance(content, OSError):
+                    raise content
+                parsed.append((template_file, _parse_json_bytes(content, parser)))
+            except Exception as e:
+                logger.warning(f"加载模板失败 {template_file}: {e}")
         
-        return templates
+        try:
+            return _TEMPLATE_LIST_ADAPTER.validate_python([data for _, data in parsed])
+        except ValidationError:
+            # 存在无效模板时逐个校验，定位并跳过出错的文件
+            templates = []
+            for template_file, data in parsed:
+                try:
+                    templates.append(MCPConfigTemplate.model_validate(data))
+                except Exception as e:
+                    logger.warning(f"加载模板失败 {template_file}: {e}")
+            return templates
     
     def _save_config(self):
         """保存配置文件"""
@@ -363,34 +627,140 @@ class MCPConfigManager:
             self._create_backup()
             
             # 保存配置
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(
-                    self.current_config.dict(),
-                    f,
-                    ensure_ascii=False,
-                    indent=2
-                )
+            atomic_write_bytes(self.config_file, self._serialize_config())
+            self._config_signature = _file_signature(self.config_file)
             logger.info(f"✅ MCP配置保存成功: {self.config_file}")
         except Exception as e:
             logger.error(f"❌ MCP配置保存失败: {e}")
             raise
     
+    def _serialize_config(self) -> bytes:
+        """序列化当前配置；配置未修改时直接复用上次的结果"""
+        # 先读取版本号再序列化：序列化期间配置被修改时版本号已递增，存入的旧结果不会再被命中
+        version = self._config_version
+        config = self.current_config
+        cache = self._serialized_cache
+        if cache is not None and cache[0] is config and cache[1] == version:
+            return cache[2]
+        payload = _dump_json_bytes(config.model_dump())
+        self._serialized_cache = (config, version, payload)
+        return payload
+    
+    def _mark_changed(self, replace: bool = False):
+        """
+        标记配置已修改、尚未写盘，调用方需持有 _save_lock
+        
+        :param replace: 整体替换了配置（导入、恢复备份），写盘时不与外部修改合并
+        """
+        # 配置已被修改，启用服务器缓存和工具所属服务器缓存失效；
+        # 序列化缓存通过递增版本号失效，与定时器线程中的序列化互不覆盖
+        self._enabled_servers_source = None
+        self._tool_server_cache_source = None
+        self._config_version += 1
+        self._dirty = True
+        if replace:
+            self._replace_pending = True
+    
+    def _schedule_save(self, servers: Optional[Dict[str, Optional[MCPServerConfig]]] = None,
+                       tools: Optional[Dict[str, Optional[MCPToolConfig]]] = None):
+        """
+        标记配置已修改并延迟保存
+        
+        :param servers: 本次修改涉及的服务器: 名称 -> 修改后的配置（None 表示已删除）
+        :param tools: 本次修改涉及的工具，格式同上
+        """
+        with self._save_lock:
+            self._mark_changed()
+            if servers:
+                self._pending_servers.update(servers)
+            if tools:
+                self._pending_tools.update(tools)
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.SAVE_DEBOUNCE_DELAY, self._flush_pending_save)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+                # 进程退出前写入尚未保存的修改；只在有待写入的修改时注册，写盘后注销，不会一直持有管理器
+                atexit.register(self._flush_pending_save)
+    
+    @property
+    def last_save_error(self) -> Optional[Exception]:
+        """最近一次保存失败的异常（包括延迟保存），之后保存成功时清除；修改在保存成功前仍保留待写入"""
+        return self._last_save_error
+    
+    def flush_config(self):
+        """
+        立即保存尚未写盘的配置修改，保存失败时抛出异常
+        
+        配置文件自上次由本实例加载/写入后被其他写入方（如工具自动同步、配置更新接口）改写时，
+        以文件内容为基础合并尚未写盘的修改后再写入，既不丢弃这些修改也不覆盖外部写入的内容
+        """
+        with self._save_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return
+            if not self._replace_pending:
+                signature = _file_signature(self.config_file)
+                if signature is not None and signature != self._config_signature:
+                    self._merge_external_config()
+            try:
+                self._save_config()
+            except Exception as e:
+                self._last_save_error = e
+                raise
+            self._last_save_error = None
+            self._clear_pending_save()
+    
+    def _merge_external_config(self):
+        """以被外部改写的配置文件为基础合并尚未写盘的按名称修改，调用方需持有 _save_lock"""
+        try:
+            external = _read_config_file(self.config_file)
+        except (OSError, ValueError) as e:
+            # 外部写入的文件无法读取或校验时无从合并，保留内存中的配置
+            logger.warning(f"读取被外部修改的配置文件失败，以内存中的配置为准: {e}")
+            return
+        external.servers = _merge_named(external.servers, self._pending_servers)
+        external.tools = _merge_named(external.tools, self._pending_tools)
+        self.current_config = external
+        self._enabled_servers_source = None
+        self._tool_server_cache_source = None
+        self._config_version += 1
+        logger.info(
+            f"配置文件已被外部修改，合并 {len(self._pending_servers)} 个服务器和 "
+            f"{len(self._pending_tools)} 个工具的未保存修改: {self.config_file}"
+        )
+    
+    def _clear_pending_save(self):
+        """清除待保存标记并注销退出钩子，调用方需持有 _save_lock"""
+        self._dirty = False
+        self._pending_servers.clear()
+        self._pending_tools.clear()
+        self._replace_pending = False
+        atexit.unregister(self._flush_pending_save)
+    
+    def _flush_pending_save(self):
+        """定时器/退出时的保存入口，错误已由 _save_config 记录并保存在 last_save_error 中"""
+        try:
+            self.flush_config()
+        except Exception:
+            pass
+    
     def _create_backup(self):
         """创建配置备份"""
         try:
             if os.path.exists(self.config_file):
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                timestamp = time.strftime("%Y%m%d_%H%M%S")
                 backup_file = self.backup_dir / f"mcp_config_{timestamp}.json"
                 
-                import shutil
-                shutil.copy2(self.config_file, backup_file)
+                # 备份后紧接着的保存会用 os.replace 换上新文件，旧文件只剩备份引用，因此直接硬链接
+                link_or_copy(self.config_file, backup_file)
+
+                # 只保留最近 MAX_BACKUPS 个备份
+                prune_backups(self.backup_dir, self.MAX_BACKUPS)
                 
-                # 只保留最近5个备份
-                backups = sorted(self.backup_dir.glob("mcp_config_*.json"))
-                if len(backups) > 5:
-                    for old_backup in backups[:-5]:
-                        old_backup.unlink()
-                        
+                # 同名备份被覆盖时目录修改时间不一定变化，主动使备份列表缓存失效
+                self._backups_cache = None
                 logger.debug(f"创建配置备份: {backup_file}")
         except Exception as e:
             logger.warning(f"创建备份失败: {e}")
@@ -406,10 +776,36 @@ class MCPConfigManager:
         if not self.current_config:
             return []
         
-        return [
-            server for server in self.current_config.servers 
-            if server.enabled
-        ]
+        servers = self.current_config.servers
+        if self._enabled_servers_source is not servers:
+            self._enabled_servers = [server for server in servers if server.enabled]
+            self._enabled_servers_source = servers
+        # 返回浅拷贝，调用方修改返回的列表不影响缓存
+        return list(self._enabled_servers)
+    
+    @staticmethod
+    def _build_name_index(items) -> Dict[str, int]:
+        """构建 名称 -> 列表下标 索引，重名时与线性查找一致取第一个"""
+        index = {}
+        for i, item in enumerate(items):
+            index.setdefault(item.name, i)
+        return index
+    
+    def _get_server_index(self) -> Dict[str, int]:
+        """服务器名称索引；服务器列表被整体替换（加载、导入、删除等）后自动重建"""
+        servers = self.current_config.servers
+        if self._server_index_source is not servers:
+            self._server_index = self._build_name_index(servers)
+            self._server_index_source = servers
+        return self._server_index
+    
+    def _get_tool_index(self) -> Dict[str, int]:
+        """工具名称索引；工具列表被整体替换后自动重建"""
+        tools = self.current_config.tools
+        if self._tool_index_source is not tools:
+            self._tool_index = self._build_name_index(tools)
+            self._tool_index_source = tools
+        return self._tool_index
     
     def get_templates(self) -> Dict[str, MCPConfigTemplate]:
         """获取所有模板"""
@@ -423,11 +819,13 @@ class MCPConfigManager:
         """添加服务器"""
         try:
             # 检查名称是否已存在
-            if any(s.name == server_config.name for s in self.current_config.servers):
+            index = self._get_server_index()
+            if server_config.name in index:
                 raise ValueError(f"服务器名称已存在: {server_config.name}")
             
+            index[server_config.name] = len(self.current_config.servers)
             self.current_config.servers.append(server_config)
-            self._save_config()
+            self._schedule_save(servers={server_config.name: server_config})
             logger.info(f"✅ 添加MCP服务器: {server_config.name}")
             return True
         except Exception as e:
@@ -437,14 +835,19 @@ class MCPConfigManager:
     def update_server(self, name: str, server_config: MCPServerConfig) -> bool:
         """更新服务器"""
         try:
-            for i, server in enumerate(self.current_config.servers):
-                if server.name == name:
-                    self.current_config.servers[i] = server_config
-                    self._save_config()
-                    logger.info(f"✅ 更新MCP服务器: {name}")
-                    return True
+            i = self._get_server_index().get(name)
+            if i is None:
+                raise ValueError(f"服务器不存在: {name}")
             
-            raise ValueError(f"服务器不存在: {name}")
+            self.current_config.servers[i] = server_config
+            changes = {name: None}
+            if server_config.name != name:
+                # 名称变化时索引失效，下次访问时重建
+                self._server_index_source = None
+            changes[server_config.name] = server_config
+            self._schedule_save(servers=changes)
+            logger.info(f"✅ 更新MCP服务器: {name}")
+            return True
         except Exception as e:
             logger.error(f"❌ 更新服务器失败: {e}")
             return False
@@ -452,46 +855,56 @@ class MCPConfigManager:
     def remove_server(self, name: str) -> bool:
         """删除服务器"""
         try:
-            original_count = len(self.current_config.servers)
+            if name not in self._get_server_index():
+                raise ValueError(f"服务器不存在: {name}")
+            
+            # 列表整体替换后索引会在下次访问时自动重建
             self.current_config.servers = [
                 s for s in self.current_config.servers if s.name != name
             ]
-            
-            if len(self.current_config.servers) < original_count:
-                self._save_config()
-                logger.info(f"✅ 删除MCP服务器: {name}")
-                return True
-            else:
-                raise ValueError(f"服务器不存在: {name}")
+            self._schedule_save(servers={name: None})
+            logger.info(f"✅ 删除MCP服务器: {name}")
+            return True
         except Exception as e:
             logger.error(f"❌ 删除服务器失败: {e}")
             return False
     
     def toggle_server(self, name: str) -> bool:
         """切换服务器启用状态"""
+        server = self.get_server_by_name(name)
+        if server is None:
+            logger.error(f"❌ 切换服务器状态失败: 服务器不存在: {name}")
+            return False
+        return self.set_server_enabled(name, not server.enabled)
+    
+    def set_server_enabled(self, name: str, enabled: bool) -> bool:
+        """设置服务器启用状态"""
         try:
-            for server in self.current_config.servers:
-                if server.name == name:
-                    server.enabled = not server.enabled
-                    self._save_config()
-                    status = "启用" if server.enabled else "禁用"
-                    logger.info(f"✅ {status}MCP服务器: {name}")
-                    return True
+            i = self._get_server_index().get(name)
+            if i is None:
+                raise ValueError(f"服务器不存在: {name}")
             
-            raise ValueError(f"服务器不存在: {name}")
+            server = self.current_config.servers[i]
+            server.enabled = enabled
+            self._schedule_save(servers={name: server})
+            status = "启用" if enabled else "禁用"
+            logger.info(f"✅ {status}MCP服务器: {name}")
+            return True
         except Exception as e:
-            logger.error(f"❌ 切换服务器状态失败: {e}")
+            logger.error(f"❌ 设置服务器状态失败: {e}")
             return False
     
     def add_tool(self, tool_config: MCPToolConfig) -> bool:
         """添加工具"""
         try:
             # 检查名称是否已存在
-            if any(t.name == tool_config.name for t in self.current_config.tools):
+            index = self._get_tool_index()
+            if tool_config.name in index:
                 raise ValueError(f"工具名称已存在: {tool_config.name}")
             
+            index[tool_config.name] = len(self.current_config.tools)
             self.current_config.tools.append(tool_config)
-            self._save_config()
+            self._schedule_save(tools={tool_config.name: tool_config})
             logger.info(f"✅ 添加MCP工具: {tool_config.name}")
             return True
         except Exception as e:
@@ -501,14 +914,19 @@ class MCPConfigManager:
     def update_tool(self, name: str, tool_config: MCPToolConfig) -> bool:
         """更新工具"""
         try:
-            for i, tool in enumerate(self.current_config.tools):
-                if tool.name == name:
-                    self.current_config.tools[i] = tool_config
-                    self._save_config()
-                    logger.info(f"✅ 更新MCP工具: {name}")
-                    return True
+            i = self._get_tool_index().get(name)
+            if i is None:
+                raise ValueError(f"工具不存在: {name}")
             
-            raise ValueError(f"工具不存在: {name}")
+            self.current_config.tools[i] = tool_config
+            changes = {name: None}
+            if tool_config.name != name:
+                # 名称变化时索引失效，下次访问时重建
+                self._tool_index_source = None
+            changes[tool_config.name] = tool_config
+            self._schedule_save(tools=changes)
+            logger.info(f"✅ 更新MCP工具: {name}")
+            return True
         except Exception as e:
             logger.error(f"❌ 更新工具失败: {e}")
             return False
@@ -516,35 +934,43 @@ class MCPConfigManager:
     def remove_tool(self, name: str) -> bool:
         """删除工具"""
         try:
-            original_count = len(self.current_config.tools)
+            if name not in self._get_tool_index():
+                raise ValueError(f"工具不存在: {name}")
+            
+            # 列表整体替换后索引会在下次访问时自动重建
             self.current_config.tools = [
                 t for t in self.current_config.tools if t.name != name
             ]
-            
-            if len(self.current_config.tools) < original_count:
-                self._save_config()
-                logger.info(f"✅ 删除MCP工具: {name}")
-                return True
-            else:
-                raise ValueError(f"工具不存在: {name}")
+            self._schedule_save(tools={name: None})
+            logger.info(f"✅ 删除MCP工具: {name}")
+            return True
         except Exception as e:
             logger.error(f"❌ 删除工具失败: {e}")
             return False
     
     def toggle_tool(self, name: str) -> bool:
         """切换工具启用状态"""
+        tool = self.get_tool_by_name(name)
+        if tool is None:
+            logger.error(f"❌ 切换工具状态失败: 工具不存在: {name}")
+            return False
+        return self.set_tool_enabled(name, not tool.enabled)
+    
+    def set_tool_enabled(self, name: str, enabled: bool) -> bool:
+        """设置工具启用状态"""
         try:
-            for tool in self.current_config.tools:
-                if tool.name == name:
-                    tool.enabled = not tool.enabled
-                    self._save_config()
-                    status = "启用" if tool.enabled else "禁用"
-                    logger.info(f"✅ {status}MCP工具: {name}")
-                    return True
+            i = self._get_tool_index().get(name)
+            if i is None:
+                raise ValueError(f"工具不存在: {name}")
             
-            raise ValueError(f"工具不存在: {name}")
+            tool = self.current_config.tools[i]
+            tool.enabled = enabled
+            self._schedule_save(tools={name: tool})
+            status = "启用" if enabled else "禁用"
+            logger.info(f"✅ {status}MCP工具: {name}")
+            return True
         except Exception as e:
-            logger.error(f"❌ 切换工具状态失败: {e}")
+            logger.error(f"❌ 设置工具状态失败: {e}")
             return False
     
     def create_from_template(self, template_name: str, server_name: str, custom_config: Optional[Dict[str, Any]] = None) -> bool:
@@ -576,46 +1002,54 @@ class MCPConfigManager:
         
         try:
             # 验证服务器配置
+            servers_to_test = []
             for server in self.current_config.servers:
                 if not server.enabled:
                     continue
                     
-                try:
-                    # 基本配置验证
-                    if server.type == "websocket":
-                        if not server.host or not server.port:
-                            result.errors.append(f"WebSocket服务器 {server.name} 缺少host或port配置")
-                            result.valid = False
-                            continue
-                    elif server.type == "http":
-                        if not server.base_url:
-                            result.errors.append(f"HTTP服务器 {server.name} 缺少base_url配置")
-                            result.valid = False
-                            continue
-                    
-                    # 连接测试
-                    status = await self._test_server_connection(server)
-                    result.server_status[server.name] = status
-                    
-                    if status != "connected":
-                        result.warnings.append(f"服务器 {server.name} 连接失败")
-                        
-                except Exception as e:
-                    result.errors.append(f"服务器 {server.name} 验证失败: {str(e)}")
+                # 基本配置验证
+                if server.type == "websocket":
+                    if not server.host or not server.port:
+                        result.errors.append(f"WebSocket服务器 {server.name} 缺少host或port配置")
+                        result.valid = False
+                        continue
+                elif server.type == "http":
+                    if not server.base_url:
+                        result.errors.append(f"HTTP服务器 {server.name} 缺少base_url配置")
+                        result.valid = False
+                        continue
+                
+                servers_to_test.append(server)
+            
+            # 并发进行连接测试
+            statuses = await asyncio.gather(
+                *(self._test_server_connection(server) for server in servers_to_test),
+                return_exceptions=True
+            )
+            for server, status in zip(servers_to_test, statuses):
+                if isinstance(status, Exception):
+                    result.errors.append(f"服务器 {server.name} 验证失败: {str(status)}")
                     result.valid = False
+                    continue
+                
+                result.server_status[server.name] = status
+                if status != "connected":
+                    result.warnings.append(f"服务器 {server.name} 连接失败")
             
             # 验证工具配置
+            # 启用的服务器所声明工具名称的集合，一次构建后每个工具只需一次集合查找
+            served_tools = frozenset(
+                tool_name
+                for server in self.get_enabled_servers() if server.enabled_tools
+                for tool_name in server.enabled_tools
+            )
             for tool in self.current_config.tools:
                 if not tool.enabled:
                     continue
                     
                 try:
                     # 验证工具是否有对应的服务器
-                    server_found = False
-                    for server in self.current_config.servers:
-                        if server.enabled and server.enabled_tools and tool.name in server.enabled_tools:
-                            server_found = True
-                            break
+                    server_found = tool.name in served_tools
                     
                     if not server_found:
                         result.warnings.append(f"工具 {tool.name} 没有对应的启用服务器")
@@ -632,6 +1066,43 @@ class MCPConfigManager:
         
         return result
     
+    async def _get_http_session(self) -> aiohttp.ClientSession:
+        """获取连接测试共用的HTTP会话，复用连接池和DNS缓存"""
+        loop = asyncio.get_running_loop()
+        session = self._http_session
+        if session is None or session.closed or self._http_session_loop is not loop:
+            # 会话不能跨事件循环使用，循环变化时先关闭旧会话再重新创建
+            if session is not None and not session.closed:
+                await self._close_stale_http_session(session, self._http_session_loop)
+            session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=64))
+            self._http_session = session
+            self._http_session_loop = loop
+        return session
+    
+    @staticmethod
+    async def _close_stale_http_session(session: aiohttp.ClientSession,
+                                        session_loop: Optional[asyncio.AbstractEventLoop]):
+        """关闭绑定在其他事件循环上的旧会话：原循环仍在运行时交给原循环关闭，否则在当前循环中关闭"""
+        if session_loop is not None and session_loop.is_running():
+            asyncio.run_coroutine_threadsafe(session.close(), session_loop)
+            return
+        try:
+            await session.close()
+        except Exception as e:
+            # 原循环已关闭时连接的传输层也已随之关闭，这里只需把会话标记为关闭
+            logger.debug(f"关闭旧HTTP会话时出错: {e}")
+    
+    async def close(self):
+        """关闭连接测试使用的HTTP会话，应用关闭时调用"""
+        session = self._http_session
+        self._http_session = None
+        if session is not None and not session.closed:
+            if self._http_session_loop is asyncio.get_running_loop():
+                await session.close()
+            else:
+                await self._close_stale_http_session(session, self._http_session_loop)
+        self._http_session_loop = None
+    
     async def _test_server_connection(self, server: MCPServerConfig) -> str:
         """测试服务器连接"""
         try:
@@ -640,165 +1111,171 @@ class MCPConfigManager:
             # 使用服务器配置的超时时间，或默认30秒
             timeout = server.timeout or 30
             
-            if server.type == "websocket":
-                import websockets
-                uri = f"ws://{server.host}:{server.port}{server.path or '/'}"
-                logger.debug(f"WebSocket连接URI: {uri}")
+            # 按传输类型分派到对应的探测方法
+            probe = self._CONNECTION_PROBES.get(server.type)
+            if probe is None:
+                logger.warning(f"不支持的服务器类型: {server.type}")
+                return "unsupported_type"
+            return await probe(self, server, timeout)
                 
-                try:
-                    async with websockets.connect(uri, timeout=timeout) as websocket:
-                        # 发送MCP初始化消息进行协议验证
-                        init_message = {
-                            "jsonrpc": "2.0",
-                            "method": "initialize",
-                            "params": {
-                                "protocol_version": "2024-11-05",
-                                "client_info": {
-                                    "name": "mcp-config-test",
-                                    "version": "1.0.0"
-                                }
-                            },
-                            "id": 1
+        except Exception as e:
+            logger.error(f"测试服务器连接时发生未知错误 {server.name}: {type(e).__name__}: {e}")
+            return "unknown_error"
+    
+    async def _test_websocket_connection(self, server: MCPServerConfig, timeout: int) -> str:
+        """测试WebSocket服务器连接，发送MCP初始化消息验证协议"""
+        uri = f"ws://{server.host}:{server.port}{server.path or '/'}"
+        logger.debug(f"WebSocket连接URI: {uri}")
+        
+        try:
+            async with websockets.connect(uri, timeout=timeout) as websocket:
+                # 发送MCP初始化消息进行协议验证
+                init_message = {
+                    "jsonrpc": "2.0",
+                    "method": "initialize",
+                    "params": {
+                        "protocol_version": "2024-11-05",
+                        "client_info": {
+                            "name": "mcp-config-test",
+                            "version": "1.0.0"
                         }
-                        
-                        await websocket.send(json.dumps(init_message))
-                        
-                        # 等待响应，使用较短的超时时间
-                        import asyncio
-                        response = await asyncio.wait_for(websocket.recv(), timeout=10)
-                        response_data = json.loads(response)
-                        
-                        if "error" in response_data:
-                            logger.warning(f"MCP协议初始化失败: {response_data['error']}")
-                            return "protocol_error"
-                        
-                        logger.info(f"WebSocket MCP服务器连接成功: {server.name}")
-                        return "connected"
-                        
-                except websockets.exceptions.ConnectionClosed as e:
-                    logger.warning(f"WebSocket连接被关闭: {e}")
-                    return "connection_closed"
-                except asyncio.TimeoutError:
-                    logger.warning(f"WebSocket连接超时: {uri}")
-                    return "timeout"
-                    
-            elif server.type == "http":
-                import aiohttp
-                base_url = server.base_url
-                if not base_url:
-                    logger.error(f"HTTP服务器 {server.name} 缺少base_url配置")
-                    return "config_error"
-                
-                logger.debug(f"HTTP连接URL: {base_url}")
+                    },
+                    "id": 1
+                }
                 
-                try:
-                    timeout_config = aiohttp.ClientTimeout(total=timeout)
-                    async with aiohttp.ClientSession(timeout=timeout_config) as session:
-                        # 先尝试health检查
-                        health_url = f"{base_url.rstrip('/')}/health"
-                        async with session.get(health_url) as response:
-                            if response.status == 200:
-                                logger.info(f"HTTP MCP服务器连接成功: {server.name}")
-                                return "connected"
-                            else:
-                                logger.warning(f"HTTP健康检查失败: {response.status}")
-                                return "health_check_failed"
-                                
-                except aiohttp.ClientConnectorError as e:
-                    logger.warning(f"HTTP连接失败: {e}")
-                    return "connection_refused"
-                except asyncio.TimeoutError:
-                    logger.warning(f"HTTP连接超时: {base_url}")
-                    return "timeout"
-                    
-            elif server.type == "sse":
-                import aiohttp
-                uri = f"http://{server.host}:{server.port}{server.path or '/'}"
-                logger.debug(f"SSE连接URI: {uri}")
+                await websocket.send(json.dumps(init_message))
                 
-                try:
-                    timeout_config = aiohttp.ClientTimeout(total=timeout)
-                    async with aiohttp.ClientSession(timeout=timeout_config) as session:
-                        headers = {"Accept": "text/event-stream"}
-                        if server.auth_token:
-                            headers["Authorization"] = f"Bearer {server.auth_token}"
-                            
-                        async with session.get(uri, headers=headers) as response:
-                            if response.status == 200:
-                                logger.info(f"SSE MCP服务器连接成功: {server.name}")
-                                return "connected"
-                            else:
-                                logger.warning(f"SSE连接失败: {response.status}")
-                                return "sse_connection_failed"
-                                
-                except aiohttp.ClientConnectorError as e:
-                    logger.warning(f"SSE连接失败: {e}")
-                    return "connection_refused"
-                except asyncio.TimeoutError:
-                    logger.warning(f"SSE连接超时: {uri}")
-                    return "timeout"
-                    
-            elif server.type == "subprocess":
-                import subprocess
-                command = server.command
-                args = server.args or []
+                # 等待响应，使用较短的超时时间
+                response = await asyncio.wait_for(websocket.recv(), timeout=10)
+                # 只有响应中出现 "error" 键名时才需要完整解析，成功响应只做一次子串扫描
+                error_key = '"error"' if isinstance(response, str) else b'"error"'
+                if error_key in response:
+                    response_data = json.loads(response)
+                    if isinstance(response_data, dict) and "error" in response_data:
+                        logger.warning(f"MCP协议初始化失败: {response_data['error']}")
+                        return "protocol_error"
                 
-                if not command:
-                    logger.error(f"子进程服务器 {server.name} 缺少command配置")
-                    return "config_error"
+                logger.info(f"WebSocket MCP服务器连接成功: {server.name}")
+                return "connected"
                 
-                logger.debug(f"子进程命令: {command} {args}")
+        except websockets.exceptions.ConnectionClosed as e:
+            logger.warning(f"WebSocket连接被关闭: {e}")
+            return "connection_closed"
+        except asyncio.TimeoutError:
+            logger.warning(f"WebSocket连接超时: {uri}")
+            return "timeout"
+    
+    async def _test_http_connection(self, server: MCPServerConfig, timeout: int) -> str:
+        """测试HTTP服务器连接（health检查）"""
+        base_url = server.base_url
+        if not base_url:
+            logger.error(f"HTTP服务器 {server.name} 缺少base_url配置")
+            return "config_error"
+        
+        logger.debug(f"HTTP连接URL: {base_url}")
+        
+        try:
+            timeout_config = aiohttp.ClientTimeout(total=timeout)
+            session = await self._get_http_session()
+            # 先尝试health检查
+            health_url = f"{base_url.rstrip('/')}/health"
+            async with session.get(health_url, timeout=timeout_config) as response:
+                if response.status == 200:
+                    logger.info(f"HTTP MCP服务器连接成功: {server.name}")
+                    return "connected"
+                else:
+                    logger.warning(f"HTTP健康检查失败: {response.status}")
+                    return "health_check_failed"
+                        
+        except aiohttp.ClientConnectorError as e:
+            logger.warning(f"HTTP连接失败: {e}")
+            return "connection_refused"
+        except asyncio.TimeoutError:
+            logger.warning(f"HTTP连接超时: {base_url}")
+            return "timeout"
+    
+    async def _test_sse_connection(self, server: MCPServerConfig, timeout: int) -> str:
+        """测试SSE服务器连接"""
+        uri = f"http://{server.host}:{server.port}{server.path or '/'}"
+        logger.debug(f"SSE连接URI: {uri}")
+        
+        try:
+            timeout_config = aiohttp.ClientTimeout(total=timeout)
+            session = await self._get_http_session()
+            headers = {"Accept": "text/event-stream"}
+            if server.auth_token:
+                headers["Authorization"] = f"Bearer {server.auth_token}"
                 
-                try:
-                    # 尝试启动进程并快速检查
-                    process = subprocess.Popen(
-                        [command] + args,
-                        cwd=server.cwd,
-                        env=server.env,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        stdin=subprocess.PIPE
-                    )
-                    
-                    # 等待短时间检查进程是否正常启动
-                    import time
-                    time.sleep(2)
-                    
-                    if process.poll() is None:  # 进程仍在运行
-                        process.terminate()
-                        process.wait()
-                        logger.info(f"子进程MCP服务器测试成功: {server.name}")
-                        return "connected"
-                    else:
-                        stderr_output = process.stderr.read().decode() if process.stderr else ""
-                        logger.warning(f"子进程启动失败: {stderr_output}")
-                        return "subprocess_failed"
+            async with session.get(uri, headers=headers, timeout=timeout_config) as response:
+                if response.status == 200:
+                    logger.info(f"SSE MCP服务器连接成功: {server.name}")
+                    return "connected"
+                else:
+                    logger.warning(f"SSE连接失败: {response.status}")
+                    return "sse_connection_failed"
                         
-                except FileNotFoundError:
-                    logger.warning(f"子进程命令未找到: {command}")
-                    return "command_not_found"
-                except Exception as e:
-                    logger.warning(f"子进程测试失败: {e}")
-                    return "subprocess_error"
-                    
-            else:
-                logger.warning(f"不支持的服务器类型: {server.type}")
-                return "unsupported_type"
+        except aiohttp.ClientConnectorError as e:
+            logger.warning(f"SSE连接失败: {e}")
+            return "connection_refused"
+        except asyncio.TimeoutError:
+            logger.warning(f"SSE连接超时: {uri}")
+            return "timeout"
+    
+    async def _test_subprocess_connection(self, server: MCPServerConfig, timeout: int) -> str:
+        """测试子进程服务器能否正常启动"""
+        command = server.command
+        args = server.args or []
+        
+        if not command:
+            logger.error(f"子进程服务器 {server.name} 缺少command配置")
+            return "config_error"
+        
+        logger.debug(f"子进程命令: {command} {args}")
+        
+        try:
+            # 尝试启动进程并快速检查
+            process = await asyncio.create_subprocess_exec(
+                command, *args,
+                cwd=server.cwd,
+                env=server.env,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                stdin=asyncio.subprocess.PIPE
+            )
+            
+            # 等待短时间检查进程是否正常启动，等待期间不阻塞事件循环
+            try:
+                await asyncio.wait_for(process.wait(), timeout=2)
+            except asyncio.TimeoutError:
+                # 进程仍在运行
+                process.terminate()
+                await process.wait()
+                logger.info(f"子进程MCP服务器测试成功: {server.name}")
+                return "connected"
+            
+            stderr_output = (await process.stderr.read()).decode() if process.stderr else ""
+            logger.warning(f"子进程启动失败: {stderr_output}")
+            return "subprocess_failed"
                 
+        except FileNotFoundError:
+            logger.warning(f"子进程命令未找到: {command}")
+            return "command_not_found"
         except Exception as e:
-            logger.error(f"测试服务器连接时发生未知错误 {server.name}: {type(e).__name__}: {e}")
-            return "unknown_error"
+            logger.warning(f"子进程测试失败: {e}")
+            return "subprocess_error"
+            
+    # 服务器类型 -> 连接探测方法
+    _CONNECTION_PROBES = {
+        "websocket": _test_websocket_connection,
+        "http": _test_http_connection,
+        "sse": _test_sse_connection,
+        "subprocess": _test_subprocess_connection,
+    }
     
     def export_config(self, file_path: str) -> bool:
         """导出配置"""
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(
-                    self.current_config.dict(),
-                    f,
-                    ensure_ascii=False,
-                    indent=2
-                )
+            atomic_write_bytes(file_path, self._serialize_config())
             logger.info(f"✅ 配置导出成功: {file_path}")
             return True
         except Exception as e:
@@ -808,35 +1285,57 @@ class MCPConfigManager:
     def import_config(self, file_path: str) -> bool:
         """导入配置"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-                config = MCPConfiguration(**config_data)
-                
+            data = Path(file_path).read_bytes()
+            # 重复导入同一份文件时内容与当前配置的序列化结果相同，无需解析、校验和写盘
+            if self.current_config is not None and data == self._serialize_config():
+                logger.info(f"导入的配置与当前配置相同，无需更新: {file_path}")
+                # 当前配置可能还有尚未写盘的修改，返回前确保文件与之一致
+                self.flush_config()
+                return True
+            
+            config = MCPConfiguration.model_validate_json(data)
+            
             self.current_config = config
-            self._save_config()
+            # 整体替换配置时不走延迟保存而是立即写盘，写入失败时向调用方报告；
+            # 在保存锁内标记修改，避免与定时器线程正在进行的写盘交错而丢失标记
+            with self._save_lock:
+                self._mark_changed(replace=True)
+            self.flush_config()
             logger.info(f"✅ 配置导入成功: {file_path}")
             return True
-        except Exception as e:
+        except (OSError, ValueError) as e:
+            # ValueError 涵盖 JSON 解析错误和 pydantic ValidationError
             logger.error(f"❌ 配置导入失败: {e}")
             return False
     
     def get_backups(self) -> List[Dict[str, Any]]:
-        """获取备份列表"""
+        """获取备份列表；备份目录及其中的备份文件未变化时直接返回缓存的结果"""
         backups = []
         try:
-            for backup_file in sorted(self.backup_dir.glob("mcp_config_*.json"), reverse=True):
-                stat = backup_file.stat()
+            dir_mtime = os.stat(self.backup_dir).st_mtime_ns
+            entries = _scan_backup_entries(self.backup_dir)
+            entries.sort(key=_BACKUP_SORT_KEY, reverse=True)
+            # 目录修改时间精度较粗时，同一时间单位内新增/删除的备份只能从文件名变化看出，因此一并作为缓存键
+            cache_key = (dir_mtime, tuple(entry.name for entry in entries))
+            cache = self._backups_cache
+            if cache is not None and cache[0] == cache_key:
+                return list(cache[1])
+            
+            for entry in entries:
+                stat = entry.stat()
                 backups.append({
-                    "name": backup_file.name,
-                    "path": str(backup_file),
+                    "name": entry.name,
+                    "path": entry.path,
                     "size": stat.st_size,
-                    "created": datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                    "modified": datetime.fromtimestamp(stat.st_mtime).isoformat()
+                    "created": _isoformat_timestamp(stat.st_ctime),
+                    "modified": _isoformat_timestamp(stat.st_mtime)
                 })
         except Exception as e:
             logger.error(f"获取备份列表失败: {e}")
+            return backups
         
-        return backups
+        self._backups_cache = (cache_key, backups)
+        return list(backups)
     
     def restore_backup(self, backup_name: str) -> bool:
         """恢复备份"""
@@ -845,63 +1344,126 @@ class MCPConfigManager:
             if not backup_file.exists():
                 raise ValueError(f"备份文件不存在: {backup_name}")
             
-            with open(backup_file, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-                config = MCPConfiguration(**config_data)
+            # 备份同样完整校验：备份目录中可能有未经校验的内容（如配置更新接口写入的文件），
+            # 且 pydantic-core 校验比逐字段 model_construct 构建嵌套模型更快
+            config = _read_config_file(backup_file)
             
             self.current_config = config
-            self._save_config()
+            # 整体替换配置时不走延迟保存而是立即写盘，写入失败时向调用方报告；
+            # 在保存锁内标记修改，避免与定时器线程正在进行的写盘交错而丢失标记
+            with self._save_lock:
+                self._mark_changed(replace=True)
+            self.flush_config()
             logger.info(f"✅ 恢复备份成功: {backup_name}")
             return True
-        except Exception as e:
+        except (OSError, ValueError) as e:
             logger.error(f"❌ 恢复备份失败: {e}")
             return False
     
     def reload_config(self):
         """重新加载配置"""
         try:
+            # 先写入尚未保存的修改（文件已被外部修改时合并到文件内容上），避免被文件中的旧配置覆盖；
+            # 写入失败时不重新加载，保留内存中的修改
+            self.flush_config()
             self._load_config()
             logger.info("配置已重新加载")
         except Exception as e:
             logger.error(f"重新加载配置失败: {e}")
     
     async def reload_config_async(self):
-        """异步重新加载配置"""
-        self.reload_config()
+        """
+        异步重新加载配置，文件读取和解析在工作线程中执行，不阻塞事件循环；
+        返回时已完成一次在本次调用之后开始的重载
+        """
+        task = self._reload_task
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(asyncio.to_thread(self.reload_config))
+            self._reload_task = task
+            self._reload_next = None
+        else:
+            # 进行中的重载可能已读取过文件，看不到调用前的写入：在它结束后再重载一次，
+            # 期间到达的调用方共用这一次，并发请求最多多出一次解析
+            if self._reload_next is None:
+                self._reload_next = asyncio.ensure_future(self._reload_after(task))
+            task = self._reload_next
+        # shield: 单个等待方被取消时不影响其他共用该重载的调用方
+        await asyncio.shield(task)
+    
+    async def _reload_after(self, previous: asyncio.Future):
+        """等待进行中的重载结束后再执行一次重载"""
+        await asyncio.wait((previous,))
+        current = asyncio.current_task()
+        if self._reload_next is current:
+            # 本次重载开始，之后到达的调用方排队下一次
+            self._reload_task = current
+            self._reload_next = None
+        await asyncio.to_thread(self.reload_config)
     
     def get_tool_by_name(self, tool_name: str) -> Optional[MCPToolConfig]:
         """根据名称获取工具配置"""
         if not self.current_config:
             return None
         
-        for tool in self.current_config.tools:
-            if tool.name == tool_name:
-                return tool
-        return None
+        i = self._get_tool_index().get(tool_name)
+        return None if i is None else self.current_config.tools[i]
+    
+    def get_server_by_name(self, server_name: str) -> Optional[MCPServerConfig]:
+        """根据名称获取服务器配置"""
+        if not self.current_config:
+            return None
+        
+        i = self._get_server_index().get(server_name)
+        return None if i is None else self.current_config.servers[i]
     
     def get_server_for_tool(self, tool_name: str) -> Optional[MCPServerConfig]:
         """获取工具所属的服务器配置"""
         if not self.current_config:
             return None
         
+        source = (self.current_config.tools, self.current_config.servers)
+        cache_source = self._tool_server_cache_source
+        if cache_source is None or cache_source[0] is not source[0] or cache_source[1] is not source[1]:
+            self._tool_server_cache = {}
+            self._tool_server_cache_source = source
+        elif tool_name in self._tool_server_cache:
+            return self._tool_server_cache[tool_name]
+        
+        server = None
         # 查找工具配置
         tool_config = self.get_tool_by_name(tool_name)
-        if not tool_config:
-            return None
-        
-        # 根据server_name查找服务器配置
-        for server in self.current_config.servers:
-            if server.name == tool_config.server_name:
-                return server
-        return None
+        if tool_config:
+            # 根据server_name查找服务器配置
+            i = self._get_server_index().get(tool_config.server_name)
+            if i is not None:
+                server = self.current_config.servers[i]
+        self._tool_server_cache[tool_name] = server
+        return server
 
 
 # 全局配置管理器实例
 _config_manager = None
+_config_manager_lock = threading.Lock()
 
 def get_mcp_config_manager() -> MCPConfigManager:
-    """获取全局MCP配置管理器"""
+    """获取全局MCP配置管理器；实例创建后不再加锁，创建时加锁保证多线程下只创建一个实例"""
     global _config_manager
-    if _config_manager is None:
-        _config_manager = MCPConfigManager()
-    return _config_manager 
\ No newline at end of file
+    manager = _config_manager
+    if manager is not None:
+        return manager
+    with _config_manager_lock:
+        if _config_manager is None:
+            _config_manager = MCPConfigManager()
+        return _config_manager
+
+async def close_mcp_config_manager():
+    """应用关闭时调用：关闭全局配置管理器持有的HTTP会话，管理器尚未创建时不做任何事"""
+    manager = _config_manager
+    if manager is not None:
+        await manager.close()
+
+def flush_pending_config_save():
+    """直接读取配置文件前调用：写入全局配置管理器中尚未保存的修改，管理器尚未创建时不做任何事"""
+    manager = _config_manager
+    if manager is not None:
+        manager.flush_config()
@@ -4,13 +4,19 @@
 """
 
 import asyncio
+import copy
 import json
+import os
+import re
 import websockets
 import aiohttp
 import subprocess
 import sys
+import threading
 from typing import Dict, List, Optional, Any, Union, AsyncGenerator
 from datetime import datetime
+from pathlib import Path
+from pydantic import TypeAdapter
 from loguru import logger
 
 from .types import (
@@ -21,12 +27,114 @@ from .config import (
     MCPServerConfig, MCPToolConfig, 
     get_config_manager
 )
-from .config_manager import MCPConfigManager
+from .config_manager import MCPConfigManager, _dump_json_bytes, atomic_write_bytes
+
+# 可选依赖：orjson（C实现的JSON解析/序列化），未安装时回退到标准库json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def _json_loads(data: Union[str, bytes]) -> Any:
+    """解析JSON文本或UTF-8字节串（WebSocket帧、SSE数据行、HTTP响应体）"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj: Any) -> str:
+    """序列化为紧凑JSON字符串，用于WebSocket文本帧"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        except (orjson.JSONEncodeError, TypeError):
+            # orjson 不支持的情况（如超过64位的整数）回退到标准库
+            pass
+    return json.dumps(obj)
+
+
+# 工具列表校验器：发现的工具一次交给 pydantic-core 批量校验构建
+_TOOL_LIST_ADAPTER = TypeAdapter(List[MCPTool])
+
+# 内容固定的JSON-RPC请求帧，模块加载时序列化一次
+_INIT_MESSAGE = _json_dumps({
+    "jsonrpc": "2.0",
+    "method": "initialize",
+    "params": {
+        "protocol_version": "2024-11-05",
+        "client_info": {
+            "name": "dingtalk-k8s-bot",
+            "version": "1.0.0"
+        }
+    },
+    "id": 1
+})
+_TOOLS_LIST_MESSAGE = _json_dumps({
+    "jsonrpc": "2.0",
+    "method": "tools/list",
+    "params": {},
+    "id": 2
+})
+
+# 按工具名称推断风险等级：名称中含高风险（create/delete/patch/restart/rollback）
+# 或中等风险（update/scale）动作词的工具需要权限且不缓存，一次正则扫描完成匹配
+_RISKY_ACTION_PATTERN = re.compile(r"create|delete|patch|restart|rollback|update|scale")
+
+# 自动同步的工具配置默认字段
+_SYNCED_TOOL_DEFAULTS = {
+    "enabled": True,
+    "default_parameters": None,
+    "timeout": 30,
+    "cache_enabled": True,
+    "cache_ttl": 60,
+    "required_permissions": None,
+    "allowed_users": None,
+    "allowed_roles": None
+}
+
+# 工具同步时配置文件不存在所用的基础配置；servers 与 tool_routing 依赖具体服务器，创建时填充
+# 所有连接共用同一个配置文件，工具同步的读-改-写需互斥；
+# 连接可能运行在不同线程的事件循环中（如后台重载），因此使用线程锁
+_CONFIG_WRITE_LOCK = threading.Lock()
+
+_DEFAULT_MCP_CONFIG_TEMPLATE = {
+    "version": "1.0",
+    "name": "钉钉K8s运维机器人MCP配置",
+    "description": "支持K8s操作的MCP服务器配置",
+    "global_config": {
+        "timeout": 30000,
+        "retry_attempts": 3,
+        "retry_delay": 1000,
+        "max_concurrent_calls": 5,
+        "enable_cache": True,
+        "cache_timeout": 300000
+    },
+    "servers": [],
+    "tools": [],
+    "tool_routing": {},
+    "security": {
+        "enable_audit": True,
+        "audit_log_path": "logs/mcp_audit.log",
+        "rate_limit": {
+            "enabled": True,
+            "requests_per_minute": 100
+        }
+    },
+    "logging": {
+        "level": "INFO",
+        "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    }
+}
 
 
 class MCPServerConnection:
     """MCP服务器连接"""
     
+    # 子进程启动后观察是否退出的最长时间(秒)，进程提前退出时立即返回
+    SUBPROCESS_STARTUP_CHECK = 1.0
     def __init__(self, config: MCPServerConfig):
         self.config = config
         self.status = MCPConnectionStatus.DISCONNECTED
@@ -34,17 +142,34 @@ class MCPServerConnection:
         self.session = None
         self.process = None
         self.sse_task = None
+        # SSE事件流建立信号，启动监听任务时创建
+        self._sse_ready: Optional[asyncio.Event] = None
         self.stream_task = None
         self.tools: Dict[str, MCPTool] = {}
         self.last_ping = None
-        self.message_queue = asyncio.Queue()
+        # 等待SSE返回结果的工具调用: 请求ID -> Future，结果事件按ID直接投递
+        self._pending_results: Dict[str, asyncio.Future] = {}
         
         # 添加配置管理器引用，用于自动同步
         self.config_manager = None
+        # 认证请求头由配置决定，创建连接时计算一次，各请求共用
+        self._auth_headers = self._build_auth_headers()
+        # 工具同步写入的配置文件路径，首次同步时解析
+        self._resolved_config_path: Optional[Path] = None
+    
+    def _build_auth_headers(self) -> Dict[str, str]:
+        """根据配置构建认证请求头"""
+        headers = {}
+        if self.config.auth_headers:
+            headers.update(self.config.auth_headers)
+        if self.config.auth_token:
+            headers["Authorization"] = f"Bearer {self.config.auth_token}"
+        return headers
     
     def set_config_manager(self, config_manager):
         """设置配置管理器，用于自动同步"""
         self.config_manager = config_manager
+        self._resolved_config_path = None
     
     async def connect(self) -> bool:
         """连接到服务器"""
@@ -89,6 +214,15 @@ class MCPServerConnection:
             await self._cleanup_connection()
             return False
     
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取本连接共用的HTTP会话（事件流、工具发现与调用），复用连接池，首次使用时创建"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(keepalive_timeout=30),
+                timeout=aiohttp.ClientTimeout(total=self.config.timeout)
+            )
+        return self.session
+    
     async def _cleanup_connection(self):
         """清理连接资源"""
         try:
@@ -111,11 +245,7 @@ class MCPServerConnection:
         uri = f"ws://{self.config.host}:{self.config.port}{self.config.path}"
         logger.info(f"正在连接WebSocket: {uri}")
         
-        headers = {}
-        if self.config.auth_headers:
-            headers.update(self.config.auth_headers)
-        if self.config.auth_token:
-            headers["Authorization"] = f"Bearer {self.config.auth_token}"
+        headers = self._auth_headers
         
         # 设置超时
         import asyncio
@@ -161,26 +291,13 @@ class MCPServerConnection:
             raise MCPException("WEBSOCKET_CONNECTION_FAILED", f"WebSocket连接失败: {uri}, 错误: {e}")
         
         # 发送初始化消息
-        init_message = {
-            "jsonrpc": "2.0",
-            "method": "initialize",
-            "params": {
-                "protocol_version": "2024-11-05",
-                "client_info": {
-                    "name": "dingtalk-k8s-bot",
-                    "version": "1.0.0"
-                }
-            },
-            "id": 1
-        }
-        
-        logger.info(f"发送MCP初始化请求: {init_message}")
-        await self.websocket.send(json.dumps(init_message))
+        logger.info(f"发送MCP初始化请求: {_INIT_MESSAGE}")
+        await self.websocket.send(_INIT_MESSAGE)
         response = await self.websocket.recv()
         logger.info(f"收到MCP初始化响应: {response}")
         
         # 验证初始化响应
-        response_data = json.loads(response)
+        response_data = _json_loads(response)
         if "error" in response_data:
             raise MCPException("INIT_FAILED", f"MCP初始化失败: {response_data['error']}")
         
@@ -204,31 +321,46 @@ class MCPServerConnection:
         logger.info(f"正在连接SSE服务器: {uri}")
         
         # 创建HTTP会话
-        if not self.session:
-            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.config.timeout))
+        self._get_session()
+        
+        # 启动SSE事件监听任务并等待事件流建立
+        if await self._start_sse_listener(uri):
+            logger.info(f"SSE连接已建立: {uri}")
+    
+    async def _start_sse_listener(self, uri: str) -> bool:
+        """
+        启动SSE事件监听任务，等待事件流建立后返回，不再固定休眠
         
-        # 启动SSE事件监听任务
+        :return: 事件流是否已建立；监听任务提前结束或等待超时返回 False，由调用方检查 sse_task
+        """
+        self._sse_ready = asyncio.Event()
         self.sse_task = asyncio.create_task(self._sse_event_listener(uri))
         
-        # 等待连接建立
-        await asyncio.sleep(1)
-        logger.info(f"SSE连接已建立: {uri}")
+        ready_waiter = asyncio.ensure_future(self._sse_ready.wait())
+        try:
+            await asyncio.wait(
+                {ready_waiter, self.sse_task},
+                timeout=self.config.timeout,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            ready_waiter.cancel()
+        
+        if self._sse_ready.is_set():
+            return True
+        if not self.sse_task.done():
+            logger.warning(f"等待SSE事件流建立超时: {uri}")
+        return False
     
     async def _sse_event_listener(self, uri: str):
         """SSE事件监听器"""
-        headers = {}
-        if self.config.auth_headers:
-            headers.update(self.config.auth_headers)
-        if self.config.auth_token:
-            headers["Authorization"] = f"Bearer {self.config.auth_token}"
-        
         retry_count = 0
         max_retries = self.config.retry_attempts or 3
         
         while retry_count < max_retries:
             try:
                 logger.info(f"正在连接SSE事件流: {uri} (尝试 {retry_count + 1}/{max_retries})")
-                async with self.session.get(uri, headers=headers) as response:
+                async with self._get_session().get(uri, headers=self._auth_headers) as response:
                     if response.status != 200:
                         error_msg = f"SSE连接失败: HTTP {response.status}"
                         if response.status == 404:
@@ -240,23 +372,27 @@ class MCPServerConnection:
                         raise MCPException("SSE_CONNECTION_FAILED", error_msg)
                     
                     logger.info("SSE事件流连接成功，开始监听事件")
+                    if self._sse_ready is not None:
+                        self._sse_ready.set()
                     retry_count = 0  # 重置重试计数器
                     
+                    # 每次读取当前已到达的全部数据，按完整行批量处理，不再逐行调度协程
+                    buffer = bytearray()
                     current_event = None
-                    async for line in response.content:
-                        line = line.decode('utf-8').strip()
-                        
-                        if line.startswith('event:'):
-                            current_event = line[6:].strip()
-                        elif line.startswith('data:'):
-                            try:
-                                data = json.loads(line[5:].strip())
-                                await self._handle_sse_event(current_event, data)
-                            except json.JSONDecodeError as e:
-                                logger.warning(f"解析SSE事件数据失败: {e}, 数据: {line}")
-                        elif line == '':
-                            # 空行表示事件结束
-                            current_event = None
+                    while True:
+                        chunk = await response.content.readany()
+                        if chunk:
+                            buffer += chunk
+                            end = buffer.rfind(b'\n') + 1
+                        else:
+                            # 连接关闭，末尾不完整的行也一并处理
+                            end = len(buffer)
+                        if end:
+                            lines = bytes(buffer[:end]).splitlines()
+                            del buffer[:end]
+                            current_event = await self._process_sse_lines(lines, current_event)
+                        if not chunk:
+                            break
                             
             except asyncio.CancelledError:
                 logger.info("SSE事件监听器被取消")
@@ -293,51 +429,103 @@ class MCPServerConnection:
                     logger.error("SSE连接重试次数已达上限，放弃连接")
                     raise MCPException("SSE_CONNECTION_FAILED", f"SSE连接失败，已重试 {max_retries} 次: {e}")
     
+    async def _process_sse_lines(self, lines: List[bytes], current_event: Optional[str]) -> Optional[str]:
+        """处理一批SSE行并分发事件，返回处理后的当前事件名"""
+        for line in lines:
+            # 每行只按首个冒号切分一次，字段名直接按字节比较；只有事件名需要解码，数据部分直接交给JSON解析器
+            line = line.strip()
+            field, _, value = line.partition(b':')
+            
+            if field == b'event':
+                # 事件类型只有少数几种，驻留后分发表查找可直接按对象身份命中
+                current_event = sys.intern(value.strip().decode('utf-8'))
+            elif field == b'data':
+                if current_event == "heartbeat":
+                    # 心跳数据无需解析，直接刷新心跳时间，省去每次心跳的JSON解析和事件分发
+                    self.last_ping = datetime.now()
+                    continue
+                try:
+                    data = _json_loads(value)
+                    await self._handle_sse_event(current_event, data)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"解析SSE事件数据失败: {e}, 数据: {line.decode('utf-8', 'replace')}")
+            elif not line:
+                # 空行表示事件结束
+                current_event = None
+        return current_event
+    
     async def _handle_sse_event(self, event_type: str, data: Dict[str, Any]):
         """处理SSE事件"""
-        logger.debug(f"收到SSE事件: {event_type}, 数据: {data}")
+        # 参数形式传给 loguru，未启用 DEBUG 时不格式化事件数据（tools_list 可能很大）
+        logger.debug("收到SSE事件: {}, 数据: {}", event_type, data)
         
-        if event_type == "connected":
-            logger.info(f"SSE连接确认: {data.get('client_id')}")
-        elif event_type == "tools_list":
-            tools_data = data.get('tools', [])
-            logger.info(f"收到工具列表: {len(tools_data)} 个工具")
-            
-            # 🔥 新增：自动同步工具配置
-            await self._auto_sync_tools_config(tools_data)
-            
-        elif event_type == "tool_start":
-            logger.info(f"工具开始执行: {data.get('tool')}")
-        elif event_type == "tool_complete":
-            logger.info(f"工具执行完成: {data.get('tool')}")
-            # 将结果放入消息队列供工具调用等待
-            await self.message_queue.put({
-                "type": "tool_result",
-                "id": data.get("id"),
-                "result": data.get("result"),
-                "success": data.get("success", True)
-            })
-        elif event_type == "tool_error":
-            logger.error(f"工具执行错误: {data.get('tool')}, 错误: {data.get('error')}")
-            # 将错误放入消息队列
-            await self.message_queue.put({
-                "type": "tool_error",
-                "id": data.get("id"),
-                "error": data.get("error"),
-                "success": False
-            })
-        elif event_type == "heartbeat":
-            logger.debug("收到心跳事件")
-            self.last_ping = datetime.now()
-        else:
-            logger.debug(f"未知SSE事件类型: {event_type}")
+        handler = self._SSE_EVENT_HANDLERS.get(event_type)
+        if handler is None:
+            logger.debug("未知SSE事件类型: {}", event_type)
+            return
+        await handler(self, data)
     
-    async def _auto_sync_tools_config(self, tools_data: List[Dict[str, Any]]):
-        """自动同步工具配置到MCP配置文件"""
-        if not self.config_manager:
-            logger.debug("配置管理器未设置，跳过自动同步")
+    async def _on_sse_connected(self, data: Dict[str, Any]):
+        """SSE连接确认事件"""
+        logger.info(f"SSE连接确认: {data.get('client_id')}")
+    
+    async def _on_sse_tools_list(self, data: Dict[str, Any]):
+        """工具列表事件"""
+        if self.config_manager is None:
+            # 未设置配置管理器时无需同步，直接跳过
             return
         
+        tools_data = data.get('tools', [])
+        logger.info(f"收到工具列表: {len(tools_data)} 个工具")
+        
+        # 🔥 新增：自动同步工具配置
+        await self._auto_sync_tools_config(tools_data)
+    
+    async def _on_sse_tool_start(self, data: Dict[str, Any]):
+        """工具开始执行事件"""
+        logger.info(f"工具开始执行: {data.get('tool')}")
+    
+    async def _on_sse_tool_complete(self, data: Dict[str, Any]):
+        """工具执行完成事件"""
+        logger.info(f"工具执行完成: {data.get('tool')}")
+        # 将结果交给等待该请求的工具调用
+        self._resolve_pending_result({
+            "type": "tool_result",
+            "id": data.get("id"),
+            "result": data.get("result"),
+            "success": data.get("success", True)
+        })
+    
+    async def _on_sse_tool_error(self, data: Dict[str, Any]):
+        """工具执行错误事件"""
+        logger.error(f"工具执行错误: {data.get('tool')}, 错误: {data.get('error')}")
+        # 将错误交给等待该请求的工具调用
+        self._resolve_pending_result({
+            "type": "tool_error",
+            "id": data.get("id"),
+            "error": data.get("error"),
+            "success": False
+        })
+    
+    def _resolve_pending_result(self, message: Dict[str, Any]):
+        """按请求ID投递工具执行结果；没有对应等待者（已超时或非本客户端发起）时丢弃"""
+        future = self._pending_results.pop(message["id"], None)
+        if future is None or future.done():
+            logger.debug(f"工具执行结果无等待者，已忽略: {message['id']}")
+            return
+        future.set_result(message)
+    
+    # SSE事件类型 -> 处理方法，每个事件只需一次字典查找（心跳在 _process_sse_lines 中直接处理，不经过分发）
+    _SSE_EVENT_HANDLERS = {
+        "connected": _on_sse_connected,
+        "tools_list": _on_sse_tools_list,
+        "tool_start": _on_sse_tool_start,
+        "tool_complete": _on_sse_tool_complete,
+        "tool_error": _on_sse_tool_error,
+    }
+    
+    async def _auto_sync_tools_config(self, tools_data: List[Dict[str, Any]]):
+        """自动同步工具配置到MCP配置文件（调用方需确保已设置配置管理器）"""
         try:
             logger.info(f"🔄 开始自动同步工具配置: {self.config.name}")
             
@@ -352,44 +540,24 @@ class MCPServerConnection:
                 
                 tool_names.append(tool_name)
                 
-                # 构建工具配置
+                # 构建工具配置（未列出的字段取默认值，即安全操作的配置）
                 tool_config = {
+                    **_SYNCED_TOOL_DEFAULTS,
                     "name": tool_name,
                     "description": tool_data.get("description", ""),
                     "category": tool_data.get("category", "kubernetes"),
-                    "enabled": True,
                     "server_name": self.config.name,  # 添加服务器名称
                     "input_schema": tool_data.get("input_schema", {}),
-                    "default_parameters": None,
-                    "timeout": 30,
-                    "cache_enabled": True,
-                    "cache_ttl": 60,
-                    "required_permissions": None,
-                    "allowed_users": None,
-                    "allowed_roles": None
                 }
                 
-                # 根据工具名称推断风险等级和配置
-                if any(x in tool_name for x in ["create", "delete", "patch", "restart", "rollback"]):
-                    # 高风险操作
-                    tool_config.update({
-                        "timeout": 60,
-                        "cache_enabled": False,
-                        "required_permissions": [f"k8s:{tool_name.split('-')[1]}:{tool_name.split('-')[2]}"]
-                    })
-                elif any(x in tool_name for x in ["update", "scale"]):
-                    # 中等风险操作
+                # 根据工具名称中的动作词推断风险等级和配置
+                if _RISKY_ACTION_PATTERN.search(tool_name):
+                    # 高/中等风险操作（工具名形如 k8s-<动作>-<资源>，名称只拆分一次）
+                    parts = tool_name.split('-')
                     tool_config.update({
                         "timeout": 60,
                         "cache_enabled": False,
-                        "required_permissions": [f"k8s:{tool_name.split('-')[1]}:{tool_name.split('-')[2]}"]
-                    })
-                else:
-                    # 安全操作（查询类）
-                    tool_config.update({
-                        "timeout": 30,
-                        "cache_enabled": True,
-                        "cache_ttl": 60
+                        "required_permissions": [f"k8s:{parts[1]}:{parts[2]}"]
                     })
                 
                 tool_configs.append(tool_config)
@@ -402,114 +570,69 @@ class MCPServerConnection:
         except Exception as e:
             logger.error(f"❌ 自动同步工具配置失败: {e}")
     
-    async def _update_mcp_config_file(self, tool_names: List[str], tool_configs: List[Dict[str, Any]]):
-        """更新MCP配置文件"""
-        try:
-            # 从config_manager获取配置文件路径
-            from pathlib import Path
-            import os
-            
-            if hasattr(self.config_manager, 'config_file'):
-                config_path = Path(self.config_manager.config_file)  # 确保转换为Path对象
-            else:
-                # 回退到默认路径，使用绝对路径查找
-                
-                # 尝试多个可能的路径
-                possible_paths = [
-                    "backend/config/mcp_config.json",
-                    "config/mcp_config.json", 
-                    "../backend/config/mcp_config.json",
-                    os.path.join(os.getcwd(), "backend", "config", "mcp_config.json")
-                ]
-                
-                config_path = None
-                for path in possible_paths:
-                    if Path(path).exists():
-                        config_path = Path(path)
-                        logger.info(f"🔍 找到配置文件: {config_path.absolute()}")
-                        break
-                
-                if not config_path:
-                    # 如果都没找到，使用当前工作目录的相对路径
-                    config_path = Path("backend/config/mcp_config.json")
-                    logger.warning(f"⚠️ 配置文件不存在，将尝试创建: {config_path.absolute()}")
-                    
-                    # 确保目录存在
-                    config_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # 读取现有配置
-            if config_path.exists():
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-            else:
-                # 创建基础配置
-                logger.info(f"📝 创建新的MCP配置文件: {config_path}")
-                config = {
-                    "version": "1.0",
-                    "name": "钉钉K8s运维机器人MCP配置",
-                    "description": "支持K8s操作的MCP服务器配置",
-                    "global_config": {
-                        "timeout": 30000,
-                        "retry_attempts": 3,
-                        "retry_delay": 1000,
-                        "max_concurrent_calls": 5,
-                        "enable_cache": True,
-                        "cache_timeout": 300000
-                    },
-                    "servers": [
-                        {
-                            "name": self.config.name,
-                            "type": self.config.type,
-                            "enabled": True,
-                            "host": getattr(self.config, 'host', 'localhost'),
-                            "port": getattr(self.config, 'port', 8766),
-                            "path": getattr(self.config, 'path', '/events'),
-                            "timeout": self.config.timeout,
-                            "retry_attempts": self.config.retry_attempts,
-                            "retry_delay": self.config.retry_delay,
-                            "enabled_tools": [],
-                            "disabled_tools": None
-                        }
-                    ],
-                    "tools": [],
-                    "tool_routing": {
-                        "k8s-*": self.config.name
-                    },
-                    "security": {
-                        "enable_audit": True,
-                        "audit_log_path": "logs/mcp_audit.log",
-                        "rate_limit": {
-                            "enabled": True,
-                            "requests_per_minute": 100
-                        }
-                    },
-                    "logging": {
-                        "level": "INFO",
-                        "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-                    }
-                }
+    def _resolve_config_path(self) -> Path:
+        """解析工具同步要写入的配置文件路径，结果缓存在实例上，后续同步不再逐个探测候选路径"""
+        if self._resolved_config_path is not None:
+            return self._resolved_config_path
+        
+        # 从config_manager获取配置文件路径
+        if hasattr(self.config_manager, 'config_file'):
+            config_path = Path(self.config_manager.config_file)  # 确保转换为Path对象
+        else:
+            # 回退到默认路径，使用绝对路径查找
             
-            # 使用统一的备份机制（通过 MCPConfigManager）
-            # 不在这里直接创建备份，让 MCPConfigManager 处理备份
-            logger.debug(f"📁 配置将由 MCPConfigManager 统一备份")
+            # 尝试多个可能的路径
+            possible_paths = [
+                "backend/config/mcp_config.json",
+                "config/mcp_config.json", 
+                "../backend/config/mcp_config.json",
+                os.path.join(os.getcwd(), "backend", "config", "mcp_config.json")
+            ]
             
-            # 更新服务器的enabled_tools
-            for server in config.get("servers", []):
-                if server.get("name") == self.config.name:
-                    old_count = len(server.get("enabled_tools", []))
-                    server["enabled_tools"] = tool_names
-                    logger.info(f"🔧 更新服务器 {server['name']} 工具列表: {old_count} → {len(tool_names)}")
+            config_path = None
+            for path in possible_paths:
+                if Path(path).exists():
+                    config_path = Path(path)
+                    logger.info(f"🔍 找到配置文件: {config_path.absolute()}")
                     break
             
-            # 替换所有K8s工具配置
-            non_k8s_tools = [tool for tool in config.get("tools", []) if not tool["name"].startswith("k8s-")]
-            config["tools"] = non_k8s_tools + tool_configs
-            
-            logger.info(f"🔧 更新工具配置: {len(tool_configs)} 个K8s工具")
+            if not config_path:
+                # 如果都没找到，使用当前工作目录的相对路径
+                config_path = Path("backend/config/mcp_config.json")
+                logger.warning(f"⚠️ 配置文件不存在，将尝试创建: {config_path.absolute()}")
+                
+                # 确保目录存在
+                config_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self._resolved_config_path = config_path
+        return config_path
+    
+    def _build_default_config(self) -> Dict[str, Any]:
+        """基于模块级模板生成包含当前服务器的基础配置"""
+        config = copy.deepcopy(_DEFAULT_MCP_CONFIG_TEMPLATE)
+        config["servers"].append({
+            "name": self.config.name,
+            "type": self.config.type,
+            "enabled": True,
+            "host": getattr(self.config, 'host', 'localhost'),
+            "port": getattr(self.config, 'port', 8766),
+            "path": getattr(self.config, 'path', '/events'),
+            "timeout": self.config.timeout,
+            "retry_attempts": self.config.retry_attempts,
+            "retry_delay": self.config.retry_delay,
+            "enabled_tools": [],
+            "disabled_tools": None
+        })
+        config["tool_routing"]["k8s-*"] = self.config.name
+        return config
+    
+    async def _update_mcp_config_file(self, tool_names: List[str], tool_configs: List[Dict[str, Any]]):
+        """更新MCP配置文件"""
+        try:
+            config_path = self._resolve_config_path()
             
-            # 写回配置文件
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
+            # 文件读写放到线程中执行，避免阻塞其他连接的事件处理
+            await asyncio.to_thread(self._write_synced_tools, config_path, tool_names, tool_configs)
             
             logger.info(f"💾 配置文件已更新: {config_path}")
             
@@ -525,22 +648,55 @@ class MCPServerConnection:
             logger.error(f"❌ 更新配置文件失败: {e}")
             raise
     
+    def _write_synced_tools(self, config_path: Path, tool_names: List[str], tool_configs: List[Dict[str, Any]]):
+        """在工作线程中把同步到的工具写入配置文件"""
+        # 各服务器连接并行建立后会同时同步工具，读-改-写整个过程需串行，否则后写入者会覆盖先写入者的修改
+        with _CONFIG_WRITE_LOCK:
+            # 配置管理器的修改延迟写盘，读取文件前先写入，避免这些修改被本次同步覆盖
+            if hasattr(self.config_manager, 'flush_config'):
+                self.config_manager.flush_config()
+            
+            # 读取现有配置（直接读取，文件不存在时再创建，省去单独的存在性检查）
+            try:
+                config = _json_loads(config_path.read_bytes())
+            except FileNotFoundError:
+                # 创建基础配置
+                logger.info(f"📝 创建新的MCP配置文件: {config_path}")
+                config = self._build_default_config()
+            
+            # 使用统一的备份机制（通过 MCPConfigManager）
+            # 不在这里直接创建备份，让 MCPConfigManager 处理备份
+            logger.debug(f"📁 配置将由 MCPConfigManager 统一备份")
+            
+            # 更新服务器的enabled_tools
+            server = next((item for item in config.get("servers", []) if item.get("name") == self.config.name), None)
+            if server is not None:
+                old_count = len(server.get("enabled_tools") or [])
+                server["enabled_tools"] = tool_names
+                logger.info(f"🔧 更新服务器 {server['name']} 工具列表: {old_count} → {len(tool_names)}")
+            
+            # 替换所有K8s工具配置：按名称建索引，同名工具以本次同步结果为准，避免重复同步后出现重复条目
+            tools_by_name = {
+                tool["name"]: tool for tool in config.get("tools", [])
+                if not tool["name"].startswith("k8s-")
+            }
+            tools_by_name.update((tool["name"], tool) for tool in tool_configs)
+            config["tools"] = list(tools_by_name.values())
+            
+            logger.info(f"🔧 更新工具配置: {len(tool_configs)} 个K8s工具")
+            
+            # 写回配置文件（临时文件 + 原子替换，写入中途退出不会留下损坏的配置）
+            atomic_write_bytes(config_path, _dump_json_bytes(config))
+    
     async def _sse_event_source(self, uri: str) -> AsyncGenerator[str, None]:
         """SSE事件源消费者（已弃用，使用_sse_event_listener替代）"""
-        headers = {}
-        if self.config.auth_headers:
-            headers.update(self.config.auth_headers)
-        if self.config.auth_token:
-            headers["Authorization"] = f"Bearer {self.config.auth_token}"
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(uri, headers=headers, timeout=self.config.timeout) as response:
-                if response.status != 200:
-                    raise MCPException("SSE_CONNECTION_FAILED", f"SSE连接失败: {response.status}")
-                
-                async for line in response.content:
-                    if line.strip():
-                        yield line.decode('utf-8')
+        async with self._get_session().get(uri, headers=self._auth_headers) as response:
+            if response.status != 200:
+                raise MCPException("SSE_CONNECTION_FAILED", f"SSE连接失败: {response.status}")
+            
+            async for line in response.content:
+                if line.strip():
+                    yield line.decode('utf-8')
     
     async def _connect_stream_http(self):
         """连接Stream HTTP服务器"""
@@ -549,20 +705,13 @@ class MCPServerConnection:
     
     async def _stream_http_event_source(self, uri: str) -> AsyncGenerator[str, None]:
         """Stream HTTP事件源消费者"""
-        headers = {}
-        if self.config.auth_headers:
-            headers.update(self.config.auth_headers)
-        if self.config.auth_token:
-            headers["Authorization"] = f"Bearer {self.config.auth_token}"
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(uri, headers=headers, timeout=self.config.timeout) as response:
-                if response.status != 200:
-                    raise MCPException("STREAM_HTTP_CONNECTION_FAILED", f"Stream HTTP连接失败: {response.status}")
-                
-                async for line in response.content:
-                    if line.strip():
-                        yield line.decode('utf-8')
+        async with self._get_session().get(uri, headers=self._auth_headers) as response:
+            if response.status != 200:
+                raise MCPException("STREAM_HTTP_CONNECTION_FAILED", f"Stream HTTP连接失败: {response.status}")
+            
+            async for line in response.content:
+                if line.strip():
+                    yield line.decode('utf-8')
     
     async def _connect_subprocess(self):
         """启动子进程服务器"""
@@ -572,7 +721,6 @@ class MCPServerConnection:
         
         env = None
         if self.config.env:
-            import os
             env = os.environ.copy()
             env.update(self.config.env)
         
@@ -585,8 +733,11 @@ class MCPServerConnection:
             env=env
         )
         
-        # 等待进程启动
-        await asyncio.sleep(1)
+        # 启动后观察进程是否退出（如命令不存在或参数错误），进程提前退出时无需等满检查时间
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout=self.SUBPROCESS_STARTUP_CHECK)
+        except asyncio.TimeoutError:
+            pass
         
         if self.process.returncode is not None:
             raise MCPException("SUBPROCESS_FAILED", f"子进程启动失败: {self.process.returncode}")
@@ -618,32 +769,35 @@ class MCPServerConnection:
         except Exception as e:
             logger.error(f"发现工具失败 {self.config.name}: {e}")
     
+    @staticmethod
+    def _tools_from_dicts(tools_data: List[Dict[str, Any]], provider: str) -> List[MCPTool]:
+        """由服务器返回的工具描述批量构建MCPTool，兼容 inputSchema / input_schema 两种字段名
+
+        工具名会被驻留：每次工具列表更新和各处以工具名为键的字典共用同一个字符串对象
+        """
+        return _TOOL_LIST_ADAPTER.validate_python([
+            {
+                "name": sys.intern(tool_data["name"]),
+                "description": tool_data.get("description", ""),
+                "input_schema": tool_data.get("inputSchema") or tool_data.get("input_schema") or {},
+                "category": tool_data.get("category"),
+                "version": tool_data.get("version"),
+                "provider": provider
+            }
+            for tool_data in tools_data
+        ])
+    
     async def _discover_tools_websocket(self):
         """通过WebSocket发现工具"""
-        message = {
-            "jsonrpc": "2.0",
-            "method": "tools/list",
-            "params": {},
-            "id": 2
-        }
-        
-        await self.websocket.send(json.dumps(message))
+        await self.websocket.send(_TOOLS_LIST_MESSAGE)
         response = await self.websocket.recv()
-        response_data = json.loads(response)
+        response_data = _json_loads(response)
         
         if "error" in response_data:
             raise MCPException("TOOL_DISCOVERY_FAILED", f"工具发现失败: {response_data['error']}")
         
         tools_data = response_data.get("result", {}).get("tools", [])
-        for tool_data in tools_data:
-            tool = MCPTool(
-                name=tool_data["name"],
-                description=tool_data.get("description", ""),
-                input_schema=tool_data.get("inputSchema", {}),
-                category=tool_data.get("category"),
-                version=tool_data.get("version"),
-                provider=self.config.name
-            )
+        for tool in self._tools_from_dicts(tools_data, self.config.name):
             self.tools[tool.name] = tool
     
     async def _discover_tools_http(self):
@@ -652,46 +806,21 @@ class MCPServerConnection:
             if response.status != 200:
                 raise MCPException("TOOL_DISCOVERY_FAILED", f"HTTP工具发现失败: {response.status}")
             
-            tools_data = await response.json()
-            for tool_data in tools_data:
-                tool = MCPTool(
-                    name=tool_data["name"],
-                    description=tool_data.get("description", ""),
-                    input_schema=tool_data.get("inputSchema", {}),
-                    category=tool_data.get("category"),
-                    version=tool_data.get("version"),
-                    provider=self.config.name
-                )
+            tools_data = await response.json(loads=_json_loads)
+            for tool in self._tools_from_dicts(tools_data, self.config.name):
                 self.tools[tool.name] = tool
     
     async def _discover_tools_sse(self):
         """通过SSE发现工具"""
         # SSE工具发现：通过HTTP API获取工具列表
-        if not self.session:
-            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.config.timeout))
-        
-        headers = {}
-        if self.config.auth_headers:
-            headers.update(self.config.auth_headers)
-        if self.config.auth_token:
-            headers["Authorization"] = f"Bearer {self.config.auth_token}"
-        
-        async with self.session.get(f"http://{self.config.host}:{self.config.port}/tools", headers=headers) as response:
+        async with self._get_session().get(f"http://{self.config.host}:{self.config.port}/tools", headers=self._auth_headers) as response:
             if response.status != 200:
                 raise MCPException("TOOL_DISCOVERY_FAILED", f"SSE工具发现失败: {response.status}")
             
-            response_data = await response.json()
+            response_data = await response.json(loads=_json_loads)
             tools_data = response_data.get("tools", [])
             
-            for tool_data in tools_data:
-                tool = MCPTool(
-                    name=tool_data["name"],
-                    description=tool_data.get("description", ""),
-                    input_schema=tool_data.get("input_schema", {}),
-                    category=tool_data.get("category"),
-                    version=tool_data.get("version"),
-                    provider=self.config.name
-                )
+            for tool in self._tools_from_dicts(tools_data, self.config.name):
                 self.tools[tool.name] = tool
                 
             logger.info(f"通过SSE发现 {len(self.tools)} 个工具")
@@ -699,29 +828,12 @@ class MCPServerConnection:
     async def _discover_tools_stream_http(self):
         """通过Stream HTTP发现工具"""
         # Stream HTTP通常用于流式响应，工具发现可能需要通过HTTP API
-        if not self.session:
-            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.config.timeout))
-        
-        headers = {}
-        if self.config.auth_headers:
-            headers.update(self.config.auth_headers)
-        if self.config.auth_token:
-            headers["Authorization"] = f"Bearer {self.config.auth_token}"
-        
-        async with self.session.get(f"http://{self.config.host}:{self.config.port}/tools", headers=headers) as response:
+        async with self._get_session().get(f"http://{self.config.host}:{self.config.port}/tools", headers=self._auth_headers) as response:
             if response.status != 200:
                 raise MCPException("TOOL_DISCOVERY_FAILED", f"Stream HTTP工具发现失败: {response.status}")
             
-            tools_data = await response.json()
-            for tool_data in tools_data:
-                tool = MCPTool(
-                    name=tool_data["name"],
-                    description=tool_data.get("description", ""),
-                    input_schema=tool_data.get("inputSchema", {}),
-                    category=tool_data.get("category"),
-                    version=tool_data.get("version"),
-                    provider=self.config.name
-                )
+            tools_data = await response.json(loads=_json_loads)
+            for tool in self._tools_from_dicts(tools_data, self.config.name):
                 self.tools[tool.name] = tool
     
     async def _discover_tools_rpc(self):
@@ -778,9 +890,9 @@ class MCPServerConnection:
             "id": 3
         }
         
-        await self.websocket.send(json.dumps(message))
+        await self.websocket.send(_json_dumps(message))
         response = await self.websocket.recv()
-        response_data = json.loads(response)
+        response_data = _json_loads(response)
         
         if "error" in response_data:
             raise MCPException("TOOL_CALL_FAILED", f"工具调用失败: {response_data['error']}")
@@ -796,7 +908,7 @@ class MCPServerConnection:
             if response.status != 200:
                 raise MCPException("TOOL_CALL_FAILED", f"HTTP工具调用失败: {response.status}")
             
-            return await response.json()
+            return await response.json(loads=_json_loads)
     
     async def _call_tool_sse(self, name: str, parameters: Dict[str, Any], timeout: float = 30.0) -> Any:
         """通过SSE调用工具"""
@@ -806,22 +918,13 @@ class MCPServerConnection:
         if not self.sse_task or self.sse_task.done():
             logger.warning("⚠️ SSE连接未建立或已断开，尝试重新连接...")
             uri = f"http://{self.config.host}:{self.config.port}{self.config.path}"
-            self.sse_task = asyncio.create_task(self._sse_event_listener(uri))
-            # 等待连接建立
-            await asyncio.sleep(2)
-            
-        if not self.session:
-            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.config.timeout))
+            await self._start_sse_listener(uri)
         
         # 生成唯一的请求ID
         import uuid
         request_id = str(uuid.uuid4())
         
-        headers = {"Content-Type": "application/json"}
-        if self.config.auth_headers:
-            headers.update(self.config.auth_headers)
-        if self.config.auth_token:
-            headers["Authorization"] = f"Bearer {self.config.auth_token}"
+        headers = {"Content-Type": "application/json", **self._auth_headers}
         
         # 发送工具调用请求
         request_data = {
@@ -832,66 +935,49 @@ class MCPServerConnection:
         
         logger.info(f"发送SSE工具调用请求: {name}, ID: {request_id}")
         
-        async with self.session.post(
-            f"http://{self.config.host}:{self.config.port}/tools/call",
-            json=request_data,
-            headers=headers
-        ) as response:
-            if response.status != 200:
-                raise MCPException("TOOL_CALL_FAILED", f"SSE工具调用失败: {response.status}")
+        # 发送请求前登记等待者，结果可能在HTTP响应返回前就通过SSE到达
+        future = asyncio.get_running_loop().create_future()
+        self._pending_results[request_id] = future
+        try:
+            async with self._get_session().post(
+                f"http://{self.config.host}:{self.config.port}/tools/call",
+                json=request_data,
+                headers=headers
+            ) as response:
+                if response.status != 200:
+                    raise MCPException("TOOL_CALL_FAILED", f"SSE工具调用失败: {response.status}")
+                
+                # HTTP响应只是确认请求已接收，实际结果通过SSE返回
+                response_data = await response.json(loads=_json_loads)
+                logger.info(f"工具调用请求已发送: {response_data}")
             
-            # HTTP响应只是确认请求已接收，实际结果通过SSE返回
-            response_data = await response.json()
-            logger.info(f"工具调用请求已发送: {response_data}")
-        
-        # 等待SSE事件中的工具执行结果
-        return await self._wait_for_tool_result(request_id, timeout)
+            # 等待SSE事件中的工具执行结果
+            return await self._wait_for_tool_result(request_id, future, timeout)
+        finally:
+            self._pending_results.pop(request_id, None)
     
-    async def _wait_for_tool_result(self, request_id: str, timeout: float = 30.0) -> Any:
+    async def _wait_for_tool_result(self, request_id: str, future: asyncio.Future, timeout: float = 30.0) -> Any:
         """等待工具执行结果"""
         logger.info(f"等待工具执行结果: {request_id}")
         
-        start_time = asyncio.get_event_loop().time()
+        try:
+            message = await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            raise MCPException("TOOL_CALL_TIMEOUT", f"工具调用超时: {request_id}")
+        
+        if message.get("type") == "tool_error":
+            logger.error(f"工具执行失败: {request_id}, 错误: {message.get('error')}")
+            raise MCPException("TOOL_EXECUTION_FAILED", message.get("error", "未知错误"))
         
-        while True:
-            try:
-                # 等待消息队列中的结果
-                message = await asyncio.wait_for(
-                    self.message_queue.get(),
-                    timeout=1.0  # 短超时，用于检查总超时
-                )
-                
-                # 检查是否是我们等待的结果
-                if message.get("id") == request_id:
-                    if message.get("type") == "tool_result":
-                        logger.info(f"收到工具执行结果: {request_id}")
-                        return message.get("result")
-                    elif message.get("type") == "tool_error":
-                        logger.error(f"工具执行失败: {request_id}, 错误: {message.get('error')}")
-                        raise MCPException("TOOL_EXECUTION_FAILED", message.get("error", "未知错误"))
-                else:
-                    # 不是我们等待的结果，重新放回队列
-                    await self.message_queue.put(message)
-                
-            except asyncio.TimeoutError:
-                # 检查总超时
-                if asyncio.get_event_loop().time() - start_time > timeout:
-                    raise MCPException("TOOL_CALL_TIMEOUT", f"工具调用超时: {request_id}")
-                continue
+        logger.info(f"收到工具执行结果: {request_id}")
+        return message.get("result")
     
     async def _call_tool_stream_http(self, name: str, parameters: Dict[str, Any]) -> Any:
         """通过Stream HTTP调用工具"""
         # Stream HTTP用于流式响应，可能需要特殊处理
-        if not self.session:
-            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.config.timeout))
+        headers = {"Content-Type": "application/json", "Accept": "text/event-stream", **self._auth_headers}
         
-        headers = {"Content-Type": "application/json", "Accept": "text/event-stream"}
-        if self.config.auth_headers:
-            headers.update(self.config.auth_headers)
-        if self.config.auth_token:
-            headers["Authorization"] = f"Bearer {self.config.auth_token}"
-        
-        async with self.session.post(
+        async with self._get_session().post(
             f"http://{self.config.host}:{self.config.port}/tools/{name}/call",
             json={"arguments": parameters},
             headers=headers
@@ -907,7 +993,7 @@ class MCPServerConnection:
                         result.append(line.decode('utf-8'))
                 return {"stream_data": result}
             else:
-                return await response.json()
+                return await response.json(loads=_json_loads)
     
     async def _call_tool_rpc(self, name: str, parameters: Dict[str, Any]) -> Any:
         """通过RPC调用工具"""
@@ -1002,6 +1088,7 @@ class EnhancedMCPClient:
         self.config_manager = config_manager or get_config_manager()
         self.connections: Dict[str, MCPServerConnection] = {}
         self.tools: Dict[str, MCPTool] = {}
+        self.tools_version = 0  # 工具列表版本号，每次工具列表变化时递增
         self.stats = MCPStats()
         self.status = MCPConnectionStatus.DISCONNECTED
         
@@ -1062,6 +1149,7 @@ class EnhancedMCPClient:
                         self.tools[tool_name] = tool
                         logger.debug(f"📦 工具无配置，默认加载: {tool_name}")
         
+        self.tools_version += 1
         self.stats.active_tools = len(self.tools)
         logger.info(f"收集到 {len(self.tools)} 个可用工具")
     
@@ -1187,6 +1275,7 @@ class EnhancedMCPClient:
         
         self.connections.clear()
         self.tools.clear()
+        self.tools_version += 1
         self.status = MCPConnectionStatus.DISCONNECTED
         logger.info("MCP客户端已断开连接")
     
@@ -3,6 +3,7 @@ MCP (Model Context Protocol) 类型定义 - Python版本
 """
 
 from typing import Dict, List, Optional, Any, Union, Literal
+from typing_extensions import TypedDict
 from pydantic import BaseModel, Field
 from datetime import datetime
 from enum import Enum
@@ -93,12 +94,19 @@ class ChatMessage(BaseModel):
     function_call: Optional[FunctionCall] = Field(None, description="函数调用")
 
 
+class Usage(TypedDict, total=False):
+    """Token使用情况（已由处理器规范化为整数字段）"""
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+
+
 class ProcessResult(BaseModel):
     """LLM处理结果"""
     content: str = Field(..., description="响应内容")
     function_calls: Optional[List[FunctionCallResult]] = Field(None, description="函数调用结果")
     conversation_id: Optional[str] = Field(None, description="会话ID")
-    usage: Optional[Dict[str, int]] = Field(None, description="Token使用情况")
+    usage: Optional[Usage] = Field(None, description="Token使用情况")
 
 
 class LLMProviderConfig(BaseModel):
@@ -0,0 +1,35 @@
+"""
+JSON 序列化工具
+优先使用 orjson（C 实现，直接输出 UTF-8），未安装时回退到标准库 json
+"""
+
+import json
+from typing import Any, Callable, Optional
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def dumps(obj: Any, indent: bool = False, default: Optional[Callable[[Any], Any]] = str) -> str:
+    """
+    序列化为JSON字符串，非ASCII字符原样输出（等价于 ensure_ascii=False）
+
+    :param obj: 待序列化对象
+    :param indent: 是否使用2空格缩进
+    :param default: 无法序列化对象的转换函数
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=default, option=option).decode("utf-8")
+        except (orjson.JSONEncodeError, TypeError):
+            # orjson 不支持的情况（如超过64位的整数）回退到标准库
+            pass
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None, default=default)
+
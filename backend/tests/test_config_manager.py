@@ -3,9 +3,11 @@ MCP配置管理器单元测试
 """
 
 import unittest
+import asyncio
 import tempfile
 import json
 import os
+import threading
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
@@ -131,6 +133,67 @@ class TestMCPConfigManager(unittest.TestCase):
         except Exception as e:
             self.fail(f"配置结构验证失败: {e}")
     
+    def test_http_session_closed_on_loop_change(self):
+        """事件循环变化时关闭旧的HTTP会话，close() 关闭当前会话"""
+        with patch('mcp.config_manager.MCPConfigManager._load_config'):
+            with patch('mcp.config_manager.MCPConfigManager._load_templates'):
+                with patch('mcp.config_manager.MCPConfigManager.migrate_config_if_needed'):
+                    manager = MCPConfigManager(self.config_path)
+        
+        first = asyncio.run(manager._get_http_session())
+        
+        async def use_new_loop():
+            session = await manager._get_http_session()
+            await manager.close()
+            return session
+        
+        second = asyncio.run(use_new_loop())
+        
+        self.assertIsNot(first, second)
+        self.assertTrue(first.closed)
+        self.assertTrue(second.closed)
+        self.assertIsNone(manager._http_session)
+    
+    def test_reload_requested_during_reload_runs_again(self):
+        """重载进行中到达的请求等待一次在其之后开始的重载，期间的请求共用这一次"""
+        with patch('mcp.config_manager.MCPConfigManager._load_config'):
+            with patch('mcp.config_manager.MCPConfigManager._load_templates'):
+                with patch('mcp.config_manager.MCPConfigManager.migrate_config_if_needed'):
+                    manager = MCPConfigManager(self.config_path)
+        
+        started = threading.Event()
+        release = threading.Event()
+        completed = []
+        
+        def slow_reload():
+            started.set()
+            release.wait(5)
+            completed.append(len(completed) + 1)
+        
+        async def run():
+            first = asyncio.create_task(manager.reload_config_async())
+            await asyncio.to_thread(started.wait, 5)
+            second = asyncio.create_task(manager.reload_config_async())
+            third = asyncio.create_task(manager.reload_config_async())
+            await asyncio.sleep(0)
+            self.assertFalse(second.done())
+            release.set()
+            await asyncio.gather(first, second, third)
+            self.assertEqual(completed, [1, 2])
+        
+        with patch.object(manager, 'reload_config', side_effect=slow_reload):
+            asyncio.run(run())
+    
+    def test_global_manager_can_be_replaced(self):
+        """替换全局实例后 get_mcp_config_manager 返回新的实例"""
+        import mcp.config_manager as config_manager_module
+        
+        first, second = MagicMock(), MagicMock()
+        with patch.object(config_manager_module, '_config_manager', first):
+            self.assertIs(config_manager_module.get_mcp_config_manager(), first)
+        with patch.object(config_manager_module, '_config_manager', second):
+            self.assertIs(config_manager_module.get_mcp_config_manager(), second)
+    
     def test_api_endpoint_paths(self):
         """测试API端点路径一致性"""
         # 这个测试需要完整的应用环境，跳过
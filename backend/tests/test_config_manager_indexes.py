@@ -0,0 +1,96 @@
+"""
+MCP配置管理器名称索引单元测试
+"""
+
+import unittest
+import tempfile
+import shutil
+import os
+from unittest.mock import patch
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mcp.config_manager import MCPConfigManager
+from mcp.config import MCPServerConfig, MCPToolConfig
+
+
+def make_server(name: str, port: int = 8766) -> MCPServerConfig:
+    return MCPServerConfig(name=name, type="sse", host="localhost", port=port, path="/events")
+
+
+def make_tool(name: str, server_name: str) -> MCPToolConfig:
+    return MCPToolConfig(name=name, description=name, server_name=server_name, input_schema={})
+
+
+class TestMCPConfigManagerIndexes(unittest.TestCase):
+    """按名称查找服务器和工具的索引测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = tempfile.mkdtemp()
+        patchers = [
+            patch.object(MCPConfigManager, 'migrate_config_if_needed', return_value=False),
+            patch.object(MCPConfigManager, '_validate_config_path_consistency'),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.manager = MCPConfigManager(os.path.join(self.test_dir, "config", "mcp_config.json"))
+        for name in ("a", "b", "c"):
+            self.manager.add_server(make_server(name))
+        self.manager.add_tool(make_tool("t1", "a"))
+        self.manager.add_tool(make_tool("t2", "b"))
+
+    def tearDown(self):
+        """测试后清理"""
+        self.manager.flush_config()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_lookup_after_add(self):
+        """新增的服务器和工具可按名称找到，重名添加失败"""
+        self.assertEqual(self.manager.get_server_by_name("c").name, "c")
+        self.assertEqual(self.manager.get_tool_by_name("t2").server_name, "b")
+        self.assertIsNone(self.manager.get_server_by_name("missing"))
+        self.assertFalse(self.manager.add_server(make_server("a")))
+        self.assertFalse(self.manager.add_tool(make_tool("t1", "c")))
+
+    def test_lookup_after_remove(self):
+        """删除后索引重建，后面元素的下标随之变化"""
+        self.assertTrue(self.manager.remove_server("a"))
+        self.assertTrue(self.manager.remove_tool("t1"))
+
+        self.assertIsNone(self.manager.get_server_by_name("a"))
+        self.assertEqual(self.manager.get_server_by_name("c").name, "c")
+        self.assertIsNone(self.manager.get_tool_by_name("t1"))
+        self.assertEqual(self.manager.get_tool_by_name("t2").name, "t2")
+        self.assertFalse(self.manager.remove_server("a"))
+
+    def test_lookup_after_rename(self):
+        """更新时改名，旧名称不再可查，新名称指向同一位置"""
+        self.assertTrue(self.manager.update_server("b", make_server("b2")))
+        self.assertTrue(self.manager.update_tool("t2", make_tool("t2x", "b2")))
+
+        self.assertIsNone(self.manager.get_server_by_name("b"))
+        self.assertEqual(self.manager.get_server_by_name("b2").name, "b2")
+        self.assertIsNone(self.manager.get_tool_by_name("t2"))
+        self.assertEqual(self.manager.get_tool_by_name("t2x").server_name, "b2")
+        self.assertEqual([s.name for s in self.manager.get_config().servers], ["a", "b2", "c"])
+
+    def test_server_for_tool_follows_changes(self):
+        """工具所属服务器的缓存在服务器或工具修改后失效"""
+        self.assertEqual(self.manager.get_server_for_tool("t1").port, 8766)
+
+        self.manager.update_server("a", make_server("a", port=9000))
+        self.assertEqual(self.manager.get_server_for_tool("t1").port, 9000)
+
+        self.manager.update_tool("t1", make_tool("t1", "c"))
+        self.assertEqual(self.manager.get_server_for_tool("t1").name, "c")
+
+        self.manager.remove_server("c")
+        self.assertIsNone(self.manager.get_server_for_tool("t1"))
+        self.assertIsNone(self.manager.get_server_for_tool("missing"))
+
+
+if __name__ == '__main__':
+    unittest.main()
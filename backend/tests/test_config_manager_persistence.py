@@ -0,0 +1,233 @@
+"""
+MCP配置管理器持久化单元测试（延迟保存、重载、备份）
+"""
+
+import unittest
+import tempfile
+import shutil
+import json
+import gc
+import os
+import time
+import weakref
+from pathlib import Path
+from unittest.mock import patch
+
+import sys
+backend_src_path = os.path.join(os.path.dirname(__file__), '..', 'src')
+sys.path.insert(0, backend_src_path)
+
+import mcp.config_manager as config_manager_module
+from mcp.config_manager import MCPConfigManager, atomic_write_bytes
+from mcp.config import MCPServerConfig
+
+
+def make_server(name: str) -> MCPServerConfig:
+    return MCPServerConfig(name=name, type="sse", host="localhost", port=8766, path="/events")
+
+
+def read_server_names(path: str):
+    with open(path, 'rb') as f:
+        return [server["name"] for server in json.loads(f.read())["servers"]]
+
+
+class TestMCPConfigManagerPersistence(unittest.TestCase):
+    """配置修改写盘的持久性和顺序测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.test_dir, "config", "mcp_config.json")
+        # 迁移和路径一致性检查依赖当前工作目录，与本测试无关
+        patchers = [
+            patch.object(MCPConfigManager, 'migrate_config_if_needed', return_value=False),
+            patch.object(MCPConfigManager, '_validate_config_path_consistency'),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.manager = MCPConfigManager(self.config_path)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.manager.flush_config()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_flush_writes_pending_changes(self):
+        """flush_config 立即写入延迟保存的修改"""
+        self.assertTrue(self.manager.add_server(make_server("a")))
+        self.assertTrue(self.manager.add_server(make_server("b")))
+
+        self.manager.flush_config()
+
+        self.assertEqual(read_server_names(self.config_path), ["a", "b"])
+
+    def test_debounced_save_is_written(self):
+        """不主动刷新时，修改在防抖时间后写盘"""
+        self.manager.add_server(make_server("a"))
+
+        deadline = time.monotonic() + 5
+        while read_server_names(self.config_path) != ["a"] and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        self.assertEqual(read_server_names(self.config_path), ["a"])
+
+    def test_reload_writes_pending_changes_when_file_unchanged(self):
+        """文件未被外部修改时，重载不会丢失尚未写盘的修改"""
+        self.manager.add_server(make_server("a"))
+
+        self.manager.reload_config()
+
+        self.assertEqual([s.name for s in self.manager.get_config().servers], ["a"])
+        self.assertEqual(read_server_names(self.config_path), ["a"])
+
+    def write_external(self, *names: str):
+        """模拟其他写入方（如工具同步）直接改写配置文件"""
+        external = self.manager.get_config().model_dump()
+        external["servers"] = [make_server(name).model_dump() for name in names]
+        # 确保文件签名变化
+        time.sleep(0.01)
+        atomic_write_bytes(self.config_path, json.dumps(external).encode('utf-8'))
+
+    def test_reload_merges_pending_changes_into_external_write(self):
+        """文件被外部写入后重载，保留外部写入的内容并合并尚未写盘的修改"""
+        self.manager.add_server(make_server("pending"))
+        self.write_external("synced")
+
+        self.manager.reload_config()
+
+        self.assertEqual([s.name for s in self.manager.get_config().servers], ["synced", "pending"])
+        self.assertEqual(read_server_names(self.config_path), ["synced", "pending"])
+
+    def test_flush_merges_update_remove_and_toggle(self):
+        """改名、删除和启停按名称合并到被外部改写的文件上"""
+        for name in ("a", "b", "c"):
+            self.manager.add_server(make_server(name))
+        self.manager.flush_config()
+
+        self.manager.update_server("a", make_server("renamed"))
+        self.manager.remove_server("b")
+        self.manager.toggle_server("c")
+        self.write_external("a", "b", "c", "synced")
+        self.manager.flush_config()
+
+        with open(self.config_path, 'rb') as f:
+            servers = {s["name"]: s for s in json.loads(f.read())["servers"]}
+        self.assertEqual(list(servers), ["c", "synced", "renamed"])
+        self.assertFalse(servers["c"]["enabled"])
+
+    def test_delayed_save_failure_is_reported(self):
+        """延迟保存失败时通过 last_save_error 暴露错误，修改保留到下次保存"""
+        self.manager.add_server(make_server("a"))
+
+        with patch.object(config_manager_module, 'atomic_write_bytes', side_effect=OSError("disk full")):
+            self.manager._flush_pending_save()
+        self.assertIsInstance(self.manager.last_save_error, OSError)
+
+        self.manager.flush_config()
+        self.assertIsNone(self.manager.last_save_error)
+        self.assertEqual(read_server_names(self.config_path), ["a"])
+
+    def test_set_enabled_refreshes_enabled_servers(self):
+        """设置启用状态后启用服务器列表随之更新，修改延迟写盘"""
+        self.manager.add_server(make_server("a"))
+        self.assertEqual([s.name for s in self.manager.get_enabled_servers()], ["a"])
+
+        self.assertTrue(self.manager.set_server_enabled("a", False))
+        self.assertEqual(self.manager.get_enabled_servers(), [])
+        self.assertFalse(self.manager.set_server_enabled("missing", True))
+        self.manager.flush_config()
+
+        with open(self.config_path, 'rb') as f:
+            self.assertFalse(json.loads(f.read())["servers"][0]["enabled"])
+
+    def test_change_during_serialization_is_saved(self):
+        """序列化期间（如定时器线程写盘时）配置被修改，修改后的内容仍会写入"""
+        self.manager.add_server(make_server("a"))
+        self.manager.toggle_server("a")
+        real_dump = config_manager_module._dump_json_bytes
+
+        def dump_then_toggle(obj):
+            payload = real_dump(obj)
+            self.manager.toggle_server("a")
+            return payload
+
+        with patch.object(config_manager_module, '_dump_json_bytes', side_effect=dump_then_toggle):
+            self.manager._serialize_config()
+        self.manager.flush_config()
+
+        with open(self.config_path, 'rb') as f:
+            self.assertTrue(json.loads(f.read())["servers"][0]["enabled"])
+
+    def test_every_save_creates_backup(self):
+        """每次写盘前都备份当前配置文件"""
+        stamps = iter(["20260101_000001", "20260101_000002"])
+        with patch.object(config_manager_module.time, 'strftime', side_effect=lambda fmt: next(stamps)):
+            self.manager.add_server(make_server("a"))
+            self.manager.flush_config()
+            self.manager.add_server(make_server("b"))
+            self.manager.flush_config()
+
+        backups = self.manager.get_backups()
+
+        self.assertEqual(
+            [b["name"] for b in backups],
+            ["mcp_config_20260101_000002.json", "mcp_config_20260101_000001.json"]
+        )
+        self.assertEqual(read_server_names(backups[0]["path"]), ["a"])
+
+    def test_backup_list_sees_backup_within_same_mtime(self):
+        """备份目录修改时间未变（时间戳精度较粗）时，新增的备份仍会出现在列表中"""
+        backup_dir = self.manager.backup_dir
+        first = backup_dir / "mcp_config_20260101_000001.json"
+        first.write_bytes(b"{}")
+        dir_stat = os.stat(backup_dir)
+        self.assertEqual(len(self.manager.get_backups()), 1)
+
+        (backup_dir / "mcp_config_20260101_000002.json").write_bytes(b"{}")
+        os.utime(backup_dir, ns=(dir_stat.st_atime_ns, dir_stat.st_mtime_ns))
+
+        self.assertEqual(len(self.manager.get_backups()), 2)
+
+    def test_import_config_writes_immediately(self):
+        """导入配置返回成功时文件已写入"""
+        source = os.path.join(self.test_dir, "import.json")
+        config = self.manager.get_config().model_dump()
+        config["servers"] = [make_server("imported").model_dump()]
+        with open(source, 'w', encoding='utf-8') as f:
+            json.dump(config, f)
+
+        self.assertTrue(self.manager.import_config(source))
+
+        self.assertEqual(read_server_names(self.config_path), ["imported"])
+
+    def test_import_and_restore_report_write_failure(self):
+        """配置写盘失败时导入和恢复备份返回 False"""
+        source = os.path.join(self.test_dir, "import.json")
+        config = self.manager.get_config().model_dump()
+        config["servers"] = [make_server("imported").model_dump()]
+        with open(source, 'w', encoding='utf-8') as f:
+            json.dump(config, f)
+        backup_name = "mcp_config_20260101_000001.json"
+        shutil.copy(source, self.manager.backup_dir / backup_name)
+
+        with patch.object(config_manager_module, 'atomic_write_bytes', side_effect=OSError("disk full")):
+            self.assertFalse(self.manager.import_config(source))
+            self.assertFalse(self.manager.restore_backup(backup_name))
+
+    def test_manager_not_pinned_after_flush(self):
+        """写盘后注销退出钩子，管理器可以被回收"""
+        self.manager.add_server(make_server("a"))
+        self.manager.flush_config()
+
+        ref = weakref.ref(self.manager)
+        self.manager = None
+        gc.collect()
+
+        self.assertIsNone(ref())
+        # tearDown 需要一个管理器实例
+        self.manager = MCPConfigManager(self.config_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
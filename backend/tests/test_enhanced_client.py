@@ -0,0 +1,233 @@
+"""
+增强MCP客户端连接单元测试
+"""
+
+import unittest
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import mcp.enhanced_client as enhanced_client_module
+from mcp.enhanced_client import MCPServerConnection
+from mcp.config import MCPServerConfig
+from mcp.types import MCPException
+
+
+class FakeStreamContent:
+    """按给定分块返回数据的响应体，读完后返回空字节表示连接关闭"""
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    async def readany(self):
+        return self.chunks.pop(0) if self.chunks else b""
+
+
+class FakeStreamResponse:
+    def __init__(self, chunks):
+        self.status = 200
+        self.content = FakeStreamContent(chunks)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeStreamSession:
+    """第一次请求返回给定的事件流，之后的重连请求取消监听器"""
+
+    def __init__(self, chunks):
+        self.responses = [FakeStreamResponse(chunks)]
+
+    def get(self, uri, headers=None):
+        if not self.responses:
+            raise asyncio.CancelledError()
+        return self.responses.pop(0)
+
+
+def make_subprocess_connection(code: str) -> MCPServerConnection:
+    config = MCPServerConfig(name="proc", type="subprocess", command=sys.executable, args=["-c", code])
+    return MCPServerConnection(config)
+
+
+class TestSubprocessStartup(unittest.TestCase):
+    """子进程启动检查测试"""
+
+    def run_connect(self, connection: MCPServerConnection):
+        """连接子进程并返回连接完成时的退出码，结束后清理进程"""
+        async def connect():
+            try:
+                await connection._connect_subprocess()
+                return connection.process.returncode
+            finally:
+                if connection.process.returncode is None:
+                    connection.process.kill()
+                await connection.process.wait()
+        return asyncio.run(connect())
+
+    def test_slow_exit_is_detected(self):
+        """启动后稍晚才退出的进程同样判定为启动失败"""
+        connection = make_subprocess_connection("import sys, time; time.sleep(0.3); sys.exit(3)")
+
+        with self.assertRaises(MCPException):
+            self.run_connect(connection)
+
+    def test_running_process_is_accepted(self):
+        """检查期间持续运行的进程视为启动成功"""
+        connection = make_subprocess_connection("import time; time.sleep(30)")
+
+        self.assertIsNone(self.run_connect(connection))
+
+
+class TestToolSyncConfigWrite(unittest.TestCase):
+    """工具同步写入配置文件测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = tempfile.mkdtemp()
+        self.config_path = Path(self.test_dir) / "mcp_config.json"
+        servers = [{"name": name, "type": "sse", "enabled_tools": []} for name in ("a", "b")]
+        self.config_path.write_text(json.dumps({"servers": servers, "tools": []}), encoding='utf-8')
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def make_connection(self, name: str) -> MCPServerConnection:
+        connection = MCPServerConnection(MCPServerConfig(name=name, type="sse", host="localhost", port=8766))
+        connection._resolved_config_path = self.config_path
+        return connection
+
+    def test_syncs_from_different_loops_are_serialized(self):
+        """不同线程事件循环中的连接同时同步工具，双方的修改都保留"""
+        real_loads = enhanced_client_module._json_loads
+        errors = []
+
+        def slow_loads(data):
+            # 拉长读-改-写窗口，未串行时后写入者会覆盖先写入者
+            result = real_loads(data)
+            time.sleep(0.2)
+            return result
+
+        def sync(name):
+            try:
+                asyncio.run(self.make_connection(name)._update_mcp_config_file([f"{name}-tool"], []))
+            except Exception as e:
+                errors.append(e)
+
+        with patch.object(enhanced_client_module, '_json_loads', side_effect=slow_loads):
+            threads = [threading.Thread(target=sync, args=(name,)) for name in ("a", "b")]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        servers = json.loads(self.config_path.read_text(encoding='utf-8'))["servers"]
+        self.assertEqual(
+            {server["name"]: server["enabled_tools"] for server in servers},
+            {"a": ["a-tool"], "b": ["b-tool"]}
+        )
+
+
+class TestSSEEvents(unittest.TestCase):
+    """SSE事件流分帧与工具结果投递测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.connection = MCPServerConnection(
+            MCPServerConfig(name="sse", type="sse", host="localhost", port=8766, path="/events")
+        )
+
+    def listen(self, chunks):
+        """用给定分块的事件流运行监听器直到连接关闭"""
+        session = FakeStreamSession(chunks)
+        with patch.object(self.connection, '_get_session', return_value=session):
+            asyncio.run(self.connection._sse_event_listener("http://localhost:8766/events"))
+
+    def test_events_split_across_chunks(self):
+        """事件行被任意切分到多个分块中时仍按完整行分发，最后一行没有换行也会处理"""
+        events = []
+
+        async def record(event_type, data):
+            events.append((event_type, data))
+
+        stream = (
+            b'event: connected\ndata: {"client_id": "c1"}\n\n'
+            b'event: tool_start\r\ndata: {"tool": "k8s-get-pods"}\r\n\r\n'
+            b'data: {"orphan": true}\n\n'
+            b'event: tool_complete\ndata: {"id": "r1", "result": [1, 2]}'
+        )
+        chunks = [stream[i:i + 7] for i in range(0, len(stream), 7)]
+        with patch.object(self.connection, '_handle_sse_event', side_effect=record):
+            self.listen(chunks)
+
+        self.assertEqual(events, [
+            ("connected", {"client_id": "c1"}),
+            ("tool_start", {"tool": "k8s-get-pods"}),
+            (None, {"orphan": True}),
+            ("tool_complete", {"id": "r1", "result": [1, 2]}),
+        ])
+
+    def test_heartbeat_and_bad_data(self):
+        """心跳只刷新心跳时间不分发，无法解析的数据被跳过"""
+        events = []
+
+        async def record(event_type, data):
+            events.append(event_type)
+
+        stream = [
+            b'event: heartbeat\ndata: not json\n\n',
+            b'event: connected\ndata: {broken\n\nevent: connected\ndata: {}\n\n',
+        ]
+        with patch.object(self.connection, '_handle_sse_event', side_effect=record):
+            self.listen(stream)
+
+        self.assertIsNotNone(self.connection.last_ping)
+        self.assertEqual(events, ["connected"])
+
+    def test_results_delivered_by_request_id(self):
+        """工具结果按请求ID投递给对应的等待者，未知ID被忽略"""
+        async def run():
+            loop = asyncio.get_running_loop()
+            first, second = loop.create_future(), loop.create_future()
+            self.connection._pending_results.update({"r1": first, "r2": second})
+
+            await self.connection._process_sse_lines([
+                b'event: tool_complete', b'data: {"id": "r2", "result": "two"}', b'',
+                b'event: tool_complete', b'data: {"id": "unknown", "result": "x"}', b'',
+                b'event: tool_error', b'data: {"id": "r1", "error": "boom"}', b'',
+            ], None)
+
+            self.assertEqual(await self.connection._wait_for_tool_result("r2", second), "two")
+            with self.assertRaises(MCPException) as ctx:
+                await self.connection._wait_for_tool_result("r1", first)
+            self.assertEqual(ctx.exception.message, "boom")
+            self.assertEqual(self.connection._pending_results, {})
+
+        asyncio.run(run())
+
+    def test_wait_times_out(self):
+        """超时未收到结果时抛出超时异常"""
+        async def run():
+            future = asyncio.get_running_loop().create_future()
+            with self.assertRaises(MCPException) as ctx:
+                await self.connection._wait_for_tool_result("r1", future, timeout=0.01)
+            return ctx.exception
+
+        self.assertEqual(asyncio.run(run()).code, "TOOL_CALL_TIMEOUT")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+脱敏映射存储单元测试
+"""
+
+import unittest
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+from backend.src.llm.security.mapping import MaskingMappingStore, SessionMappingManager
+
+
+class TestMaskingMappingStore(unittest.TestCase):
+    """会话映射存储测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.store = MaskingMappingStore("test-session")
+        self.store.add_mapping("192.168.1.10", "192.168.ab12.10", "ip_address")
+        self.store.add_mapping("192.168.1.100", "192.168.ab12.100", "ip_address")
+        self.store.add_mapping("node01-7", "host-d807c973---7", "hostname")
+        self.store.add_mapping("13812345678", "138***5678_enc_abcd", "phone")
+
+    def test_restore_prefers_longer_values(self):
+        """同一前缀分桶内较长的脱敏值先恢复，不会被较短的值截断"""
+        restored = self.store.restore_text("a 192.168.ab12.100 b 192.168.ab12.10")
+
+        self.assertEqual(restored, "a 192.168.1.100 b 192.168.1.10")
+
+    def test_restore_across_buckets(self):
+        """文本同时包含多个分桶的脱敏值时全部恢复"""
+        restored = self.store.restore_text("host-d807c973---7 / 138***5678_enc_abcd / 192.168.ab12.10")
+
+        self.assertEqual(restored, "node01-7 / 13812345678 / 192.168.1.10")
+
+    def test_text_without_masked_prefix_is_unchanged(self):
+        """不含任何脱敏值前缀的文本原样返回"""
+        self.assertEqual(self.store.restore_text("nothing to restore"), "nothing to restore")
+
+    def test_restore_sees_new_mapping(self):
+        """恢复之后新增的映射在下一次恢复中生效"""
+        self.assertEqual(self.store.restore_text("x-tok"), "x-tok")
+
+        self.store.add_mapping("secret", "x-tok", "custom")
+
+        self.assertEqual(self.store.restore_text("x-tok"), "secret")
+        self.assertEqual(self.store.masked_to_original["x-tok"], "secret")
+        self.assertEqual(self.store.original_to_masked["secret"], "x-tok")
+
+    def test_remapping_original_keeps_single_bucket_entry(self):
+        """同一脱敏值重复添加不会在分桶中产生重复条目"""
+        self.store.add_mapping("192.168.1.10", "192.168.ab12.10", "ip_address")
+
+        self.assertEqual(len(self.store), 4)
+        self.assertEqual(self.store._get_snapshot()[2]["19"], ("192.168.ab12.100", "192.168.ab12.10"))
+
+
+class TestSessionMappingManager(unittest.TestCase):
+    """会话过期清理测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.manager = SessionMappingManager()
+        self.stale = self.manager.get_session_store("stale")
+        self.active = self.manager.get_session_store("active")
+        self.fresh = self.manager.get_session_store("fresh")
+        # 入堆时间均为一小时前，其中 active 会话之后又被使用过
+        for store in (self.stale, self.active, self.fresh):
+            store.last_used = time.time() - 7200
+        self.manager._expiry_heap = [self.heap_entry(store) for store in (self.stale, self.active)]
+        self.active.get_masked("anything")
+        self.fresh.last_used = time.time()
+        self.manager._expiry_heap.append(self.heap_entry(self.fresh))
+
+    def heap_entry(self, store):
+        return (store.last_used, store.session_id, self.manager._session_generations[store.session_id])
+
+    def heap_session_ids(self):
+        return sorted(entry[1] for entry in self.manager._expiry_heap)
+
+    def test_cleanup_removes_only_expired_sessions(self):
+        """只删除确实过期的会话，入堆后被使用过的会话保留"""
+        self.manager.cleanup_expired_sessions(3600)
+
+        self.assertEqual(set(self.manager.sessions), {"active", "fresh"})
+        self.assertIs(self.manager.get_session("active"), self.active)
+
+    def test_used_session_is_requeued(self):
+        """被使用过的会话按新的 last_used 重新入堆，之后过期仍会被清理"""
+        self.manager.cleanup_expired_sessions(3600)
+        self.assertIn(self.heap_entry(self.active), self.manager._expiry_heap)
+
+        self.active.last_used = time.time() - 7200
+        self.manager._expiry_heap = [self.heap_entry(self.active)]
+        self.manager.cleanup_expired_sessions(3600)
+
+        self.assertNotIn("active", self.manager.sessions)
+
+    def test_removed_session_entry_is_discarded(self):
+        """堆中已不存在的会话条目被直接丢弃"""
+        del self.manager.sessions["stale"]
+
+        self.manager.cleanup_expired_sessions(3600)
+
+        self.assertEqual(self.heap_session_ids(), ["active", "fresh"])
+
+    def test_recreated_session_drops_old_entry(self):
+        """会话删除后以同一ID重建，旧会话的堆条目被丢弃，不会与新条目一起反复入堆"""
+        del self.manager.sessions["active"]
+        recreated = self.manager.get_session_store("active")
+
+        self.manager.cleanup_expired_sessions(3600)
+
+        self.assertIs(self.manager.get_session("active"), recreated)
+        self.assertEqual(self.heap_session_ids(), ["active", "fresh"])
+        self.assertIn(self.heap_entry(recreated), self.manager._expiry_heap)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+脱敏规则单元测试
+"""
+
+import unittest
+import random
+import re
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+from backend.src.llm.security.rules import SensitiveDataRules
+from backend.src.llm.security.mapping import MaskingMappingStore
+
+
+# 固定密钥，保证测试结果可复现
+TEST_KEY = bytes(range(32))
+
+
+def reference_mask(rules: SensitiveDataRules, text: str, store: MaskingMappingStore) -> str:
+    """基线实现：先按姓氏词典替换姓名，再按规则定义顺序逐条 re.sub，后面的规则扫描前面的替换结果"""
+    masked_text = text
+    name_rule = rules._rule_records["chinese_name"]
+    for name, start, end in reversed(rules.surname_dict.find_names_in_text(masked_text)):
+        if not store.is_masked(name):
+            masked_text = masked_text[:start] + rules._name_mask(name, name_rule) + masked_text[end:]
+    for rule_name in rules._regex_rule_names:
+        rule = rules._rule_records[rule_name]
+        handler = rules._strategy_handlers[rule.strategy]
+
+        def replace_match(match):
+            original = match.group()
+            if store.is_masked(original):
+                return original
+            return handler(original, rule, store.token_salt)
+
+        masked_text = re.sub(rule.pattern, replace_match, masked_text)
+    return masked_text
+
+
+class TestSensitiveDataRules(unittest.TestCase):
+    """敏感数据脱敏规则测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.rules = SensitiveDataRules(TEST_KEY)
+        self.store = MaskingMappingStore("test-session")
+
+    def mask(self, text: str) -> str:
+        return self.rules.apply_rules(text, self.store)
+
+    def test_phone_in_hostname_suffix_is_masked(self):
+        """主机名保留的数字后缀中的手机号仍需被手机号规则脱敏"""
+        masked = self.mask("node01-13912345678")
+
+        self.assertNotIn("13912345678", masked)
+        host = self.rules._format_preserve_hash("node01-13912345678", self.rules._rule_records["hostname"])
+        phone = self.store.get_masked("13912345678")
+        self.assertEqual(host, "host-d807c973---13912345678")
+        self.assertTrue(phone.startswith("139***5678_enc_"))
+        self.assertEqual(masked, "host-d807c973---" + phone)
+
+    def test_mixed_text(self):
+        """各规则在普通文本中的脱敏结果"""
+        masked = self.mask("ip 192.168.1.10 张三 mail a.bcdef@x.com tel 13812345678")
+
+        self.assertEqual(
+            masked,
+            f"ip {self.store.get_masked('192.168.1.10')} 张x mail a.***ef@x.com "
+            f"tel {self.store.get_masked('13812345678')}"
+        )
+        self.assertTrue(self.store.get_masked("192.168.1.10").endswith(".10"))
+        self.assertEqual(self.store.get_original("张x"), "张三")
+
+    def test_matches_sequential_reference(self):
+        """随机拼接的文本与逐条规则处理的基线实现结果一致"""
+        pieces = [
+            "node", "host", "worker", "-", "01", "7", "139", "1234", "5678", "192.168.", "1.", "10",
+            "@", "ab.cd", "x.com", " ", ".", "张三", "李四", "abc", "１２", "３",
+        ]
+        rng = random.Random(20261016)
+        for _ in range(500):
+            text = "".join(rng.choice(pieces) for _ in range(rng.randint(1, 10)))
+            masked = self.mask(text)
+            self.assertEqual(masked, reference_mask(self.rules, text, self.store), text)
+
+    def test_unicode_digits_are_not_prefiltered(self):
+        """只含全角数字的主机名同样会被脱敏"""
+        masked = self.mask("node０１-２３")
+
+        self.assertNotEqual(masked, "node０１-２３")
+        self.assertEqual(self.store.get_original(masked), "node０１-２３")
+
+    def test_encrypted_tokens_are_salted_per_session(self):
+        """同一会话内标识稳定，不同会话间的标识不可关联"""
+        other_store = MaskingMappingStore("other-session")
+
+        first = self.mask("tel 13812345678")
+        second = self.mask("call 13812345678")
+        other = self.rules.apply_rules("tel 13812345678", other_store)
+
+        self.assertEqual(first[4:], second[5:])
+        self.assertNotEqual(first, other)
+        self.assertTrue(other.startswith("tel 138***5678_enc_"))
+
+    def test_nested_structures(self):
+        """字典和列表中的字符串逐项脱敏，其他类型原样返回"""
+        data = {"hosts": ["10.1.2.3", "plain"], "count": 3, "owner": {"name": "张三"}}
+
+        masked = self.rules.apply_rules(data, self.store)
+
+        self.assertEqual(masked["hosts"][1], "plain")
+        self.assertEqual(masked["count"], 3)
+        self.assertEqual(masked["owner"]["name"], "张x")
+        self.assertNotEqual(masked["hosts"][0], "10.1.2.3")
+        self.assertEqual(self.store.restore_text(masked["hosts"][0]), "10.1.2.3")
+
+
+if __name__ == '__main__':
+    unittest.main()
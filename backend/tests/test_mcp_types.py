@@ -0,0 +1,30 @@
+"""
+MCP类型定义单元测试
+"""
+
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pydantic import ValidationError
+from mcp.types import ProcessResult
+
+
+class TestProcessResult(unittest.TestCase):
+    """LLM处理结果测试"""
+
+    def test_usage_is_validated(self):
+        """直接构造时 usage 按 Usage 结构校验"""
+        result = ProcessResult(content="ok", usage={"prompt_tokens": 1, "total_tokens": 3})
+        self.assertEqual(result.usage, {"prompt_tokens": 1, "total_tokens": 3})
+
+        with self.assertRaises(ValidationError):
+            ProcessResult(content="ok", usage={"prompt_tokens": "many"})
+        with self.assertRaises(ValidationError):
+            ProcessResult(content="ok", usage="1 token")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+中文姓氏词典单元测试
+"""
+
+import unittest
+import random
+import re
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+from backend.src.llm.security.surname_dict import SurnameDict, SORTED_SURNAMES
+
+
+def reference_find_names(text: str):
+    """基线实现：逐个姓氏用正则扫描全文，跳过与已找到姓名重叠的匹配"""
+    names_found = []
+    for surname in SORTED_SURNAMES:
+        pattern = f'(?<![\\u4e00-\\u9fff]){re.escape(surname)}[\\u4e00-\\u9fff]{{1,3}}(?![\\u4e00-\\u9fff])'
+        for match in re.finditer(pattern, text):
+            start, end = match.start(), match.end()
+            if end - start <= 4 and not any(start < e and end > s for _, s, e in names_found):
+                names_found.append((match.group(0), start, end))
+    names_found.sort(key=lambda x: x[1])
+    return names_found
+
+
+class TestSurnameDict(unittest.TestCase):
+    """姓氏识别测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.surname_dict = SurnameDict()
+
+    def test_find_names(self):
+        """完整中文片段以姓氏开头且长度合适时识别为姓名"""
+        self.assertEqual(
+            self.surname_dict.find_names_in_text("联系 张三,欧阳娜娜: 李四五六七 ok"),
+            [("张三", 3, 5), ("欧阳娜娜", 6, 10)]
+        )
+        self.assertEqual(self.surname_dict.find_names_in_text("contact zhang san"), [])
+
+    def test_compound_surname(self):
+        """复姓优先，复姓后没有名字时回退到单字姓"""
+        self.assertEqual(self.surname_dict.get_surname("司马懿"), "司马")
+        self.assertEqual(self.surname_dict.find_names_in_text("万俟"), [("万俟", 0, 2)])
+        self.assertTrue(self.surname_dict.is_chinese_name("欧阳"))
+        self.assertFalse(self.surname_dict.is_chinese_name("abc"))
+        self.assertFalse(self.surname_dict.is_chinese_name("你好"))
+
+    def test_matches_reference(self):
+        """随机拼接的文本与逐姓氏正则扫描的基线实现结果一致"""
+        pieces = ["张", "欧阳", "万", "俟", "司马", "三", "你", "好", "a", " ", "1", "-", "。"]
+        rng = random.Random(20261016)
+        for _ in range(1000):
+            text = "".join(rng.choice(pieces) for _ in range(rng.randint(1, 8)))
+            self.assertEqual(self.surname_dict.find_names_in_text(text), reference_find_names(text), text)
+
+
+if __name__ == '__main__':
+    unittest.main()